@@ -0,0 +1,79 @@
+######################
+###### ASIV-ALL ######
+######################
+
+# v0.1 (261018)
+# Generate the decks, run the simulator and analyze the eyes in one process:
+#   interface.md is parsed once (asiv_config) and the design, IBIS data and eye masks stay in memory
+#   between asiv-spgen.py, asiv-run.py and asiv-pproc.py, which are imported as asiv_spgen, asiv_run and asiv_pproc
+#   (also in the --jobs worker processes, whether they are started by fork or by spawn)
+# Without a simulator command (--sim or $ASIV_SIM) the raw files already in "data/" are analyzed
+
+# TO-DO:
+#
+
+import importlib
+import importlib.abc
+import importlib.util
+import os.path
+import sys
+import asiv_config
+
+class ToolFinder(importlib.abc.MetaPathFinder):
+    # The tools are scripts with '-' in their names: 'import asiv_spgen' loads asiv-spgen.py.
+    # It is installed when this script is imported, which a --jobs worker started with
+    # 'spawn' (macOS, Windows) does too, so the workers can unpickle the tools' objects.
+    toolNames = ['asiv_spgen', 'asiv_run', 'asiv_pproc']
+
+    def find_spec(self, fullname, path, target=None):
+        if not fullname in self.toolNames:
+            return None
+        file = os.path.join(os.path.dirname(os.path.abspath(__file__)), fullname.replace('_', '-') + '.py')
+        return importlib.util.spec_from_file_location(fullname, file)
+
+sys.meta_path.append(ToolFinder())
+
+def loadTool(name):
+    return importlib.import_module(name.replace('-', '_'))
+
+if __name__ == "__main__":
+    #logging.basicConfig(level=logging.DEBUG)    # uncomment this line to output debug info
+    if not (len(sys.argv) >= 2 and len(sys.argv) <= 14):
+        print('Error! Usage: python3 asiv-all.py <path_to_interface_folder> [--binary] [--ibislib DIR] [--jobs N] [--repeat N] [--digital] [--sim "<command>"] [--showplot]')
+        raise SystemExit
+    binaryflag = 0
+    if '--binary' in sys.argv:
+        binaryflag = 1
+    digitalflag = 0
+    if '--digital' in sys.argv:
+        digitalflag = 1
+    plotflag = 0
+    if '--showplot' in sys.argv:
+        plotflag = 1
+    ibisLibDir = os.environ.get('ASIV_IBIS_LIB', '')
+    if '--ibislib' in sys.argv:
+        ibisLibDir = sys.argv[sys.argv.index('--ibislib') + 1]
+    jobs = 1
+    if '--jobs' in sys.argv:
+        jobs = int(sys.argv[sys.argv.index('--jobs') + 1])     # 0: one job per core
+        if jobs == 0:
+            jobs = os.cpu_count()
+    repeat = 1
+    if '--repeat' in sys.argv:
+        repeat = int(sys.argv[sys.argv.index('--repeat') + 1])     # LFSR periods in the transient
+        if repeat < 1:
+            print('Error! --repeat N needs N >= 1.')
+            raise SystemExit
+    simCommand = os.environ.get('ASIV_SIM', '')
+    if '--sim' in sys.argv:
+        simCommand = sys.argv[sys.argv.index('--sim') + 1]
+    projectDir = os.path.abspath(sys.argv[1])
+    config = asiv_config.Config(projectDir + '/models/interface.md')
+    spgen = loadTool('asiv-spgen')
+    thisDesign = spgen.Design(config.configFile, binaryflag, ibisLibDir, jobs, repeat, digitalflag, config)
+    if not simCommand == '':
+        run = loadTool('asiv-run')
+        thisRunner = run.SimRunner(projectDir, simCommand, jobs)
+        thisRunner.runAll()
+    pproc = loadTool('asiv-pproc')
+    thispproc = pproc.Pproc(projectDir, plotflag, jobs, None, 1, config)
@@ -0,0 +1,240 @@
+######################
+###### ASIV-FLOW #####
+######################
+
+# v0.1 (261018)
+# Run a project end to end: asiv-spgen.py -> asiv-run.py -> asiv-pproc.py
+# The flow is a dependency graph, one node per step and (byte, rd/wt) unit:
+#   decks (interface.md, IBIS, BYTE*.sp, library IBIS files used by the last run) -> sim:byte<ID>_<rd|wt> -> eye:byte<ID>_<rd|wt> -> summary
+# Each node records the hash of its inputs in "data/flow.json" and only runs again when they change
+# The sim stamp ignores interface.md (it reaches the simulator through the deck); the eye stamp only uses
+#   the DDR type and data rate of the interface, which set the eye mask, vref and skew
+# The units run in parallel; the output of each node is kept in "data/flow/<node>.log"
+# At most '--jobs N' eye nodes run at once (default one per core), and at most as many sim nodes as the
+#   asiv-run.py pool allows (cores and free memory, '--mem GB' per simulation, default 2)
+# '--binary', '--repeat N' and '--digital' are passed to asiv-spgen.py
+
+# TO-DO:
+#
+
+import concurrent.futures
+import hashlib
+import importlib.util
+import json
+import logging
+import os.path
+import subprocess
+import sys
+import threading
+import asiv_config
+
+class Flow:
+    def __init__(self, projectDir, simCommand, jobs=1, spgenArgs=[], jobMemory=2.0):
+        self.projectDir = projectDir
+        self.simCommand = simCommand
+        self.jobs = jobs                # eye nodes at once
+        self.jobMemory = jobMemory      # GB needed by one simulation
+        self.spgenArgs = spgenArgs
+        self.scriptDir = os.path.dirname(os.path.abspath(__file__))
+        self.modelPath = self.projectDir + '/models'
+        self.manifestFile = self.projectDir + '/decks/manifest.json'
+        self.stateFile = self.projectDir + '/data/flow.json'
+        self.logPath = self.projectDir + '/data/flow'
+        self.state = {}         # node <-> hash of its inputs at its last successful run
+        self.lock = threading.Lock()
+        self.fileHashes = {}    # file <-> sha1
+        self.eyeSettings = {}   # unit <-> interface settings the eye mask, vref and skew depend on
+
+    def run(self):
+        if not os.path.isdir(self.logPath):
+            os.makedirs(self.logPath)
+        self.readState()
+        # decks: spgen (and asiv_config) reads interface.md, the IBIS and BYTE*.sp files and the model rules.
+        # It only rewrites the decks whose content changed, and lists their inputs in the manifest.
+        stamp = self.decksStamp()
+        if not os.path.isfile(self.manifestFile) or self.isStale('decks', stamp):
+            if not self.runNode('decks', [self.scriptDir + '/asiv-spgen.py', self.projectDir, '--jobs', str(self.jobs)] + self.spgenArgs, stamp):
+                raise SystemExit(1)
+            # The library files used may have changed with this run: stamp again with the new manifest
+            stamp = self.decksStamp()
+            with self.lock:
+                self.state['decks'] = stamp
+                self.writeState()
+        with open(self.manifestFile, 'r') as f:
+            decks = json.load(f)['decks']
+        self.readEyeSettings()
+        # sim and eye of each unit, the units in parallel. Each sim node runs asiv-run.py
+        # with one deck, so the number of simulations at once is bounded here instead.
+        simJobs = self.simPoolSize()
+        self.simSlots = threading.BoundedSemaphore(simJobs)
+        self.eyeSlots = threading.BoundedSemaphore(max(1, self.jobs))
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, min(max(self.jobs, simJobs), len(decks)))) as executor:
+            futures = [executor.submit(self.runUnit, entry) for entry in decks]
+            stamps = [future.result() for future in futures]
+        if '' in stamps:
+            print('Error: Some nodes failed, see %s.' % (self.logPath))
+            raise SystemExit(1)
+        # summary: the eye metrics of all units
+        stamp = self.stamp(stamps, [self.scriptDir + '/asiv-pproc.py', self.scriptDir + '/asiv_config.py'])
+        if self.isStale('summary', stamp) or not os.path.isfile(self.projectDir + '/data/eye_summary.txt'):
+            if not self.runNode('summary', [self.scriptDir + '/asiv-pproc.py', self.projectDir, '--summary'], stamp):
+                raise SystemExit(1)
+
+    def runUnit(self, entry):
+        # The sim and eye nodes of one deck. Returns the stamp of the eye node, '' if a node failed.
+        unit = os.path.splitext(os.path.basename(entry['deck']))[0]
+        rawfile = self.projectDir + '/data/' + unit + '.raw'
+        # sim: the deck and the files it includes, as hashed by spgen. interface.md
+        # only matters through the deck content, as in SimRunner.resultKey.
+        stamp = self.stamp([self.simCommand, entry['hash']] + ['%s %s' % (file, entry['inputs'][file]) for file in sorted(entry['inputs'])
+                                                               if not os.path.basename(file) == 'interface.md'],
+                           [self.scriptDir + '/asiv-run.py'])
+        if self.isStale('sim:' + unit, stamp) or not os.path.isfile(rawfile):
+            with self.simSlots:
+                ok = self.runNode('sim:' + unit, [self.scriptDir + '/asiv-run.py', self.projectDir, '--sim', self.simCommand, '--jobs', '1', '--decks', unit], stamp)
+            if not ok:
+                return ''
+        # eye: the raw file (by size and mtime, it is only written by the sim node), the eye mask settings of its interface
+        stat = os.stat(rawfile)
+        stamp = self.stamp([stamp, '%d %r' % (stat.st_size, stat.st_mtime), self.eyeSettings.get(unit, '')], [self.scriptDir + '/asiv-pproc.py', self.scriptDir + '/asiv_config.py'])
+        if self.isStale('eye:' + unit, stamp) or not os.path.isfile(self.projectDir + '/data/' + unit + '/eye_summary.txt'):
+            with self.eyeSlots:
+                ok = self.runNode('eye:' + unit, [self.scriptDir + '/asiv-pproc.py', self.projectDir, '--units', unit, '--nosummary'], stamp)
+            if not ok:
+                return ''
+        return stamp
+
+    def decksStamp(self):
+        files = [self.scriptDir + '/asiv-spgen.py', self.scriptDir + '/asiv_config.py', self.scriptDir + '/asiv-model-rules.json']
+        files += sorted([os.path.join(self.modelPath, name) for name in os.listdir(self.modelPath)])
+        files += self.libraryInputs()
+        return self.stamp(self.spgenArgs + [os.environ.get('ASIV_IBIS_LIB', '')], files)
+
+    def libraryInputs(self):
+        # IBIS files from outside the project (found in the IBIS library, $ASIV_IBIS_LIB),
+        # as listed in the manifest of the last run. The decks and their libraries are outputs.
+        if not os.path.isfile(self.manifestFile):
+            return []
+        try:
+            with open(self.manifestFile, 'r') as f:
+                decks = json.load(f)['decks']
+        except (ValueError, KeyError):
+            return []
+        inside = [os.path.normpath(self.modelPath) + os.sep, os.path.normpath(self.projectDir + '/decks') + os.sep]
+        files = set()
+        for entry in decks:
+            for file in entry['inputs']:
+                if not any([file.startswith(path) for path in inside]):
+                    files.add(file)
+        return sorted(files)
+
+    def simPoolSize(self):
+        # Simulations at once, sized by asiv-run.py to the cores and the free memory
+        spec = importlib.util.spec_from_file_location('asiv_run', self.scriptDir + '/asiv-run.py')
+        run = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(run)
+        return run.SimRunner(self.projectDir, self.simCommand, 0, self.jobMemory).poolSize()
+
+    def readEyeSettings(self):
+        # pproc derives the eye mask, vref and DQ-DQS skew of a unit from the DDR type
+        # and data rate of its interface: the rest of interface.md does not affect it
+        config = asiv_config.Config(self.modelPath + '/interface.md')
+        for thisInterface in config.interfaces:
+            prefix = config.unitPrefix(thisInterface)
+            settings = '%s %s %s' % (thisInterface.interfaceID, thisInterface.ddrType.lower(), thisInterface.dataRate)
+            for thisByte in thisInterface.byte:
+                for deckType in ['rd', 'wt']:
+                    self.eyeSettings[prefix + 'byte' + thisByte.byteID + '_' + deckType] = settings
+
+    def runNode(self, node, command, stamp):
+        # Run one tool, its output goes to data/flow/<node>.log. On success the stamp is recorded.
+        logfile = os.path.join(self.logPath, node.replace(':', '_') + '.log')
+        print('%s: running' % (node))
+        logging.debug('Running: %s' % (' '.join(command)))
+        with open(logfile, 'wb') as log:
+            returncode = subprocess.call([sys.executable] + command, cwd=self.projectDir, stdout=log, stderr=subprocess.STDOUT)
+        if not returncode == 0:
+            print('EF01: %s failed (exit code %d), see %s.' % (node, returncode, logfile))
+            with self.lock:
+                self.state.pop(node, None)
+                self.writeState()
+            return False
+        print('%s: done' % (node))
+        with self.lock:
+            self.state[node] = stamp
+            self.writeState()
+        return True
+
+    def isStale(self, node, stamp):
+        with self.lock:
+            if self.state.get(node, '') == stamp:
+                logging.debug('%s is up to date.' % (node))
+                return False
+            return True
+
+    def stamp(self, values, files):
+        # sha1 of some values and of the content of some files
+        h = hashlib.sha1()
+        for value in values:
+            h.update(('%s\n' % (value)).encode('utf-8'))
+        for file in files:
+            if os.path.isfile(file):
+                h.update(('%s %s\n' % (os.path.basename(file), self.fileHash(file))).encode('utf-8'))
+        return h.hexdigest()
+
+    def fileHash(self, file):
+        with self.lock:
+            if file in self.fileHashes:
+                return self.fileHashes[file]
+        h = hashlib.sha1()
+        with open(file, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                h.update(chunk)
+        with self.lock:
+            self.fileHashes[file] = h.hexdigest()
+        return h.hexdigest()
+
+    def readState(self):
+        if not os.path.isfile(self.stateFile):
+            return
+        try:
+            with open(self.stateFile, 'r') as f:
+                self.state = json.load(f)['nodes']
+        except (ValueError, KeyError):
+            print('Warning: Cannot read flow state %s. Running all nodes.' % (self.stateFile))
+            self.state = {}
+
+    def writeState(self):
+        tmpfile = '%s.%d.tmp' % (self.stateFile, os.getpid())
+        with open(tmpfile, 'w') as f:
+            json.dump({'version': 1, 'nodes': self.state}, f, indent=1, sort_keys=True)
+        os.replace(tmpfile, self.stateFile)
+
+if __name__ == "__main__":
+    #logging.basicConfig(level=logging.DEBUG)    # uncomment this line to output debug info
+    if not (len(sys.argv) >= 2 and len(sys.argv) <= 12):
+        print('Error! Usage: python3 asiv-flow.py <path_to_interface_folder> [--sim "<command>"] [--jobs N] [--mem GB] [--binary] [--repeat N] [--digital]')
+        raise SystemExit
+    simCommand = os.environ.get('ASIV_SIM', '')
+    if '--sim' in sys.argv:
+        simCommand = sys.argv[sys.argv.index('--sim') + 1]
+    if simCommand == '':
+        print('ER01: No simulator command. Use --sim "<command>" or set ASIV_SIM, e.g. "simulator -b %(deck)s -o %(raw)s".')
+        raise SystemExit
+    jobs = 0
+    if '--jobs' in sys.argv:
+        jobs = int(sys.argv[sys.argv.index('--jobs') + 1])
+    if jobs == 0:
+        jobs = os.cpu_count()   # 0: one job per core
+    jobMemory = 2.0
+    if '--mem' in sys.argv:
+        jobMemory = float(sys.argv[sys.argv.index('--mem') + 1])
+    spgenArgs = []
+    for flag in ['--binary', '--digital']:
+        if flag in sys.argv:
+            spgenArgs.append(flag)
+    if '--repeat' in sys.argv:
+        spgenArgs += ['--repeat', sys.argv[sys.argv.index('--repeat') + 1]]
+    projectDir = os.path.abspath(sys.argv[1])
+    thisFlow = Flow(projectDir, simCommand, jobs, spgenArgs, jobMemory)
+    thisFlow.run()
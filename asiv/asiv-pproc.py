@@ -2,6 +2,25 @@
 ##### ASIV-PPROC #####
 ######################
 
+# v0.4 (261018)
+# Vectorized edge detection (next-index tables instead of a per-sample loop)
+# Read the raw file "Values:" block in bulk into a NumPy array, using the header's variable list
+# Support binary raw files ("Binary:"), memory-mapped without copying the waveforms
+# Compute the interpolation grid and DQS trigger points once per byte (EyeContext)
+# Process all 8 DQ lanes of a byte at once on a (lanes x triggers x samples) array; drop the unused per-lane DQ edge pass
+# Eye height search as masked min/max reductions (eyeHeight), optionally per UI
+# Add '--jobs N' option to process the (byte, rd/wt) raw files in parallel
+# Write a summary of the eye metrics of all bytes to "data/eye_summary.txt"
+# Cache parsed waveforms in "<rawfile>.npz", keyed by raw file size, mtime and hash
+# No more 1 ps resampling: crossing times are interpolated between simulator time points
+# Raw files without a 'Variables:' section use the signal list of their deck in decks/manifest.json
+# '--units byte0_rd,...': only process these raw files; '--nosummary': don't rewrite "data/eye_summary.txt"
+# With '--units', "trigger.txt" is not written to the working folder
+# '--summary': only rebuild "data/eye_summary.txt" from the "data/<unit>/eye_summary.txt" of each unit
+# interface.md is parsed by the shared asiv_config module; Pproc can also take an already parsed Config
+# The eye mask is set up once per interface instead of once per raw file
+# Several DDR blocks: the raw files of each interface are prefixed by its ID; 'ddr' column in the summaries
+
 # v0.3 (170115)
 # Refined calculation for EW, EH, and timing margins. 
 # Add an option to disable "adjust" by default
@@ -29,292 +48,469 @@
 # TO-DO:
 # 
 
+import concurrent.futures
+import hashlib
+import json
 import logging
 import os.path
 import sys
 import numpy as np
+import asiv_config
 #import matplotlib.pyplot as plt
 
 class Pproc:
-    def __init__(self, projectDir, plotflag):
+    # Byte waveform attribute <-> raw file variable
+    rawSignals = [('wfm_time', 'time'),
+                  ('wfm_dq0', 'v(xrx_dq0.rx_pad)'),
+                  ('wfm_dq1', 'v(xrx_dq1.rx_pad)'),
+                  ('wfm_dq2', 'v(xrx_dq2.rx_pad)'),
+                  ('wfm_dq3', 'v(xrx_dq3.rx_pad)'),
+                  ('wfm_dq4', 'v(xrx_dq4.rx_pad)'),
+                  ('wfm_dq5', 'v(xrx_dq5.rx_pad)'),
+                  ('wfm_dq6', 'v(xrx_dq6.rx_pad)'),
+                  ('wfm_dq7', 'v(xrx_dq7.rx_pad)'),
+                  ('wfm_dqsp', 'v(xrx_dqsp.rx_pad)'),
+                  ('wfm_dqsn', 'v(xrx_dqsn.rx_pad)')]
+    # Variable list assumed for raw files without a 'Variables:' section and without
+    # signals in decks/manifest.json (the 19-row layout of older decks)
+    rawDefaultVariables = [name for attr, name in rawSignals] + ['v(dq%d_dig_out)' % (i) for i in range(8)]
+    # Eye metrics written to the summaries, per DQ lane
+    summaryKeys = ['eye height', 'eye width', 'jitter', 'top margin', 'bottom margin', 'left margin', 'right margin']
+
+    def __init__(self, projectDir, plotflag, jobs=1, unitNames=None, summaryflag=1, config=None):
         self.use_adjust = 0
+        self.use_cache = 1      # reuse parsed waveforms from <rawfile>.npz
         self.plotflag = plotflag
         self.interfaces = []
         self.projectDir = projectDir
         self.configFile = self.projectDir + '/models/' + 'interface.md'
-        self.readConfig(self.configFile)
-        thisInterface = self.interfaces[-1]
-        for thisByte in thisInterface.byte:
-            rawfile = self.projectDir + '/data/byte' + thisByte.byteID + '_rd.raw'
-            self.readRaw(thisByte, rawfile)
-            self.procRaw(thisByte, rawfile)
-            rawfile = self.projectDir + '/data/byte' + thisByte.byteID + '_wt.raw'
-            self.readRaw(thisByte, rawfile)
-            self.procRaw(thisByte, rawfile)
+        self.readConfig(self.configFile, config)
+        self.rawVariables = self.readSignalManifest(self.projectDir + '/decks/manifest.json')
+        # Each (interface, byte, rd/wt) raw file is an independent unit of work
+        units = []
+        for thisInterface in self.interfaces:
+            prefix = self.config.unitPrefix(thisInterface)     # '' with a single interface
+            for thisByte in thisInterface.byte:
+                for deckType in ['rd', 'wt']:
+                    units.append((thisInterface, thisByte, deckType, self.projectDir + '/data/' + prefix + 'byte' + thisByte.byteID + '_' + deckType + '.raw'))
+        # unitNames (e.g. ['byte0_rd']) selects the units to process, the others keep their last results
+        todo = [unit for unit in units if unitNames is None or self.unitName(unit) in unitNames]
+        if unitNames is not None and not len(todo) == len(unitNames):
+            print('Error: Cannot find all of the units %s.' % (','.join(unitNames)))
+            raise SystemExit(1)
+        if jobs > 1 and len(todo) > 1:
+            with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as executor:
+                futures = [executor.submit(procRawJob, self, thisInterface, thisByte, rawfile) for thisInterface, thisByte, deckType, rawfile in todo]
+                results = [future.result() for future in futures]
+        else:
+            results = [procRawJob(self, thisInterface, thisByte, rawfile) for thisInterface, thisByte, deckType, rawfile in todo]
+        for i in range(len(todo)):
+            self.writeUnitSummary(self.unitPath(todo[i]) + '/eye_summary.txt', todo[i], results[i])
+        if len(results) > 0 and unitNames is None:
+            # DQS crossings of the last unit processed. Not with --units: asiv-flow.py runs
+            # such processes in parallel in the same folder (each lane folder has its triggers).
+            fout = open('trigger.txt', 'w')
+            for t in results[-1]['trigger']:
+                fout.writelines('%.6e\n' % (t))
+            fout.close()
+        if summaryflag:
+            self.writeSummary(self.projectDir + '/data/eye_summary.txt', units)
                 
-    def readConfig(self, file):
-        self.modelPath = self.projectDir + '/models/'
+    def readConfig(self, file, config=None):
+        # interface.md is parsed by asiv_config (or given, already parsed). The eye
+        # mask only depends on the interface, so it is set up once here.
+        if config is None:
+            config = asiv_config.Config(file)
+        self.config = config
+        self.modelPath = config.modelPath
         logging.debug('D001: Model Path is %s'%(self.modelPath))
-        num_ddr = 0
-        infile = open(file, 'r')
-        for line in infile:
-            if 'DDR {' in line:
-                num_ddr = num_ddr + 1
-                # Parse for ID, Type, Component information
-                line_ID = next(infile)
-                logging.debug ('Component ID is ' + line_ID)
-                if not 'ID' in line_ID:
-                    print ('E001: Cannot find DDR ID')
-                else:
-                    self.interfaces.append(DDR(line_ID.split()[1]))
-                    thisInterface = self.interfaces[-1]
-                    logging.debug ('Interface ID is ' + thisInterface.interfaceID)
-                line_type = next(infile)
-                if not 'Type' in line_type:
-                    print ('E002: Cannot find DDR Type')
-                else:
-                    thisInterface.ddrType = line_type.split()[1]
-                    clkfreq = (line_type.split()[2][:-3]).split('.')[0]
-                    print(clkfreq)
-                    thisInterface.dataRate = self.getDatarate(clkfreq)
-                    logging.debug ('Interface data rate is ' + thisInterface.dataRate)
-            if 'Byte {' in line:
-                thisInterface.numByte += 1
-                nextline = next(infile)
-                byte_id = nextline.split()[-1]
-                thisInterface.byte.append(Byte(byte_id))
-                
-        logging.debug('Number of DDR is ' + str(num_ddr))
-        logging.debug('Number of Byte is ' + str(thisInterface.numByte))
-        
+        self.interfaces = config.interfaces
+        for thisInterface in self.interfaces:
+            self.geteyemask(thisInterface, thisInterface.ddrType, int(thisInterface.dataRate) * 1e6)
+        logging.debug('Number of DDR is ' + str(len(self.interfaces)))
+        logging.debug('Number of Byte is ' + str(self.interfaces[-1].numByte))
+
+    def readSignalManifest(self, manifestfile):
+        # Deck name (e.g. 'byte0_rd') <-> variables saved in its raw file, as written by spgen
+        rawVariables = {}
+        if not os.path.isfile(manifestfile):
+            return rawVariables
+        try:
+            with open(manifestfile, 'r') as f:
+                manifest = json.load(f)
+            for entry in manifest['decks']:
+                if 'signals' in entry:
+                    rawVariables[os.path.splitext(os.path.basename(entry['deck']))[0]] = entry['signals']
+        except (ValueError, KeyError):
+            print('Warning: Cannot read deck manifest %s.' % (manifestfile))
+        return rawVariables
+
     def readRaw(self, thisByte, rawfile):
-        thisByte.wfm_time = []
-        thisByte.wfm_dq0 = []
-        thisByte.wfm_dq1 = []
-        thisByte.wfm_dq2 = []
-        thisByte.wfm_dq3 = []
-        thisByte.wfm_dq4 = []
-        thisByte.wfm_dq5 = []
-        thisByte.wfm_dq6 = []
-        thisByte.wfm_dq7 = []
-        thisByte.wfm_dqsp = []
-        thisByte.wfm_dqsn = []
-        with open(rawfile, 'r') as f:
-            flag = 0
-            for line in f:
-                if line.startswith('Values:'):
-                    flag = 1
-                    continue
-                if flag == 1:   
-                    if not len(line.split()) == 2:
-                        print('Error reading raw file!')
-                    timestep = line.split()[0]
-                    thisByte.wfm_time.append(float(line.split()[1]))
-                    nextline = next(f)
-                    thisByte.wfm_dq0.append(float(nextline.split()[0]))
-                    nextline = next(f)
-                    thisByte.wfm_dq1.append(float(nextline.split()[0]))
-                    nextline = next(f)
-                    thisByte.wfm_dq2.append(float(nextline.split()[0]))
-                    nextline = next(f)
-                    thisByte.wfm_dq3.append(float(nextline.split()[0]))
-                    nextline = next(f)
-                    thisByte.wfm_dq4.append(float(nextline.split()[0]))
-                    nextline = next(f)
-                    thisByte.wfm_dq5.append(float(nextline.split()[0]))
-                    nextline = next(f)
-                    thisByte.wfm_dq6.append(float(nextline.split()[0]))
-                    nextline = next(f)
-                    thisByte.wfm_dq7.append(float(nextline.split()[0]))
-                    nextline = next(f)
-                    thisByte.wfm_dqsp.append(float(nextline.split()[0]))
-                    nextline = next(f)
-                    thisByte.wfm_dqsn.append(float(nextline.split()[0]))
-                    for i in range(8): nextline = next(f)   # skip dq*_dig_out
-            #print((thisByte.wfm_dqsn[0:10]))
-
-    def procRaw(self, thisByte, rawfile):
+        # Only the columns needed for the eye analysis are kept, as views into one array
+        names = [name for attr, name in self.rawSignals]
+        wfm = self.readRawCached(rawfile, names)
+        for i in range(len(self.rawSignals)):
+            setattr(thisByte, self.rawSignals[i][0], wfm[:, i])
+            
+    def readRawCached(self, rawfile, columns):
+        # The parsed waveforms of an ASCII raw file are cached next to it in
+        # <rawfile>.npz, keyed by the raw file size, mtime and content hash.
+        # The raw file is only hashed again when its mtime has changed.
+        cachefile = rawfile + '.npz'
+        with open(rawfile, 'rb') as f:
+            header = self.readRawHeader(f)
+        if self.use_cache == 0 or not header['format'] == 'ascii':
+            return self.readRawValues(rawfile, columns)
+        stat = os.stat(rawfile)
+        wfm = None
+        rawhash = ''
+        if os.path.isfile(cachefile):
+            try:
+                with np.load(cachefile) as cache:   # the arrays are read into memory, the file is closed
+                    if cache['names'].tolist() == list(columns) and int(cache['size']) == stat.st_size:
+                        if float(cache['mtime']) == stat.st_mtime:
+                            logging.debug('Using cached waveforms %s' % (cachefile))
+                            return cache['wfm']
+                        rawhash = self.fileHash(rawfile)
+                        if str(cache['hash']) == rawhash:
+                            wfm = cache['wfm']      # touched but not changed: refresh the cached mtime
+            except Exception:
+                print('Warning: Cannot read waveform cache %s.' % (cachefile))
+        if wfm is None:
+            wfm = self.readRawValues(rawfile, columns)
+        if rawhash == '':
+            rawhash = self.fileHash(rawfile)
+        try:
+            tmpfile = cachefile + '.tmp'
+            with open(tmpfile, 'wb') as f:
+                np.savez(f, wfm=wfm, names=np.array(list(columns)), size=stat.st_size,
+                         mtime=stat.st_mtime, hash=np.array(rawhash))
+            os.replace(tmpfile, cachefile)
+        except OSError:
+            print('Warning: Cannot write waveform cache %s.' % (cachefile))
+        return wfm
+
+    def fileHash(self, file):
+        h = hashlib.sha1()
+        with open(file, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                h.update(chunk)
+        return h.hexdigest()
+
+    def readRawHeader(self, f):
+        # Parse the raw file header up to (and including) the 'Values:' or 'Binary:' line.
+        # f is opened in binary mode so that the offset of the data block is known.
+        header = {'variables': [], 'points': 0, 'flags': '', 'format': '', 'offset': 0}
+        invars = False
+        for line in f:
+            line = line.decode('latin-1')
+            if line.startswith('Values:'):
+                header['format'] = 'ascii'
+                break
+            if line.startswith('Binary:'):
+                header['format'] = 'binary'
+                break
+            if line.startswith('No. Points:'):
+                header['points'] = int(line.split(':')[1])
+            elif line.startswith('Flags:'):
+                header['flags'] = line.split(':')[1].strip().lower()
+            elif line.startswith('Variables:'):
+                invars = True
+                line = line.split(':', 1)[1]
+            if invars:
+                words = line.split()
+                if len(words) >= 2 and words[0].isdigit():
+                    header['variables'].append(words[1])
+        header['offset'] = f.tell()
+        if len(header['variables']) == 0:
+            deckname = os.path.basename(f.name).split('.')[0]
+            header['variables'] = list(self.rawVariables.get(deckname, self.rawDefaultVariables))
+        return header
+
+    def readRawValues(self, rawfile, columns=None):
+        # Return the waveforms as a (n_points x n_vars) array.
+        # ASCII: the 'Values:' block is parsed in bulk. Each point is stored as
+        #        '<index> <time>' followed by one value per variable.
+        # Binary: the file is memory-mapped, n_vars float64 values per point, so
+        #        nothing is read into memory until a waveform is actually used.
+        with open(rawfile, 'rb') as f:
+            header = self.readRawHeader(f)
+            if header['format'] == 'ascii':
+                values = np.fromstring(f.read().decode('latin-1'), dtype=np.float64, sep=' ')
+        names = [name.lower() for name in header['variables']]
+        if 'complex' in header['flags']:
+            print('Error: Complex raw file is not supported: %s' % (rawfile))
+            raise SystemExit
+        if header['format'] == 'ascii':
+            stride = len(names) + 1
+            npoint = len(values) // stride
+            if not len(values) == npoint * stride or (header['points'] and not npoint == header['points']):
+                print('Error reading raw file!')
+            values = values[:npoint*stride].reshape(npoint, stride)[:, 1:]
+        elif header['format'] == 'binary':
+            stride = len(names) * 8
+            npoint = (os.path.getsize(rawfile) - header['offset']) // stride
+            if header['points'] and not npoint == header['points']:
+                print('Error reading raw file!')
+                npoint = min(npoint, header['points'])
+            values = np.memmap(rawfile, dtype='<f8', mode='r', offset=header['offset'], shape=(npoint, len(names)))
+        else:
+            print('Error: Cannot find "Values:" or "Binary:" in raw file %s.' % (rawfile))
+            raise SystemExit
+        if columns is None:
+            return values
+        cols = []
+        for name in columns:
+            if not name.lower() in names:
+                print('Error: Cannot find signal %s in raw file %s.' % (name, rawfile))
+                raise SystemExit
+            cols.append(names.index(name.lower()))
+        if cols == list(range(cols[0], cols[0] + len(cols))):
+            return values[:, cols[0]:cols[0]+len(cols)]     # consecutive columns: a view, no copy
+        return values[:, cols]
+
+    def procRaw(self, thisInterface, thisByte, rawfile):
         path, filename = os.path.split(rawfile)
         resultfolder = path + '/' + filename.split('.')[0]
         try:
             os.mkdir(resultfolder)
         except:
             pass
-        wfm_dqs = []
-        for i in range(len(thisByte.wfm_dqsp)):
-            wfm_dqs.append(thisByte.wfm_dqsp[i] - thisByte.wfm_dqsn[i])
-        datarate = int(self.interfaces[0].dataRate) * 1e6
-        self.geteyemask(self.interfaces[0], self.interfaces[0].ddrType, datarate)
-        vref = self.interfaces[0].vref
-        self.eye(thisByte.wfm_dq0, wfm_dqs, thisByte.wfm_time, datarate, vref, self.interfaces[0].eyemask, resultfolder+'/DQ0')
-        self.eye(thisByte.wfm_dq1, wfm_dqs, thisByte.wfm_time, datarate, vref, self.interfaces[0].eyemask, resultfolder+'/DQ1')
-        self.eye(thisByte.wfm_dq2, wfm_dqs, thisByte.wfm_time, datarate, vref, self.interfaces[0].eyemask, resultfolder+'/DQ2')
-        self.eye(thisByte.wfm_dq3, wfm_dqs, thisByte.wfm_time, datarate, vref, self.interfaces[0].eyemask, resultfolder+'/DQ3')
-        self.eye(thisByte.wfm_dq4, wfm_dqs, thisByte.wfm_time, datarate, vref, self.interfaces[0].eyemask, resultfolder+'/DQ4')
-        self.eye(thisByte.wfm_dq5, wfm_dqs, thisByte.wfm_time, datarate, vref, self.interfaces[0].eyemask, resultfolder+'/DQ5')
-        self.eye(thisByte.wfm_dq6, wfm_dqs, thisByte.wfm_time, datarate, vref, self.interfaces[0].eyemask, resultfolder+'/DQ6')
-        self.eye(thisByte.wfm_dq7, wfm_dqs, thisByte.wfm_time, datarate, vref, self.interfaces[0].eyemask, resultfolder+'/DQ7')
+        wfm_dqs = thisByte.wfm_dqsp - thisByte.wfm_dqsn
+        datarate = int(thisInterface.dataRate) * 1e6
+        vref = thisInterface.vref
+        ctx = self.eyeContext(wfm_dqs, thisByte.wfm_time, datarate)
+        thisByte.wfm_alldq_dq = np.vstack([thisByte.wfm_dq0, thisByte.wfm_dq1, thisByte.wfm_dq2, thisByte.wfm_dq3,
+                                           thisByte.wfm_dq4, thisByte.wfm_dq5, thisByte.wfm_dq6, thisByte.wfm_dq7])
+        result = {}
+        result['trigger'] = ctx.dqs_crossings
+        result['lanes'] = self.eye(thisByte.wfm_alldq_dq, ctx, vref, thisInterface.eyemask, thisInterface.skew_dq_dqs, [resultfolder+'/DQ%d' % (i) for i in range(8)])
         #print(resultfolder)
-        
-    def eye(self, dq, dqs, t, datarate, vref, eyemask, path):
-        try:
-            os.mkdir(path)
-        except:
-            pass
-        ui = 1/datarate
-        # interplate waveform
-        dt = 1e-12
-        t_intp = np.arange(t[0], t[-1]+1e-14, dt)
-        dq = np.interp(t_intp, t, dq)
-        dqs = np.interp(t_intp, t, dqs)
-        #plt.plot(t_intp, dq)
-        #plt.plot(t_intp, dqs)
-        #plt.show()
+        return result
 
-        # build a 1d histrogram
-        num_bins = 256
-        [histo, histo_value] = np.histogram(dq, bins=num_bins)
-        histo = histo.tolist()
-        histo_value = histo_value.tolist()
+    def unitName(self, unit):
+        thisInterface, thisByte, deckType, rawfile = unit
+        return self.config.unitPrefix(thisInterface) + 'byte' + thisByte.byteID + '_' + deckType
 
-        # find the range where data starts and stops in histogram
-        for a in range(num_bins):
-            if histo[a] != 0:
-                start = a
-                break
-        for a in range(num_bins-1, 0, -1):
-            if histo[a] != 0:
-                stop = a
-                break
-        #plt.hist(dq, bins=256)
-        #plt.show()
+    def unitPath(self, unit):
+        # Result folder of a unit, as created by procRaw
+        thisInterface, thisByte, deckType, rawfile = unit
+        path, filename = os.path.split(rawfile)
+        return path + '/' + filename.split('.')[0]
+
+    def writeUnitSummary(self, file, unit, result):
+        # One line per DQ lane with the eye metrics of one (interface, byte, rd/wt) unit
+        thisInterface, thisByte, deckType, rawfile = unit
+        f = open(file, 'w')
+        f.write('ddr\tbyte\tdir\tlane\t%s\n' % ('\t'.join([key.replace(' ', '_') for key in self.summaryKeys])))
+        for lane in result['lanes']:
+            f.write('%s\t%s\t%s\t%s' % (thisInterface.interfaceID, thisByte.byteID, deckType, lane['lane']))
+            for key in self.summaryKeys:
+                f.write('\t%.6e' % (lane[key]))
+            f.write('\n')
+        f.close()
 
-        # Determine the range of data, and define threshholds
-        mid = int((start + stop) / 2) + 1
-        high = histo_value[histo.index(max(histo[mid:stop]))+1]
-        low = histo_value[histo.index(max(histo[start:mid]))+1]
-        waverange = high - low
-        mid = (high + low) / 2 
-        lowthresh = .3 * waverange + low
-        highthresh = .7 * waverange + low
-        print('high, low, mid, range: ', high, low, mid, waverange)
+    def writeSummary(self, file, units):
+        # The eye metrics of all units, from their own summaries. Units that were
+        # never processed are left out. Written to a temporary file first, so that
+        # readers never see a partial summary.
+        tmpfile = '%s.%d.tmp' % (file, os.getpid())
+        f = open(tmpfile, 'w')
+        f.write('ddr\tbyte\tdir\tlane\t%s\n' % ('\t'.join([key.replace(' ', '_') for key in self.summaryKeys])))
+        for unit in units:
+            unitfile = self.unitPath(unit) + '/eye_summary.txt'
+            if not os.path.isfile(unitfile):
+                print('Warning: No eye results for %s.' % (self.unitName(unit)))
+                continue
+            with open(unitfile, 'r') as uf:
+                f.writelines(uf.readlines()[1:])
+        f.close()
+        os.replace(tmpfile, file)
 
-        # Find the rise/fall edges of DQ
-        dq_edges = self.edge(dq, mid, highthresh, lowthresh)
-        #print (len(dq_edges), dq_edges)
+    def eyeContext(self, dqs, t, datarate):
+        # The DQS trigger points are the same for all DQ lanes of a byte, so they
+        # are computed once per byte. Waveforms are analyzed on the simulator time
+        # points; crossing times are interpolated between them.
+        ctx = EyeContext()
+        ctx.ui = 1/datarate
+        ctx.t = np.asarray(t)
+        ctx.dqs = np.asarray(dqs)
 
         # Find the zero-crossing of DQS
-        dqs_crossings = self.edge(dqs, 0, 0.1, -0.1)
-        print ('number of trigger point: %d' % (len(dqs_crossings)))
-        fout = open('trigger.txt', 'w')
-        for t in dqs_crossings:
-            fout.writelines('%.6e\n' % (t_intp[t]))
-        fout.close()
-        #for a in dqs_crossings: print ('%.6e'%(t_intp[a]))
-
-        # Plot eye
+        ctx.dqs_crossings = self.crossingTime(ctx.t, ctx.dqs[None, :], 0, 0.1, -0.1)[1]
+        print ('number of trigger point: %d' % (len(ctx.dqs_crossings)))
+
         # Adjust for DQS delay
-        dqs_delay = ui/2
-        for i in range(len(dqs_crossings)):
-            dqs_crossings[i] = dqs_crossings[i] + int(dqs_delay/dt)
+        dqs_delay = ctx.ui/2
+        ctx.triggers = ctx.dqs_crossings + dqs_delay
+        return ctx
+
+    def eye(self, dq, ctx, vref, eyemask, skew, paths):
+        # dq is a (lanes x samples) array with all DQ lanes of a byte; paths has
+        # one result folder per lane. All lanes are processed together.
+        # Each UI is the window [trigger-ui, trigger+ui) in time.
+        for path in paths:
+            try:
+                os.mkdir(path)
+            except:
+                pass
+        ui = ctx.ui
+        t = ctx.t
+        dq = np.asarray(dq)
+        #plt.plot(t, dq[0])
+        #plt.plot(t, ctx.dqs)
+        #plt.show()
+
         # Trigger DQ using DQS zero-crossing points
-        eyedata = []    # 2D list to store eye diagram data, each list is a UI.
-        for trigger in dqs_crossings:
-            start = trigger - int((ui)/dt)
-            stop = trigger + int((ui)/dt)
-            #print (start, stop)
-            if start < 0: start=0
-            if stop > len(t_intp)-1: stop = len(t_intp)-1
-            eyedata.append(dq[start:stop])
-            
+        dqs_crossings = ctx.triggers
+        nlane = len(dq)
+        ntrig = len(dqs_crossings)
+
         # Find vref crossing (to determine jitter)
-        vref_crossing = []
-        xmax = 0
-        xmin = 1e6
-        for i in range(len(eyedata)):
-            tmp = self.edge(eyedata[i], vref, vref+0.1, vref-0.1)
-            if not tmp == []:
-                for t in tmp:
-                    if t > int(ui/dt) and t > xmax: 
-                        xmax = t
-                    if t > int(ui/dt) and t < xmin: 
-                        xmin = t
-                vref_crossing.append(tmp)
-#       if xmin < 0.5*len(eyedata[0]):
-#           xmin = xmin + len(eyedata[0])
-        print('xmax, xmin: ', xmax, xmin)
-        jitter = (xmax - xmin) * dt
-        adjust = int(ui/dt) - xmax + int((xmax-xmin)/2)
-        left_margin = eyemask[0][0] - (xmax*dt - ui)
-        right_margin = xmin*dt - eyemask[3][0]
-        print('Jitter: %.4e'%(jitter))
-        print('left margin, right margin: ', left_margin, right_margin)
+        # xmax/xmin: latest/earliest vref crossing in the second half of a UI
+        # window, as time from the start of the window.
+        lanes, tcross = self.crossingTime(t, dq, vref, vref+0.1, vref-0.1)
+        xmax = np.zeros(nlane)
+        xmin = np.full(nlane, 1e-6)
+        if ntrig > 0:
+            k = np.searchsorted(dqs_crossings, tcross, 'left') - 1
+            for j in range(2):      # windows overlap, a crossing can be late in two of them
+                kj = k - j
+                ok = kj >= 0
+                x = tcross[ok] - dqs_crossings[kj[ok]] + ui
+                late = (x > ui) & (x < 2*ui)
+                np.maximum.at(xmax, lanes[ok][late], x[late])
+                np.minimum.at(xmin, lanes[ok][late], x[late])
+        jitter = xmax - xmin
+        adjust = ui - xmax + (xmax - xmin)/2
+        left_margin = eyemask[0][0] - (xmax - ui)
+        right_margin = xmin - eyemask[3][0]
         # Adjust eye data to the center of UI
         if self.use_adjust == 0:
-            adjust = 0
-        eyedata = []
-        for trigger in dqs_crossings:
-            start = trigger - int((ui)/dt) - adjust
-            stop = trigger + int((ui)/dt) - adjust
-            if start < 0: start=0
-            if stop > len(t_intp)-1: stop = len(t_intp)-1
-            eyedata.append(dq[start:stop])
-            if self.plotflag:
-                plt.plot(dq[start:stop], color='blue')
+            adjust = np.zeros(nlane)
         # find eye height, eye width
-        min_high = 2*vref
-        max_low = 0.0
-        for eyedata_per_ui in eyedata:
-            temp = eyedata_per_ui[int(eyemask[1][0]/dt):int(eyemask[2][0]/dt)]
-            for data in temp:
-                if data >= vref:
-                    if data < min_high: min_high = data
-                if data < vref:
-                    if data > max_low:  max_low = data
-        print('min_high, max_low: ', min_high, max_low)
+        windowstart = dqs_crossings[None, :] - ui - adjust[:, None]
+        min_high, max_low = self.eyeHeight(t, dq, windowstart + eyemask[1][0], windowstart + eyemask[2][0], vref)
         eyeheight = min_high - max_low
         eyewidth = ui - jitter
         top_margin = min_high - eyemask[1][1]
         bottom_margin = eyemask[5][1] - max_low
-        print('eye height: ', eyeheight)
-        print('eye width: ', eyewidth)
-        # plot eye mask
-        eyemask_t = []
-        eyemask_v = []
-        for point in eyemask:
-            eyemask_t.append(int(point[0]/dt + adjust))
-            eyemask_v.append(point[1])
-        if self.plotflag:
-            plt.plot(eyemask_t, eyemask_v, color='red', linewidth=2)        
-            plt.savefig(path+'/eye.png')
-            plt.close()
-        
-        # output to files
-        f1 = open(path+'/trigger.txt', 'w')
-        f1.write('UI: %.6e\n' % (ui))
-        f1.write('Adjust: %.6e\n' % (adjust*dt))
-        f1.write('Trigger: \n')
-        for trigger in dqs_crossings:
-             f1.write('%.6e\n' % ((trigger)*dt))
-        f1.close()
-        f2 = open(path+'/eye_parameter.txt', 'w')
-        f2.write('ui: %.6e\n' % (ui))
-        f2.write('minimun HIGH: %.6e\n' % (min_high))
-        f2.write('maximum LOW: %.6e\n' % (max_low))
-        f2.write('eye height: %.6e\n' % (eyeheight))
-        f2.write('eye width: %.6e\n' % (eyewidth))
-        f2.write('jitter: %.6e\n' % (jitter))
-        f2.write('top margin: %.6e\n' % (top_margin))
-        f2.write('bottom margin: %.6e\n' % (bottom_margin))
-        f2.write('left margin: %.6e\n' % (left_margin))
-        f2.write('right margin: %.6e\n' % (right_margin))
-        f2.write('eye mask: \n')
-        for i in range(6):
-            f2.write('%.6e\t%.6e\n' % (eyemask[i][0], eyemask[i][1]))
-        f2.write('skew spec DQ-DQS routing: %.6e\n' % (self.interfaces[0].skew_dq_dqs))
-        f2.close()              
+
+        results = []
+        for i in range(nlane):
+            path = paths[i]
+            print('xmax, xmin: ', xmax[i], xmin[i])
+            print('Jitter: %.4e'%(jitter[i]))
+            print('left margin, right margin: ', left_margin[i], right_margin[i])
+            print('min_high, max_low: ', min_high[i], max_low[i])
+            print('eye height: ', eyeheight[i])
+            print('eye width: ', eyewidth[i])
+            if self.plotflag:
+                for k in range(ntrig):
+                    s, e = np.searchsorted(t, [windowstart[i, k], windowstart[i, k] + 2*ui])
+                    plt.plot(t[s:e] - windowstart[i, k], dq[i, s:e], color='blue')
+            # plot eye mask
+            eyemask_t = []
+            eyemask_v = []
+            for point in eyemask:
+                eyemask_t.append(point[0] + adjust[i])
+                eyemask_v.append(point[1])
+            if self.plotflag:
+                plt.plot(eyemask_t, eyemask_v, color='red', linewidth=2)        
+                plt.savefig(path+'/eye.png')
+                plt.close()
+            
+            # output to files
+            f1 = open(path+'/trigger.txt', 'w')
+            f1.write('UI: %.6e\n' % (ui))
+            f1.write('Adjust: %.6e\n' % (adjust[i]))
+            f1.write('Trigger: \n')
+            for trigger in dqs_crossings:
+                 f1.write('%.6e\n' % (trigger - t[0]))
+            f1.close()
+            f2 = open(path+'/eye_parameter.txt', 'w')
+            f2.write('ui: %.6e\n' % (ui))
+            f2.write('minimun HIGH: %.6e\n' % (min_high[i]))
+            f2.write('maximum LOW: %.6e\n' % (max_low[i]))
+            f2.write('eye height: %.6e\n' % (eyeheight[i]))
+            f2.write('eye width: %.6e\n' % (eyewidth[i]))
+            f2.write('jitter: %.6e\n' % (jitter[i]))
+            f2.write('top margin: %.6e\n' % (top_margin[i]))
+            f2.write('bottom margin: %.6e\n' % (bottom_margin[i]))
+            f2.write('left margin: %.6e\n' % (left_margin[i]))
+            f2.write('right margin: %.6e\n' % (right_margin[i]))
+            f2.write('eye mask: \n')
+            for k in range(6):
+                f2.write('%.6e\t%.6e\n' % (eyemask[k][0], eyemask[k][1]))
+            f2.write('skew spec DQ-DQS routing: %.6e\n' % (skew))
+            f2.close()              
+
+            result = {'lane': os.path.basename(path)}
+            result['minimum HIGH'] = min_high[i]
+            result['maximum LOW'] = max_low[i]
+            result['eye height'] = eyeheight[i]
+            result['eye width'] = eyewidth[i]
+            result['jitter'] = jitter[i]
+            result['top margin'] = top_margin[i]
+            result['bottom margin'] = bottom_margin[i]
+            result['left margin'] = left_margin[i]
+            result['right margin'] = right_margin[i]
+            results.append(result)
+        return results
+
+    def eyeHeight(self, t, dq, start, stop, vref, perui=0):
+        # Minimum HIGH and maximum LOW of each lane (rows of dq) inside the eye
+        # mask windows [start, stop] (lanes x triggers, in time). The waveform is
+        # piecewise linear, so the extremes are at the simulator time points
+        # inside a window or at its interpolated end points; a window in which the
+        # waveform crosses vref gives vref for both. Returns one value per lane, or
+        # with perui=1 one value per lane and UI (lanes x triggers) for statistical
+        # analysis. As before, results are bounded by 2*vref (HIGH) and 0.0 (LOW).
+        start = np.maximum(start, t[0])
+        stop = np.minimum(stop, t[-1])
+        min_high = np.full(start.shape, 2*vref)
+        max_low = np.zeros(start.shape)
+        if start.shape[1] > 0:
+            for i in range(len(dq)):
+                s = np.searchsorted(t, start[i], 'left')
+                e = np.searchsorted(t, stop[i], 'right')
+                empty = ~(s < e)
+                idx = np.vstack([s, e]).T.ravel()     # reduce over [s, e), skip [e, next s)
+                data = np.append(dq[i], dq[i][-1])
+                highs = np.where(data >= vref, data, 2*vref)
+                lows = np.where(data < vref, data, 0.0)
+                min_high[i] = np.where(empty, 2*vref, np.minimum.reduceat(highs, idx)[::2])
+                max_low[i] = np.where(empty, 0.0, np.maximum.reduceat(lows, idx)[::2])
+                wmin = np.where(empty, np.inf, np.minimum.reduceat(data, idx)[::2])
+                wmax = np.where(empty, -np.inf, np.maximum.reduceat(data, idx)[::2])
+                for edge in [start[i], stop[i]]:
+                    v = np.interp(edge, t, dq[i])
+                    min_high[i] = np.where(v >= vref, np.minimum(min_high[i], v), min_high[i])
+                    max_low[i] = np.where(v < vref, np.maximum(max_low[i], v), max_low[i])
+                    wmin = np.minimum(wmin, v)
+                    wmax = np.maximum(wmax, v)
+                cross = (wmin < vref) & (wmax >= vref)
+                min_high[i][cross] = vref
+                max_low[i][cross] = vref
+            outside = start > stop
+            min_high[outside] = 2*vref
+            max_low[outside] = 0.0
+            min_high = np.minimum(min_high, 2*vref)
+            max_low = np.maximum(max_low, 0.0)
+        if perui:
+            return min_high, max_low
+        return min_high.min(axis=-1, initial=2*vref), max_low.max(axis=-1, initial=0.0)
+
+    def crossingTime(self, t, data, mid, high, low):
+        # Edges of every row of data (see edge()), as (row, time) arrays. The time
+        # is linearly interpolated between the simulator time points around the edge.
+        rows, a = self.edgeRows(data, mid, high, low)
+        v0 = data[rows, a-1]
+        v1 = data[rows, a]
+        return rows, t[a-1] + (mid - v0) / (v1 - v0) * (t[a] - t[a-1])
 
     def geteyemask(self, thisInterface, ddrtype, datarate):
+        thisInterface.eyemask = []
         # set vref
         if ddrtype.lower() == 'ddr3':
             thisInterface.vref = 0.75
@@ -353,85 +549,99 @@ class Pproc:
 
     def edge(self, data, mid, high, low):
         # Find Edges
-        var1 = []
+        # A mid crossing is only counted once the signal has re-armed by going
+        # above 'high' or below 'low' after the previous crossing. Instead of
+        # walking every sample, jump from edge to edge with next-index tables.
         data = np.asarray(data)
+        n = len(data)
+        if n == 0: return np.array([], dtype=int)
         gtmid = data > mid
-        gthigh = data > high
-        gtlow = data < low
-        if len(gtmid) == 0: return []
-        #print('size of gtmid', len(gtmid))
+        nextHigh = self.nextTrueIndex(gtmid)
+        nextLow = self.nextTrueIndex(~gtmid)
+        nextRearm = self.nextTrueIndex((data > high) | (data < low))
+
+        var1 = []
         temp = gtmid[0]
-        cross = False
-
-        for a in range(len(gtmid)):
-            if cross == False:
-                if temp != gtmid[a]:
-                    temp = gtmid[a]
-                    var1.append(a)
-                    cross = True
-            else:
-                if cross == gthigh[a] or cross == gtlow[a]:
-                    cross = False
-        return var1
-
-    def getDatarate(self, clkfreq):
-        clkfreq = float(clkfreq)
-        if clkfreq > 800/2*0.95 and clkfreq < 800/2*1.05:
-            return '800'
-        if clkfreq > 1066/2*0.95 and clkfreq < 1066/2*1.05:
-            return '1066'
-        if clkfreq > 1333/2*0.95 and clkfreq < 1333/2*1.05:
-            return '1333'
-        if clkfreq > 1600/2*0.95 and clkfreq < 1600/2*1.05:
-            return '1600'
-        if clkfreq > 1866/2*0.95 and clkfreq < 1866/2*1.05:
-            return '1866'
-        
-class DDR:
-    def __init__ (self, id):
-        self.interfaceID = id
-        self.ddrType = ''
-        self.dateRate = ''
-        self.comps = []
-        self.byte = []
-        self.ctrl = []
-        self.numByte = 0
-        self.eyemask = []
-        self.vref = 0.0
-        self.skew_dq_dqs = 0
-
-class Byte:
-    def __init__ (self, id):
-        self.byteID = id
-        self.wfm_time = []
-        self.wfm_dq0 = []
-        self.wfm_dq1 = []
-        self.wfm_dq2 = []
-        self.wfm_dq3 = []
-        self.wfm_dq4 = []
-        self.wfm_dq5 = []
-        self.wfm_dq6 = []
-        self.wfm_dq7 = []
-        self.wfm_dqsp = []
-        self.wfm_dqsn = []
-        self.wfm_alldq_time = []
-        self.wfm_alldq_dq = []
-        self.wfm_alldq_dqs = []
-        
-class Signal:
-    def __init__ (self, id):
-        self.sigID = id
-        self.socPin = ''
-        self.ddrPin = []
+        a = 0
+        while True:
+            a = nextLow[a] if temp else nextHigh[a]
+            if a >= n: break
+            var1.append(a)
+            temp = not temp
+            a = nextRearm[a+1] + 1
+            if a >= n: break
+        return np.array(var1, dtype=int)
+
+    def edgeRows(self, data, mid, high, low):
+        # Same as edge() applied to each row of a 2D array, with all rows advanced
+        # together one edge at a time. Returns the (row, index) of every edge.
+        data = np.asarray(data)
+        nrow, n = data.shape
+        if nrow == 0 or n == 0: return np.array([], dtype=int), np.array([], dtype=int)
+        gtmid = data > mid
+        nextHigh = self.nextTrueIndex(gtmid)
+        nextLow = self.nextTrueIndex(~gtmid)
+        nextRearm = self.nextTrueIndex((data > high) | (data < low))
+
+        var1 = []
+        var2 = []
+        rows = np.arange(nrow)
+        temp = gtmid[:, 0]
+        a = np.zeros(nrow, dtype=int)
+        while len(rows) > 0:
+            a = np.where(temp, nextLow[rows, a], nextHigh[rows, a])
+            keep = a < n
+            rows, a, temp = rows[keep], a[keep], temp[keep]
+            var1.append(rows)
+            var2.append(a)
+            temp = ~temp
+            a = nextRearm[rows, a+1] + 1
+            keep = a < n
+            rows, a, temp = rows[keep], a[keep], temp[keep]
+        return np.concatenate(var1), np.concatenate(var2)
+
+    def nextTrueIndex(self, mask):
+        # For every index a (along the last axis), the first index >= a where mask is True
+        # (n if none). One extra entry is appended so that index n can be looked up as well.
+        n = mask.shape[-1]
+        pos = np.where(mask, np.arange(n), n)
+        pos = np.minimum.accumulate(pos[..., ::-1], axis=-1)[..., ::-1]
+        return np.concatenate([pos, np.full(mask.shape[:-1] + (1,), n, dtype=pos.dtype)], axis=-1)
+
+def procRawJob(thispproc, thisInterface, thisByte, rawfile):
+    # One (interface, byte, rd/wt) unit of work. Module level so that it can run in a --jobs worker process.
+    thispproc.readRaw(thisByte, rawfile)
+    return thispproc.procRaw(thisInterface, thisByte, rawfile)
+
+class EyeContext:
+    def __init__ (self):
+        self.ui = 0.0
+        self.t = []
+        self.dqs = []
+        self.dqs_crossings = []     # DQS zero-crossing times
+        self.triggers = []          # DQS zero-crossing times delayed by UI/2
         
 if __name__ == "__main__":
     #logging.basicConfig(level=logging.DEBUG)    # uncomment this line to output debug info
-    if not (len(sys.argv) == 2 or len(sys.argv) == 3):
-        print('Error! Usage: python3 pproc.py <path_to_interface_folder>')
+    if not (len(sys.argv) >= 2 and len(sys.argv) <= 8):
+        print('Error! Usage: python3 pproc.py <path_to_interface_folder> [--showplot] [--jobs N] [--units NAME,...] [--nosummary] [--summary]')
         exit()
     plotflag = 0
     if '--showplot' in sys.argv:
         plotflag = 1
+    jobs = 1
+    if '--jobs' in sys.argv:
+        jobs = int(sys.argv[sys.argv.index('--jobs') + 1])     # 0: one job per core
+        if jobs == 0:
+            jobs = os.cpu_count()
+    unitNames = None
+    if '--units' in sys.argv:
+        unitNames = sys.argv[sys.argv.index('--units') + 1].split(',')
+    if '--summary' in sys.argv:
+        unitNames = []
+    summaryflag = 1
+    if '--nosummary' in sys.argv:
+        summaryflag = 0
     projectDir = os.path.abspath(sys.argv[1])
-    thispproc = Pproc(projectDir, plotflag)
+    thispproc = Pproc(projectDir, plotflag, jobs, unitNames, summaryflag)
     
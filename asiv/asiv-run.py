@@ -0,0 +1,201 @@
+######################
+###### ASIV-RUN ######
+######################
+
+# v0.2 (261018)
+# Run the decks in a bounded worker pool: '--jobs N' (default: sized to the cores and the free memory)
+# '--mem GB': memory needed by one simulation, used to size the pool (default 2)
+# Simulator output of each deck is kept in "data/<deck>.log"; failed decks are reported at the end
+# Without "decks/manifest.json", the decks in "decks/" are run without the result cache
+# '--decks byte0_rd,byte0_wt': only run these decks (used by asiv-flow.py)
+
+# v0.1 (261018)
+# Run the simulator on the decks listed in "decks/manifest.json" (written by asiv-spgen.py)
+# Raw results go to "data/byte<ID>_<rd|wt>.raw", where asiv-pproc.py reads them
+# Cache raw results in $ASIV_CACHE/sim (default ~/.asiv/sim), keyed by the hash of the deck,
+#   of every file it includes (subcircuit library, BYTE*.sp, IBIS) and of the simulator command
+
+# TO-DO:
+#
+
+import concurrent.futures
+import glob
+import hashlib
+import json
+import logging
+import os.path
+import shlex
+import shutil
+import subprocess
+import sys
+
+class SimRunner:
+    def __init__(self, projectDir, simCommand, jobs=0, jobMemory=2.0):
+        self.use_cache = 1      # reuse raw results from self.cacheDir
+        self.projectDir = projectDir
+        self.simCommand = simCommand    # e.g. 'simulator -b %(deck)s -o %(raw)s'
+        self.jobs = jobs                # 0: sized to the cores and the free memory
+        self.jobMemory = jobMemory      # GB needed by one simulation
+        self.cacheDir = os.path.join(os.environ.get('ASIV_CACHE', os.path.expanduser('~/.asiv')), 'sim')
+        self.manifestFile = self.projectDir + '/decks/manifest.json'
+        self.dataPath = self.projectDir + '/data'
+        self.fileHashes = {}    # file <-> sha1, each file is hashed once per run
+        self.deckNames = None   # only run these decks (names without '.sp'), None: all
+
+    def findDecks(self):
+        # [(deck, inputs)] from the manifest written by spgen. Without it, every
+        # deck in decks/ is run, but its inputs are unknown: inputs is None.
+        if os.path.isfile(self.manifestFile):
+            with open(self.manifestFile, 'r') as f:
+                return [(entry['deck'], sorted(entry['inputs'])) for entry in json.load(f)['decks']]
+        decks = sorted(glob.glob(self.projectDir + '/decks/*.sp'))
+        if len(decks) == 0:
+            print('ER02: Cannot find any deck in %s/decks. Run asiv-spgen.py first.' % (self.projectDir))
+            raise SystemExit
+        print('Warning: Cannot find deck manifest %s. Simulation cache is not used.' % (self.manifestFile))
+        return [(deck, None) for deck in decks]
+
+    def poolSize(self):
+        if self.jobs > 0:
+            return self.jobs
+        jobs = os.cpu_count() or 1
+        memory = self.freeMemory()
+        if memory > 0 and self.jobMemory > 0:
+            jobs = min(jobs, int(memory / (self.jobMemory * 2**30)))
+        return max(jobs, 1)
+
+    def freeMemory(self):
+        # Bytes available to new processes, 0 if unknown
+        try:
+            with open('/proc/meminfo', 'r') as f:
+                for line in f:
+                    if line.startswith('MemAvailable:'):
+                        return int(line.split()[1]) * 1024
+        except OSError:
+            pass
+        try:
+            return os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE')
+        except (ValueError, OSError, AttributeError):
+            return 0
+
+    def runAll(self):
+        if not os.path.isdir(self.dataPath):
+            os.makedirs(self.dataPath)
+        decks = self.findDecks()
+        if self.deckNames is not None:
+            decks = [(deckfile, inputs) for deckfile, inputs in decks if os.path.splitext(os.path.basename(deckfile))[0] in self.deckNames]
+            if not len(decks) == len(self.deckNames):
+                print('ER05: Cannot find all of the decks %s.' % (','.join(self.deckNames)))
+                raise SystemExit(1)
+        # Keys are computed here, so that each file is hashed once and the workers share no state
+        keys = [self.resultKey(deckfile, inputs) if inputs is not None else '' for deckfile, inputs in decks]
+        jobs = min(self.poolSize(), len(decks))
+        print('Running %d deck(s), %d at a time.' % (len(decks), jobs))
+        # The workers only wait for the simulator processes: threads are enough
+        with concurrent.futures.ThreadPoolExecutor(max_workers=jobs) as executor:
+            futures = [executor.submit(self.runDeck, decks[i][0], keys[i]) for i in range(len(decks))]
+            results = [future.result() for future in futures]
+        failed = [(deckfile, returncode, logfile) for deckfile, returncode, logfile in results if not returncode == 0]
+        for deckfile, returncode, logfile in failed:
+            print('ER03: Simulation of %s failed (exit code %d), see %s.' % (deckfile, returncode, logfile))
+        if len(failed) > 0:
+            raise SystemExit(1)
+
+    def runDeck(self, deckfile, key):
+        # Simulate one deck into data/<deck name>.raw, or reuse the cached result.
+        # Returns (deck, simulator exit code, log file).
+        deckname = os.path.splitext(os.path.basename(deckfile))[0]
+        rawfile = os.path.join(self.dataPath, deckname + '.raw')
+        logfile = os.path.join(self.dataPath, deckname + '.log')
+        cachefile = os.path.join(self.cacheDir, key + '.raw')
+        if self.use_cache == 1 and not key == '' and os.path.isfile(cachefile):
+            print('%s: cached result %s' % (os.path.basename(deckfile), key))
+            self.linkFile(cachefile, rawfile)
+            return (deckfile, 0, logfile)
+        print('%s: simulating' % (os.path.basename(deckfile)))
+        tmpfile = '%s.%d.tmp' % (rawfile, os.getpid())
+        command = [arg % {'deck': deckfile, 'raw': tmpfile} for arg in shlex.split(self.simCommand)]
+        logging.debug('Running: %s' % (' '.join(command)))
+        with open(logfile, 'wb') as log:
+            try:
+                returncode = subprocess.call(command, cwd=os.path.dirname(deckfile), stdout=log, stderr=subprocess.STDOUT)
+            except OSError as e:
+                log.write(('Cannot run %s: %s\n' % (command[0], e)).encode('utf-8'))
+                returncode = -1
+        if returncode == 0 and not os.path.isfile(tmpfile):
+            with open(logfile, 'ab') as log:
+                log.write(('No raw file written to %s\n' % (tmpfile)).encode('utf-8'))
+            returncode = -1
+        if not returncode == 0:
+            if os.path.isfile(tmpfile):
+                os.remove(tmpfile)
+            return (deckfile, returncode, logfile)
+        os.replace(tmpfile, rawfile)
+        print('%s: done' % (os.path.basename(deckfile)))
+        if self.use_cache == 1 and not key == '':
+            try:
+                if not os.path.isdir(self.cacheDir):
+                    os.makedirs(self.cacheDir, exist_ok=True)
+                tmpfile = '%s.%s.%d.tmp' % (cachefile, deckname, os.getpid())
+                shutil.copyfile(rawfile, tmpfile)
+                os.replace(tmpfile, cachefile)
+            except OSError:
+                print('Warning: Cannot write simulation cache %s.' % (cachefile))
+        return (deckfile, 0, logfile)
+
+    def resultKey(self, deckfile, inputs):
+        # The deck and the files it includes; interface.md only matters through the deck
+        h = hashlib.sha1()
+        h.update(self.simCommand.encode('utf-8'))
+        for file in [deckfile] + inputs:
+            if os.path.basename(file) == 'interface.md':
+                continue
+            if not os.path.isfile(file):
+                print('ER04: Cannot find %s, used by %s.' % (file, deckfile))
+                raise SystemExit
+            h.update(('\n%s %s' % (os.path.basename(file), self.fileHash(file))).encode('utf-8'))
+        return h.hexdigest()
+
+    def fileHash(self, file):
+        if not file in self.fileHashes:
+            h = hashlib.sha1()
+            with open(file, 'rb') as f:
+                for chunk in iter(lambda: f.read(1 << 20), b''):
+                    h.update(chunk)
+            self.fileHashes[file] = h.hexdigest()
+        return self.fileHashes[file]
+
+    def linkFile(self, source, target):
+        # Hard link when possible (same file system), else copy. The target is
+        # replaced, never written in place, so the cached file is not modified.
+        tmpfile = '%s.%d.tmp' % (target, os.getpid())
+        try:
+            os.link(source, tmpfile)
+        except OSError:
+            shutil.copyfile(source, tmpfile)
+        os.replace(tmpfile, target)
+
+if __name__ == "__main__":
+    #logging.basicConfig(level=logging.DEBUG)    # uncomment this line to output debug info
+    if not (len(sys.argv) >= 2 and len(sys.argv) <= 11):
+        print('Error! Usage: python3 asiv-run.py <path_to_interface_folder> [--sim "<command>"] [--jobs N] [--mem GB] [--decks NAME,...] [--nocache]')
+        raise SystemExit
+    simCommand = os.environ.get('ASIV_SIM', '')
+    if '--sim' in sys.argv:
+        simCommand = sys.argv[sys.argv.index('--sim') + 1]
+    if simCommand == '':
+        print('ER01: No simulator command. Use --sim "<command>" or set ASIV_SIM, e.g. "simulator -b %(deck)s -o %(raw)s".')
+        raise SystemExit
+    jobs = 0
+    if '--jobs' in sys.argv:
+        jobs = int(sys.argv[sys.argv.index('--jobs') + 1])     # 0: sized to the cores and the free memory
+    jobMemory = 2.0
+    if '--mem' in sys.argv:
+        jobMemory = float(sys.argv[sys.argv.index('--mem') + 1])
+    projectDir = os.path.abspath(sys.argv[1])
+    thisRunner = SimRunner(projectDir, simCommand, jobs, jobMemory)
+    if '--nocache' in sys.argv:
+        thisRunner.use_cache = 0
+    if '--decks' in sys.argv:
+        thisRunner.deckNames = sys.argv[sys.argv.index('--decks') + 1].split(',')
+    thisRunner.runAll()
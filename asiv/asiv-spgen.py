@@ -2,6 +2,22 @@
 ##### AGIV-SPGEN #####
 ######################
 
+# v0.6 (261018)
+# Add '--binary' option to request binary raw output from the simulator
+# Parse each IBIS file once into an IbisFile (components, pins, model selectors, models, byte offsets)
+# Cache parsed IBIS files by content hash in $ASIV_CACHE/ibis (default ~/.asiv/ibis), shared across projects
+# Add '--ibislib DIR' (or $ASIV_IBIS_LIB): parts whose IBIS file is not in the project are found in an indexed library
+# Load [Model] sections lazily: only the models used in the decks are parsed, by seeking to their offset
+# Index components by ID, and resolve the Tx/Rx models once per model selector instead of once per pin
+# Tx/Rx model selection rules moved from code to asiv-model-rules.json (or models/asiv-model-rules.json)
+# Write the buffer, package and pin subcircuits once per interface to decks/<ID>_lib.inc, included by all decks
+# Add '--jobs N' option to render the (byte, direction) decks in parallel (the design is sent once to each worker)
+# Only rewrite decks whose content changed, and write decks/manifest.json (deck and input hashes)
+# .tran stop time and step from data rate, LFSR period, delay and settling; add '--repeat N' (LFSR periods)
+# Probe only the Rx pad voltages by default, '--digital' adds the Rx digital outputs; signals listed in the manifest
+# interface.md is parsed by the shared asiv_config module; Design can also take an already parsed Config
+# Several DDR blocks: with more than one, decks and BYTE<ID>.sp files are prefixed by the interface ID ('DDR1_byte0_rd.sp')
+
 # v0.5 (170120)
 # Parse Xilinx IBIS model
 
@@ -65,288 +81,86 @@
 # - Assume the order of pin for DQ and DQS are the same in interface.md and BYTE*.sp
 
 
+import hashlib
+import json
 import logging
+import multiprocessing
 import os.path
 import sys
 import re
 import shlex
 from collections import defaultdict
+import asiv_config
 
 class Design:
-    def __init__ (self, file):
+    def __init__ (self, file, binaryflag=0, ibisLibDir='', jobs=1, repeat=1, digitalflag=0, config=None):
         self.interfaces = []
+        self.probeDigital = digitalflag     # also probe the digital outputs of the Rx models
+        self.lfsrTaps = [7, 6]      # DQ pattern: maximum length 7-bit LFSR, 127 bits per period
+        self.tranRepeat = repeat    # number of LFSR periods simulated
+        self.tranSettle = 2e-9      # settling allowance after the pattern delay (s)
+        self.tranMargin = 2         # extra UIs at the end, for the DQS trigger offset and the eye window
+        self.ibisFiles = {}     # IBIS file path <-> IbisFile
+        self.modelChoice = {}   # (Interface ID, Component ID, Model Selector, Data Rate) <-> [tx_model, rx_model]
+        self.use_cache = 1
+        self.cacheDir = os.environ.get('ASIV_CACHE', os.path.expanduser('~/.asiv'))
+        self.ibisCacheDir = os.path.join(self.cacheDir, 'ibis')
+        self.ibisLib = None
+        if not ibisLibDir == '':
+            self.ibisLib = IbisLibrary(ibisLibDir, os.path.join(self.cacheDir, 'ibislib'))
+            self.ibisLib.update(self.parseIbisFile)
+        self.modelRules = self.readModelRules(os.path.dirname(file))
         self.configFile = file
-        self.readConfig(self.configFile)
-        self.generateByteDeck('rd')
-        logging.debug('Read deck generated sucessfully.')
-        self.generateByteDeck('wt')
-        logging.debug('Write deck generated sucessfully.')
+        self.readConfig(self.configFile, config)
+        self.generateByteDecks(binaryflag, jobs)
     
-    def readConfig(self, file):
-        self.modelPath = os.path.dirname(file)
-        logging.debug('D001: Model Path is %s'%(self.modelPath))
-        num_ddr = 0
-        infile = open(file, 'r')
-        for line in infile:
-            if 'DDR {' in line:
-                num_ddr = num_ddr + 1
-
-                # Parse for ID, Type, Component information
-                line_ID = next(infile)
-                if not 'ID' in line_ID:
-                    print ('E001: Cannot find DDR ID')
-                else:
-                    self.interfaces.append(DDR(line_ID.split()[1]))
-                    thisInterface = self.interfaces[-1]
-                    logging.debug ('Interface ID is ' + thisInterface.interfaceID)
-                line_type = next(infile)
-                if not 'Type' in line_type:
-                    print ('E002: Cannot find DDR Type')
-                else:
-                    thisInterface.ddrType = line_type.split()[1]
-                    clkfreq = (line_type.split()[2][:-3]).split('.')[0]
-                    print(clkfreq)
-                    thisInterface.dataRate = self.getDatarate(clkfreq)
-                    logging.debug ('Interface data rate is ' + thisInterface.dataRate)
-                line_comp = next(infile)
-                if not 'Components {' in line_comp:
-                    print ('E003: Cannot find DDR Components')
-                else:
-                    line_comp = next(infile)    #skip the "Components {" line
-                    while not '}' in line_comp:
-                        if 'NameModel' in line_comp:
-                            words = shlex.split(line_comp)
-                            thisInterface.comps.append(Component(words[1], words[2].replace("@BOMpart",""), words[3], words[4]))
-                            if len(line_comp.split()) > 5:
-                                if line_comp.split()[5] == 'DIMM':
-                                    thisInterface.comps[-1].isDIMM = 1
-                                    print('%s is DIMM.' % (thisInterface.comps[-1].compID))
-                        line_comp = next(infile)
-                        logging.debug (thisInterface.comps[-1].compID)
-                        logging.debug (thisInterface.comps[-1].compPart)
-                        logging.debug (thisInterface.comps[-1].compModelFile)
-                        logging.debug (thisInterface.comps[-1].compManufacture)
-                nextline = next(infile)
-                
-                # Process IBIS file for model_selector <-> model name mapping 
-                self.parseIbis(thisInterface)
-                print('Finish parsing IBIS file.')
-                #logging.debug(thisInterface.comps[1].compIbis.ibis_selector2model['DM'])
-
-                # Parse for Byte
-                if not 'Byte {' in nextline:
-                    print ('E004: Cannot find DDR Byte')
-                else:
-                    while 'Byte {' in nextline:
-                        line_byte = next(infile)
-                        if not 'ID' in line_byte:
-                            print ('E005: Error in reading DDR Byte ID')
-                        else:
-                            thisInterface.byte.append(Byte(line_byte.split()[-1]))
-                            thisInterface.numByte += 1
-                            thisByte = thisInterface.byte[-1]
-                            logging.debug ('D010: Byte ID is ' + thisByte.byteID)
-                        line_byte = next(infile)
-                        if not 'SoC' in line_byte:
-                            print ('E006: Error in reading DDR Byte SoC component')
-                        else:
-                            thisByte.socComp = line_byte.split()[-1]
-                            logging.debug ('D011: SoC comp is ' + thisByte.socComp)
-                        line_byte = next(infile)
-                        if not 'SoC_Pin_DQ' in line_byte:
-                            print ('E007: Error in reading DDR Byte SoC DQ Pin')
-                        elif not len(line_byte.split()) == 9:
-                            print ('E008: Error in reading DDR Byte SoC DQ Pin: Number of pin is not 8')
-                        else:
-                            thisByte.dq0.socPin = line_byte.split()[1]
-                            thisByte.dq1.socPin = line_byte.split()[2]
-                            thisByte.dq2.socPin = line_byte.split()[3]
-                            thisByte.dq3.socPin = line_byte.split()[4]
-                            thisByte.dq4.socPin = line_byte.split()[5]
-                            thisByte.dq5.socPin = line_byte.split()[6]
-                            thisByte.dq6.socPin = line_byte.split()[7]
-                            thisByte.dq7.socPin = line_byte.split()[8]
-                            thisByte.dq0.socModelTx, thisByte.dq0.socModelRx = self.findModel(thisInterface, thisByte.socComp, thisByte.dq0.socPin)
-                            thisByte.dq1.socModelTx, thisByte.dq1.socModelRx = self.findModel(thisInterface, thisByte.socComp, thisByte.dq1.socPin)
-                            thisByte.dq2.socModelTx, thisByte.dq2.socModelRx = self.findModel(thisInterface, thisByte.socComp, thisByte.dq2.socPin)
-                            thisByte.dq3.socModelTx, thisByte.dq3.socModelRx = self.findModel(thisInterface, thisByte.socComp, thisByte.dq3.socPin)
-                            thisByte.dq4.socModelTx, thisByte.dq4.socModelRx = self.findModel(thisInterface, thisByte.socComp, thisByte.dq4.socPin)
-                            thisByte.dq5.socModelTx, thisByte.dq5.socModelRx = self.findModel(thisInterface, thisByte.socComp, thisByte.dq5.socPin)
-                            thisByte.dq6.socModelTx, thisByte.dq6.socModelRx = self.findModel(thisInterface, thisByte.socComp, thisByte.dq6.socPin)
-                            thisByte.dq7.socModelTx, thisByte.dq7.socModelRx = self.findModel(thisInterface, thisByte.socComp, thisByte.dq7.socPin)
-                        line_byte = next(infile)
-                        if not 'SoC_Pin_DQS' in line_byte:
-                            print ('E009: Error in reading DDR Byte SoC DQS Pin')
-                        elif not len(line_byte.split()) == 3:
-                            print ('E010: Error in reading DDR Byte SoC DQS Pin: Number of pin is not 2')
-                        else:
-                            thisByte.dqs_p.socPin = line_byte.split()[1]
-                            thisByte.dqs_n.socPin = line_byte.split()[2]
-                            thisByte.dqs_p.socModelTx, thisByte.dqs_p.socModelRx = self.findModel(thisInterface, thisByte.socComp, thisByte.dqs_p.socPin)
-                            thisByte.dqs_n.socModelTx, thisByte.dqs_n.socModelRx = self.findModel(thisInterface, thisByte.socComp, thisByte.dqs_n.socPin)
-                            logging.debug (thisByte.dqs_p.socPin)
-                        line_byte = next(infile)
-                        if not 'DRAM' in line_byte:
-                            print ('E011: Error in reading DDR Byte DRAM component')
-                        else:
-                            thisByte.ddrComp = line_byte.split()[-1]
-                            logging.debug (thisByte.ddrComp)
-                        line_byte = next(infile)
-                        if not 'DRAM_Pin_DQ' in line_byte:
-                            print ('E012: Error in reading DDR Byte DRAM DQ Pin')
-                        elif not len(line_byte.split()) == 9:
-                            print ('E013: Error in reading DDR Byte DRAM DQ Pin: Number of pin is not 8')
-                        else:
-                            thisByte.dq0.ddrPin = line_byte.split()[1]
-                            thisByte.dq1.ddrPin = line_byte.split()[2]
-                            thisByte.dq2.ddrPin = line_byte.split()[3]
-                            thisByte.dq3.ddrPin = line_byte.split()[4]
-                            thisByte.dq4.ddrPin = line_byte.split()[5]
-                            thisByte.dq5.ddrPin = line_byte.split()[6]
-                            thisByte.dq6.ddrPin = line_byte.split()[7]
-                            thisByte.dq7.ddrPin = line_byte.split()[8]
-                            txmodel, rxmodel = self.findModel(thisInterface, thisByte.ddrComp, thisByte.dq0.ddrPin); thisByte.dq0.ddrModelTx.append(txmodel); thisByte.dq0.ddrModelRx.append(rxmodel) 
-                            txmodel, rxmodel = self.findModel(thisInterface, thisByte.ddrComp, thisByte.dq1.ddrPin); thisByte.dq1.ddrModelTx.append(txmodel); thisByte.dq1.ddrModelRx.append(rxmodel)
-                            txmodel, rxmodel = self.findModel(thisInterface, thisByte.ddrComp, thisByte.dq2.ddrPin); thisByte.dq2.ddrModelTx.append(txmodel); thisByte.dq2.ddrModelRx.append(rxmodel)
-                            txmodel, rxmodel = self.findModel(thisInterface, thisByte.ddrComp, thisByte.dq3.ddrPin); thisByte.dq3.ddrModelTx.append(txmodel); thisByte.dq3.ddrModelRx.append(rxmodel)
-                            txmodel, rxmodel = self.findModel(thisInterface, thisByte.ddrComp, thisByte.dq4.ddrPin); thisByte.dq4.ddrModelTx.append(txmodel); thisByte.dq4.ddrModelRx.append(rxmodel)
-                            txmodel, rxmodel = self.findModel(thisInterface, thisByte.ddrComp, thisByte.dq5.ddrPin); thisByte.dq5.ddrModelTx.append(txmodel); thisByte.dq5.ddrModelRx.append(rxmodel)
-                            txmodel, rxmodel = self.findModel(thisInterface, thisByte.ddrComp, thisByte.dq6.ddrPin); thisByte.dq6.ddrModelTx.append(txmodel); thisByte.dq6.ddrModelRx.append(rxmodel)
-                            txmodel, rxmodel = self.findModel(thisInterface, thisByte.ddrComp, thisByte.dq7.ddrPin); thisByte.dq7.ddrModelTx.append(txmodel); thisByte.dq7.ddrModelRx.append(rxmodel)
-                            logging.debug (thisByte.dq0.ddrModelRx)
-                        line_byte = next(infile)
-                        if not 'DRAM_Pin_DQS' in line_byte:
-                            print ('E014: Error in reading DDR Byte DRAM DQS Pin')
-                        elif not len(line_byte.split()) == 3:
-                            print ('E015: Error in reading DDR Byte DRAM DQS Pin: Number of pin is not 2')
-                        else:
-                            thisByte.dqs_p.ddrPin = line_byte.split()[1]
-                            thisByte.dqs_n.ddrPin = line_byte.split()[2]
-                            txmodel, rxmodel = self.findModel(thisInterface, thisByte.ddrComp, thisByte.dqs_p.ddrPin); thisByte.dqs_p.ddrModelTx.append(txmodel); thisByte.dqs_p.ddrModelRx.append(rxmodel); 
-                            txmodel, rxmodel = self.findModel(thisInterface, thisByte.ddrComp, thisByte.dqs_n.ddrPin); thisByte.dqs_n.ddrModelTx.append(txmodel); thisByte.dqs_n.ddrModelRx.append(rxmodel); 
-                            logging.debug (thisByte.dqs_p.ddrModelRx)
-                        nextline = next(infile)
-                        if not 'Net_DQ' in nextline:
-                            print ('E015_3: Error in reading DDR Net_DQ')
-                        else:
-                            nextline = next(infile)
-                        if not 'Net_DQS' in nextline:
-                            print ('E015_3: Error in reading DDR Net_DQS')
-                        else:
-                            nextline = next(infile)
-                        #nextline = next(infile) # Skip the '}' line
-                        nextline = next(infile)
-                    logging.debug('Num of Byte: ' + str(thisInterface.numByte))
-
-                # Parse for CTRL (SoC)
-                if not 'SoC_CLK_ADR_CTRL {' in nextline:
-                    print ('E016: Cannot find DDR CTRL (SoC)')
-                else:
-                    thisInterface.ctrl = Ctrl()
-                    thisCtrl = thisInterface.ctrl
-                    line_ctrl = next(infile)
-                    if not 'Component' in line_ctrl:
-                        print ('E017: Error in reading DDR CTRL Component')
-                    else:
-                        thisCtrl.socComp = line_ctrl.split()[-1]
-                        logging.debug (thisCtrl.socComp)
-                    line_ctrl = next(infile)
-                    if not 'Pin_CLK' in line_ctrl:
-                        print ('E018: Error in reading DDR CTRL Pin_CLK')
-                    else:
-                        thisCtrl.clk_p.socPin = line_ctrl.split()[1]
-                        thisCtrl.clk_n.socPin = line_ctrl.split()[2]
-                        #thisCtrl.clk_p.socModelName = self.findModel(thisInterface, thisCtrl.socComp, thisCtrl.clk_p.socPin)
-                        #thisCtrl.clk_n.socModelName = self.findModel(thisInterface, thisCtrl.socComp, thisCtrl.clk_n.socPin)
-                        logging.debug (thisCtrl.clk_p.socPin)
-                    line_ctrl = next(infile)
-                    if not 'Pin_ADR' in line_ctrl:
-                        print ('E019: Error in reading DDR CTRL Pin_ADR')
-                    else:
-                        for i in range(len(line_ctrl.split())-1):
-                            thisCtrl.addr.append(Signal('addr'+str(i)))
-                            thisCtrl.addr[-1].socPin = line_ctrl.split()[i+1]
-                            #thisCtrl.addr[-1].socModelName = self.findModel(thisInterface, thisCtrl.socComp, thisCtrl.addr[-1].socPin)
-                        logging.debug(len(thisCtrl.addr))
-                        logging.debug(thisCtrl.addr[-1].socPin)
-                    line_ctrl = next(infile)
-                    if not 'Pin_BA' in line_ctrl:
-                        print ('E020: Error in reading DDR CTRL Pin_BA')
-                    else:
-                        for i in range(len(line_ctrl.split())-1):
-                            thisCtrl.bank.append(Signal('addr'+str(i)))
-                            thisCtrl.bank[-1].socPin = line_ctrl.split()[i+1]
-                            #thisCtrl.bank[-1].socModelName = self.findModel(thisInterface, thisCtrl.socComp, thisCtrl.bank[-1].socPin)
-                        logging.debug(len(thisCtrl.bank))
-                        logging.debug(thisCtrl.bank[-1].socPin)
-                    line_ctrl = next(infile)
-                    if not 'Pin_RAS_CAS_WE' in line_ctrl:
-                        print ('E021: Error in reading DDR CTRL Pin_RAS_CAS_WE')
-                    else:
-                        for i in range(len(line_ctrl.split())-1):
-                            thisCtrl.ctrl.append(Signal('addr'+str(i)))
-                            thisCtrl.ctrl[-1].socPin = line_ctrl.split()[i+1]
-                            #thisCtrl.ctrl[-1].socModelName = self.findModel(thisInterface, thisCtrl.socComp, thisCtrl.ctrl[-1].socPin)
-                        logging.debug(len(thisCtrl.ctrl))
-                        logging.debug(thisCtrl.ctrl[-1].socPin)
+    def readConfig(self, file, config=None):
+        # interface.md is parsed by asiv_config (or given, already parsed); the IBIS
+        # files of each interface are then read and the Tx/Rx models of every pin resolved
+        if config is None:
+            config = asiv_config.Config(file)
+        self.config = config
+        self.modelPath = config.modelPath
+        self.interfaces = config.interfaces
+        for thisInterface in self.interfaces:
+            # Process IBIS file for model_selector <-> model name mapping 
+            self.parseIbis(thisInterface)
+            print('Finish parsing IBIS file.')
+            for thisByte in thisInterface.byte:
+                self.resolveByteModels(thisInterface, thisByte)
 
-                # Parse for CTRL (DRAM)
-                nextline = next(infile)
-                nextline = next(infile)
-                if not 'DRAM_CLK_ADR_CTRL {' in nextline:
-                    print ('E022: Cannot find DDR CTRL (DRAM)')
-                else:
-                    while 'DRAM_CLK_ADR_CTRL {' in nextline:
-                        thisCtrl.numDDRComp += 1
-                        line_ctrl = next(infile)
-                        if not 'Component' in line_ctrl:
-                            print ('E023: Error in reading DDR CTRL Component')
-                        else:
-                            thisCtrl.ddrComp.append(line_ctrl.split()[-1])
-                            logging.debug(thisCtrl.ddrComp[-1])
-                        line_ctrl = next(infile)
-                        if not 'Pin_CLK' in line_ctrl:
-                            print ('E024: Error in reading DDR CTRL Pin_CLK')
-                        else:
-                            thisCtrl.clk_p.ddrPin.append(line_ctrl.split()[1])
-                            thisCtrl.clk_n.ddrPin.append(line_ctrl.split()[2])
-                            #thisCtrl.clk_p.ddrModelName.append(self.findModel(thisInterface, thisCtrl.ddrComp[-1], thisCtrl.clk_p.ddrPin[-1]))
-                            #thisCtrl.clk_n.ddrModelName.append(self.findModel(thisInterface, thisCtrl.ddrComp[-1], thisCtrl.clk_n.ddrPin[-1]))
-                        logging.debug(thisCtrl.clk_n.ddrPin)
-                        line_ctrl = next(infile)
-                        if not 'Pin_ADR' in line_ctrl:
-                            print ('E025: Error in reading DDR CTRL Pin_ADR')
-                        else:
-                            for i in range(len(line_ctrl.split())-1):
-                                thisCtrl.addr[i].ddrPin.append(line_ctrl.split()[i+1])
-                                #thisCtrl.addr[i].ddrModelName.append(self.findModel(thisInterface, thisCtrl.ddrComp[-1], thisCtrl.addr[i].ddrPin[-1]))
-                                logging.debug(thisCtrl.addr[i].ddrPin)
-                        line_ctrl = next(infile)
-                        if not 'Pin_BA' in line_ctrl:
-                            print ('E026: Error in reading DDR CTRL Pin_BA')
-                        else:
-                            for i in range(len(line_ctrl.split())-1):
-                                thisCtrl.bank[i].ddrPin.append(line_ctrl.split()[i+1])
-                                #thisCtrl.bank[i].ddrModelName.append(self.findModel(thisInterface, thisCtrl.ddrComp[-1], thisCtrl.bank[i].ddrPin[-1]))
-                                logging.debug(thisCtrl.bank[i].ddrPin)
-                        line_ctrl = next(infile)
-                        if not 'Pin_RAS_CAS_WE' in line_ctrl:
-                            print ('E027: Error in reading DDR CTRL Pin_RAS_CAS_WE')
-                        else:
-                            for i in range(len(line_ctrl.split())-1):
-                                thisCtrl.ctrl[i].ddrPin.append(line_ctrl.split()[i+1])
-                                #thisCtrl.ctrl[i].ddrModelName.append(self.findModel(thisInterface, thisCtrl.ddrComp[-1], thisCtrl.ctrl[i].ddrPin[-1]))
-                                logging.debug(thisCtrl.ctrl[i].ddrPin)
-                        nextline = next(infile)
-                        nextline = next(infile)
-                    logging.debug(thisCtrl.numDDRComp)
+    def resolveByteModels(self, thisInterface, thisByte):
+        dqs = [thisByte.dq0, thisByte.dq1, thisByte.dq2, thisByte.dq3, thisByte.dq4, thisByte.dq5, thisByte.dq6, thisByte.dq7]
+        # SoC: one Tx/Rx model per pin. Pins are not set when their line had an error.
+        for thisSignal in dqs + [thisByte.dqs_p, thisByte.dqs_n]:
+            if thisSignal.socPin:
+                thisSignal.socModelTx, thisSignal.socModelRx = self.findModel(thisInterface, thisByte.socComp, thisSignal.socPin)
+        # DRAM: a list of models, one per DRAM component
+        for thisSignal in dqs + [thisByte.dqs_p, thisByte.dqs_n]:
+            if thisSignal.ddrPin:
+                txmodel, rxmodel = self.findModel(thisInterface, thisByte.ddrComp, thisSignal.ddrPin)
+                thisSignal.ddrModelTx.append(txmodel)
+                thisSignal.ddrModelRx.append(rxmodel)
+        logging.debug (thisByte.dq0.ddrModelRx)
 
     def parseIbis (self, thisInterface):
         logging.info("Start reading IBIS file for components......")
         for i in range(len(thisInterface.comps)):
             ibisFile = self.modelPath + '/' + thisInterface.comps[i].compModelFile
             thisComp = thisInterface.comps[i]
+            thisComp.compIbis = IbisModel(thisComp.compID, thisComp.compModelFile)
             thisIbis = thisComp.compIbis
+            if not os.path.isfile(ibisFile) and not self.ibisLib == None:
+                # Not in the project: look the part up in the IBIS library
+                found = self.ibisLib.findComp(thisComp.compPart)
+                if len(found) == 0:
+                    print ('EM04: Cannot find part %s in IBIS library %s' % (thisComp.compPart, self.ibisLib.libDir))
+                else:
+                    if len(found) > 1:
+                        print ('W07: Part %s found in %d IBIS library files. Using %s' % (thisComp.compPart, len(found), found[0][0]))
+                    ibisFile, thisComp.compIbisName = found[0][0], found[0][1]
+                    logging.debug('D024: Part %s found in IBIS library: %s' % (thisComp.compPart, ibisFile))
+            thisComp.compModelPath = ibisFile
             if not os.path.isfile(ibisFile):
                 print ('EM02: Cannot find (ibisFile) model file: %s'%(ibisFile))
             # Determine number of component in the ibis file
@@ -367,117 +181,139 @@ class Design:
             
             # Determine the component to use
             IbisCompName = self.parseIbisWhichComp(IbisCompNameList, thisComp)
-            # Parse for ibis model
-            preline = ''
-            with open(ibisFile, 'r') as f:
-                found_comp = 0
-                for line in f:
-                    if line.startswith('|') or line.strip()=='':
-                        continue
-                    if line.lower().startswith('[component]') and IbisCompName.lower() in line.lower() and not 'CLP' in line:
-                        found_comp = 1
-                        continue
-                    if found_comp == 1:
-                        if line.lower().startswith('[package]'):
-                            nextline = next(f)
-                            while not ( nextline.startswith('[') ):
-                                if 'r_pkg' in nextline.lower():
-                                    #r_pkg = self.str2num(nextline.split()[1])    # ATT: This is the 'typ' case
-                                    thisComp.r_pkg = nextline.split()[1]
-                                if 'l_pkg' in nextline.lower():
-                                    #l_pkg = self.str2num(nextline.split()[1])    # ATT: This is the 'typ' case     
-                                    thisComp.l_pkg = nextline.split()[1]
-                                if 'c_pkg' in nextline.lower():
-                                    #c_pkg = self.str2num(nextline.split()[1])    # ATT: This is the 'typ' case
-                                    thisComp.c_pkg = nextline.split()[1]
-                                nextline = next(f)
-                            logging.debug('D021: Parsed package parasitics: %s  %s  %s'%(thisComp.r_pkg, thisComp.l_pkg, thisComp.c_pkg))
-                            if nextline.lower().startswith('[pin]'):
-                                nextline = next(f)
-                                while not ( nextline.startswith('[') ):
-                                    thisIbis.ibis_pin2signal[nextline.split()[0]] = nextline.split()[1]
-                                    thisIbis.ibis_pin2selector[nextline.split()[0]] = nextline.split()[2]
-                                    if len(nextline.split()) >= 6:
-                                        thisIbis.ibis_pin2rpin[nextline.split()[0]] = nextline.split()[3]
-                                        thisIbis.ibis_pin2lpin[nextline.split()[0]] = nextline.split()[4]
-                                        thisIbis.ibis_pin2cpin[nextline.split()[0]] = nextline.split()[5]
-                                    else:
-                                        thisIbis.ibis_pin2rpin[nextline.split()[0]] = ''
-                                        thisIbis.ibis_pin2lpin[nextline.split()[0]] = ''
-                                        thisIbis.ibis_pin2cpin[nextline.split()[0]] = ''
-                                    nextline = next(f)
-                                    while nextline.startswith('|') or nextline.strip()=='':
-                                        nextline = next(f)
-                                found_comp = 0
-                    if line.lower().startswith('[model selector]'):
-                        selector = line.split()[-1]
-                        nextline = next(f)
-                        while not ( nextline.startswith('[') ):
-                            if nextline.startswith('|') or nextline.strip()=='':
-                                nextline = next(f)
-                                continue
-                            #thisIbis.ibis_selector2model[selector].append(nextline.split()[0])
-                            thisIbis.ibis_selector2model[selector].append(nextline)
-                            nextline = next(f)
-                        preline = nextline
-                    elif preline.lower().startswith('[model selector]'):
-                        selector = preline.split()[-1]
-                        #logging.debug('Preline:  ' + selector)
-                        nextline = line
-                        while not ( nextline.startswith('[') ):
-                            if nextline.startswith('|') or nextline.strip()=='':
-                                nextline = next(f)
-                                continue
-                            #thisIbis.ibis_selector2model[selector].append(nextline.split()[0])
-                            thisIbis.ibis_selector2model[selector].append(nextline)
-                            nextline = next(f)
-                        preline = nextline
-                    if preline.lower().startswith('[model]'):
-                        #logging.debug('break line:  ' + preline)
-                        break    
-                logging.debug('D022: All Model Selectors: %s' % (thisIbis.ibis_selector2model.keys()))
-                #print("############# pin to model selector ################")
-                #print(thisIbis.ibis_pin2selector)
+            # Package and pin parasitics of the component
+            thisFile = self.readIbisFile(ibisFile)
+            for ibisComp in thisFile.comps:
+                if IbisCompName.lower() in ibisComp.line.lower() and not 'CLP' in ibisComp.line:
+                    if not ibisComp.r_pkg == '': thisComp.r_pkg = ibisComp.r_pkg
+                    if not ibisComp.l_pkg == '': thisComp.l_pkg = ibisComp.l_pkg
+                    if not ibisComp.c_pkg == '': thisComp.c_pkg = ibisComp.c_pkg
+                    logging.debug('D021: Parsed package parasitics: %s  %s  %s'%(thisComp.r_pkg, thisComp.l_pkg, thisComp.c_pkg))
+                    for pin in ibisComp.pins:
+                        thisIbis.ibis_pin2signal[pin] = ibisComp.pins[pin][0]
+                        thisIbis.ibis_pin2selector[pin] = ibisComp.pins[pin][1]
+                        thisIbis.ibis_pin2rpin[pin] = ibisComp.pins[pin][2]
+                        thisIbis.ibis_pin2lpin[pin] = ibisComp.pins[pin][3]
+                        thisIbis.ibis_pin2cpin[pin] = ibisComp.pins[pin][4]
+            # Model selector <-> model names
+            for selector in thisFile.selectors:
+                thisIbis.ibis_selector2model[selector].extend(thisFile.selectors[selector].models)
+            logging.debug('D022: All Model Selectors: %s' % (thisIbis.ibis_selector2model.keys()))
+            #print("############# pin to model selector ################")
+            #print(thisIbis.ibis_pin2selector)
             
     def parseIbisModelType (self, thisComp, ibisFile):
-        # Parse for Model Type
-        with open(ibisFile, 'r') as f:
-            for line in f:
-                if line.lower().startswith('[model]'):
-                    modelname = line.split()[-1]
-                    nextline = next(f)
-                    while not nextline.startswith('['):
-                        if 'model_type' in nextline.lower():
-                            thisComp.compIbis.ibis_model2type[modelname] = nextline.split()[-1]
-                        if 'enable' in nextline.lower():
-                                if 'low' in nextline.lower():
-                                    thisComp.compIbis.ibis_model2enable[modelname] = '0'
-                                else:
-                                    thisComp.compIbis.ibis_model2enable[modelname] = '1'
-                        nextline = next(f)
-                    if not modelname in thisComp.compIbis.ibis_model2enable.keys():
-                        thisComp.compIbis.ibis_model2enable[modelname] = '1'
-        for key in thisComp.compIbis.ibis_model2type:   # output the model type for all models.
-            #logging.debug('D023 - Model: %s. Type: %s.' % (key, thisComp.compIbis.ibis_model2type[key]))
-            pass
-                    
+        # Model Type and Enable are looked up lazily: a [Model] section is only
+        # parsed when the deck generation asks for one of its values.
+        thisFile = self.readIbisFile(ibisFile)
+        thisComp.compIbis.ibis_model2type = IbisModelValues(thisFile, 'modelType')
+        thisComp.compIbis.ibis_model2enable = IbisModelValues(thisFile, 'enable')
+
+    def readIbisFile (self, ibisFile):
+        # Each IBIS file is read once per run. Parsed files are also kept in a
+        # cache directory shared by all projects, keyed by the file content hash,
+        # so a part used by an earlier project is not parsed again.
+        if ibisFile in self.ibisFiles:
+            return self.ibisFiles[ibisFile]
+        if self.use_cache == 0:
+            self.ibisFiles[ibisFile] = self.parseIbisFile(ibisFile)
+            return self.ibisFiles[ibisFile]
+        cachefile = os.path.join(self.ibisCacheDir, self.fileHash(ibisFile) + '.json')
+        thisFile = None
+        if os.path.isfile(cachefile):
+            try:
+                with open(cachefile, 'r') as f:
+                    cache = json.load(f)
+                if cache['version'] == IbisFile.version:
+                    logging.debug('Using cached IBIS file %s for %s' % (cachefile, ibisFile))
+                    thisFile = IbisFile.fromDict(cache, ibisFile)
+            except Exception:
+                print('Warning: Cannot read IBIS cache %s.' % (cachefile))
+        if thisFile == None:
+            thisFile = self.parseIbisFile(ibisFile)
+            try:
+                if not os.path.isdir(self.ibisCacheDir):
+                    os.makedirs(self.ibisCacheDir)
+                tmpfile = '%s.%d.tmp' % (cachefile, os.getpid())
+                with open(tmpfile, 'w') as f:
+                    json.dump(thisFile.toDict(), f)
+                os.replace(tmpfile, cachefile)
+            except OSError:
+                print('Warning: Cannot write IBIS cache %s.' % (cachefile))
+        self.ibisFiles[ibisFile] = thisFile
+        return thisFile
+
+    def fileHash(self, file):
+        h = hashlib.sha1()
+        with open(file, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                h.update(chunk)
+        return h.hexdigest()
+
+    def parseIbisFile (self, ibisFile):
+        # Parse an IBIS file in a single pass into an IbisFile (components with
+        # package and pin table, model selectors, models with type and enable),
+        # recording the byte offset of every keyword.
+        thisFile = IbisFile(ibisFile)
+        current = None      # IbisComp, IbisSelector or IbisModelDef being parsed
+        subkeyword = ''     # current sub-keyword inside it, e.g. '[package]', '[pin]'
+        offset = 0
+        with open(ibisFile, 'rb') as f:
+            for rawline in f:
+                line = rawline.decode('latin-1')
+                lineoffset = offset
+                offset += len(rawline)
+                if line.startswith('|') or line.strip() == '':
+                    continue
+                if line.startswith('['):
+                    keyword = line[:line.find(']')+1].lower().replace('_', ' ')
+                    if keyword in IbisFile.topKeywords:
+                        if not current == None:
+                            current.end = lineoffset
+                        current = None
+                        subkeyword = ''
+                        if keyword == '[component]':
+                            current = IbisComp(line.split(' ')[-1].strip(), line, lineoffset)
+                            thisFile.comps.append(current)
+                        elif keyword == '[model selector]':
+                            current = IbisSelector(line.split()[-1], lineoffset)
+                            thisFile.selectors[current.name] = current
+                        elif keyword == '[model]':
+                            current = IbisModelDef(line.split()[-1], lineoffset)
+                            thisFile.models[current.name] = current
+                    elif not current == None:
+                        subkeyword = keyword
+                        current.sections.append((keyword, lineoffset))
+                    continue
+                if isinstance(current, IbisComp):
+                    words = line.split()
+                    if subkeyword == '[package]':
+                        if 'r_pkg' in line.lower(): current.r_pkg = words[1]     # ATT: This is the 'typ' case
+                        if 'l_pkg' in line.lower(): current.l_pkg = words[1]
+                        if 'c_pkg' in line.lower(): current.c_pkg = words[1]
+                    elif subkeyword == '[pin]' and len(words) >= 3:
+                        if len(words) >= 6:
+                            current.pins[words[0]] = [words[1], words[2], words[3], words[4], words[5]]
+                        else:
+                            current.pins[words[0]] = [words[1], words[2], '', '', '']
+                elif isinstance(current, IbisSelector):
+                    current.models.append(line)
+                # [Model] sections are only indexed here, see IbisFile.loadModel
+        if not current == None:
+            current.end = offset
+        return thisFile
 
     def findModel(self, thisInterface, compName, pinName):
-        found_comp = 0
-        for c in thisInterface.comps:
-            if compName == c.compID:
-                thisComp = c
-                found_comp = 1
-                break
-        if found_comp == 0:
+        if not compName in thisInterface.compDict:
             print ('EM01: Cannot find component: %s'%(compName))
             return '' 
+        thisComp = thisInterface.compDict[compName]
         
         # For Xilinx part
         if thisComp.compManufacture.lower() == 'xilinx':
-            if self.interfaces[0].ddrType.lower() == 'ddr2':
+            if thisInterface.ddrType.lower() == 'ddr2':
                 return ['SSTL18_II_F_HR', 'SSTL18_II_F_HR']
-            if self.interfaces[0].ddrType.lower() == 'ddr3':
+            if thisInterface.ddrType.lower() == 'ddr3':
                 return ['SSTL15_F_HR', 'SSTL15_F_HR']
         
         # For DIMM part
@@ -501,621 +337,573 @@ class Design:
         if not (selectorName in thisComp.compIbis.ibis_selector2model.keys()):
             print ('EM03: Cannot find model selector %s in IBIS model for pin %s.' %(selectorName, pinName))
             return ''
+        logging.debug('D031: IBIS model selector for pin %s is %s' %(pinName, selectorName))
+        # The choice only depends on the model selector: resolve each selector once per run
+        key = (thisInterface.interfaceID, compName, selectorName, thisInterface.dataRate)
+        if not key in self.modelChoice:
+            self.modelChoice[key] = self.chooseModel(thisInterface, thisComp, pinName, selectorName)
+        return list(self.modelChoice[key])
+
+    def chooseModel(self, thisInterface, thisComp, pinName, selectorName):
+        # Pick the [tx_model, rx_model] pair from the models of a model selector
+        # with the first matching rule of asiv-model-rules.json
         modelNameList = thisComp.compIbis.ibis_selector2model[selectorName]
         #logging.debug('D030: IBIS model list for pin %s is %s' %(pinName, modelNameList))
-        logging.debug('D031: IBIS model selector for pin %s is %s' %(pinName, selectorName))
-        
-        # Determine model for Micron part
-        if thisComp.compManufacture == 'Micron' and self.interfaces[0].ddrType.lower() == 'ddr2':
-            # Parsor for Micron DDR2 IBIS Model            
-            # simulate with the DQ_FULL or DQ_HALF model for ALL Output simulations.  Use the ODT models ONLY for Input simulations.
-            DS = '_FULL'    # _FULL, _HALF
-            tx_model_candidate = []
-            tx_model = ''
-            for thisModel in modelNameList:
-                if thisInterface.dataRate in thisModel.split()[0] and DS in thisModel.split()[0] and 'ODT' not in thisModel.split()[0]:
-                    tx_model_candidate.append(thisModel.split()[0])
-            if len(tx_model_candidate)==0:
-                print('W01: Mircon Part: Cannot find coresponding datarate (%s) for pin %s in the IBIS model. Using generic model.'%(thisInterface.dataRate, pinName))
-                tx_model = modelNameList[0].split()[0]  # use the first model in the list
-            else:
-                tx_model = tx_model_candidate[0]
-            logging.debug('D032: Tx model for pin %s is %s. Model Type is %s.'%(pinName, tx_model, thisComp.compIbis.ibis_model2type[tx_model]))
-            
-            # Rx model: Use DQ_34_ODT*_* for ODT termination, otherwise use DQ_34_*, DQ_40_*
-            ODT = '_ODT50'  # _ODT50, _ODT75, _ODT150
-            rx_model_candidate = []
-            rx_model = ''
-            for thisModel in modelNameList:
-                if thisInterface.dataRate in thisModel.split()[0] and DS in thisModel.split()[0] and ODT in thisModel.split()[0]:
-                    rx_model_candidate.append(thisModel.split()[0])
-            if len(rx_model_candidate)==0:
-                print('W02: Mircon Part: Cannot find coresponding datarate (%s) for pin %s. Using generic model.'%(thisInterface.dataRate, pinName))
-                rx_model = modelNameList[0].split()[0]  # use the first model in the list
-            else:
-                rx_model = rx_model_candidate[0]
-            logging.debug('D033: Rx model for pin %s is %s. Model Type is %s.'%(pinName, rx_model, thisComp.compIbis.ibis_model2type[rx_model]))
-            return [tx_model, rx_model]
-            
-        if thisComp.compManufacture == 'Micron' and self.interfaces[0].ddrType.lower() == 'ddr3':
-            # Parsor for Micron DDR3 IBIS Model
-            # Tx model: only use DQ_34_*, DQ_40_*
-            DS = '_40'
-            tx_model_candidate = []
-            tx_model = ''
-            for thisModel in modelNameList:
-                # modelNameList: 'DQ_34_1066 34 Ohm Data I/O with no ODT, 800/1066Mbps\n', ...
-                if thisInterface.dataRate in thisModel.split()[0] and DS in thisModel.split()[0] and 'ODT' not in thisModel.split()[0]:
-                    tx_model_candidate.append(thisModel.split()[0])
-            if len(tx_model_candidate)==0:
-                print('W01: Mircon Part: Cannot find coresponding datarate (%s) for pin %s in the IBIS model. Using generic model.'%(thisInterface.dataRate, pinName))
-                tx_model = modelNameList[0].split()[0]  # use the first model in the list
-            else:
-                tx_model = tx_model_candidate[0]
-            logging.debug('D032: Tx model for pin %s is %s. Model Type is %s.'%(pinName, tx_model, thisComp.compIbis.ibis_model2type[tx_model]))
-            
-            # Rx model: Use DQ_34_ODT*_* for ODT termination, otherwise use DQ_34_*, DQ_40_*
-            ODT = '_ODT40'  # choose from: '', 'ODT40', 'ODT60', 'ODT120'
-            rx_model_candidate = []
-            rx_model = ''
-            for thisModel in modelNameList:
-                if thisInterface.dataRate in thisModel.split()[0] and DS in thisModel.split()[0] and ODT in thisModel.split()[0]:
-                    rx_model_candidate.append(thisModel.split()[0])
-            if len(rx_model_candidate)==0:
-                print('W02: Mircon Part: Cannot find coresponding datarate (%s) for pin %s. Using generic model.'%(thisInterface.dataRate, pinName))
-                rx_model = modelNameList[0].split()[0]  # use the first model in the list
+        rule = None
+        for thisRule in self.modelRules:
+            if thisRule.applies(thisComp.compManufacture, thisInterface.ddrType):
+                rule = thisRule
+                break
+        if rule == None:
+            return ['', '']
+        models = ['', '']
+        matchers = [rule.tx, rule.rx]
+        for thisModel in modelNameList:     # modelNameList: 'DQ_34_1066 34 Ohm Data I/O with no ODT, 800/1066Mbps\n', ...
+            name = thisModel.split()[0]
+            line = thisModel.lower()
+            fields = line.split(',')
+            for i in range(2):
+                if models[i] == '' and matchers[i].match(name, line, fields, thisInterface.dataRate):
+                    models[i] = name
+            if not models[0] == '' and not models[1] == '':
+                break
+        for i in range(2):
+            if models[i] == '':
+                print(matchers[i].warning % {'rate': thisInterface.dataRate, 'pin': pinName})
+                if matchers[i].fallback == 'first':
+                    models[i] = modelNameList[0].split()[0]     # use the first model in the list
+        # The Model Type is only looked up (and its [Model] section loaded) for debug output
+        if not logging.getLogger().isEnabledFor(logging.DEBUG):
+            return models
+        if not models[0] == '':
+            logging.debug('D032: Tx model for pin %s is %s. Model Type is %s.'%(pinName, models[0], thisComp.compIbis.ibis_model2type[models[0]]))
+        if not models[1] == '':
+            logging.debug('D033: Rx model for pin %s is %s. Model Type is %s.'%(pinName, models[1], thisComp.compIbis.ibis_model2type[models[1]]))
+        return models
+
+    def readModelRules(self, modelPath):
+        # Model selection rules: the project's models/asiv-model-rules.json, else the one next to this script
+        rulesFile = os.path.join(modelPath, 'asiv-model-rules.json')
+        if not os.path.isfile(rulesFile):
+            rulesFile = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'asiv-model-rules.json')
+        logging.debug('D002: Model selection rules: %s'%(rulesFile))
+        try:
+            with open(rulesFile, 'r') as f:
+                rules = json.load(f)['rules']
+            return [ModelRule(rule) for rule in rules]
+        except (OSError, ValueError, KeyError) as e:
+            print ('EM05: Cannot read model selection rules %s: %s' % (rulesFile, e))
+            raise SystemExit
+
+    def generateByteDecks(self, binaryflag=0, jobs=1):
+        # The decks are rendered as independent (interface, byte, direction) tasks, in a
+        # process pool when jobs > 1. Their subcircuits are then merged into the
+        # library of their interface in task order, so the output does not depend on jobs.
+        # The design is sent to each worker once, by the pool initializer; a task is only
+        # the (interface, byte) indices and the direction, resolved again in the worker.
+        tasks = []
+        for i in range(len(self.interfaces)):
+            thisInterface = self.interfaces[i]
+            for deckType in ['rd', 'wt']:
+                for j in range(len(thisInterface.byte)):
+                    tasks.append((thisInterface, thisInterface.byte[j], deckType, (i, j, deckType, binaryflag)))
+        if jobs > 1:
+            pool = multiprocessing.Pool(jobs, initRenderWorker, (self,))
+            try:
+                results = pool.map(renderDeckJob, [task for thisInterface, thisByte, deckType, task in tasks])
+            finally:
+                pool.close()
+                pool.join()
+            if None in results:
+                raise SystemExit    # the error was printed by the worker
+        else:
+            results = [self.renderByteDeck(thisInterface, thisByte, deckType, binaryflag) for thisInterface, thisByte, deckType, task in tasks]
+        manifest = {'version': 1, 'decks': []}
+        subcktLibs = dict([(thisInterface.interfaceID, SubcktLib()) for thisInterface in self.interfaces])
+        for i in range(len(tasks)):
+            thisInterface = tasks[i][0]
+            deckfile, deck, lib, inputs = results[i]
+            rename = {}     # subcircuit name in the deck <-> name in the shared library
+            for name, ports, sub in lib.subckts:
+                rename[name] = subcktLibs[thisInterface.interfaceID].add(name, ports, [self.renameSubckts(line, rename) for line in sub])
+            deckhash = self.writeFile(deckfile, [self.renameSubckts(line, rename) for line in deck])
+            logging.debug('Deck %s generated sucessfully.' % (deckfile))
+            manifest['decks'].append({'deck': os.path.normpath(deckfile), 'hash': deckhash, 'signals': ['time'] + self.probeSignals(),
+                                      'inputs': [os.path.normpath(file) for file in [self.configFile, self.subcktLibFile(thisInterface)] + inputs]})
+        for thisInterface in self.interfaces:
+            self.writeFile(self.subcktLibFile(thisInterface), subcktLibs[thisInterface.interfaceID].lines(thisInterface.interfaceID))
+        # Manifest: hash of every deck and of the files it was made from or includes,
+        # so that later stages only re-run the simulations whose inputs changed
+        hashes = {}
+        for entry in manifest['decks']:
+            for file in entry['inputs']:
+                if not file in hashes:
+                    hashes[file] = self.fileHash(file)
+            entry['inputs'] = dict([(file, hashes[file]) for file in entry['inputs']])
+        manifestfile = os.path.normpath(self.modelPath + '/../decks/manifest.json')
+        self.writeFile(manifestfile, [json.dumps(manifest, indent=1, sort_keys=True)])
+
+    def subcktLibFile(self, thisInterface):
+        # Subcircuit library shared by the decks of an interface
+        return os.path.normpath(self.modelPath + '/../decks/' + thisInterface.interfaceID + '_lib.inc')
+
+    def writeFile(self, file, lines):
+        # Write the lines to file, unless it already has exactly this content:
+        # unchanged files keep their mtime. Returns the sha1 of the content.
+        content = ''.join(['%s\n' % line for line in lines]).encode('utf-8')
+        contenthash = hashlib.sha1(content).hexdigest()
+        if os.path.isfile(file) and os.path.getsize(file) == len(content) and self.fileHash(file) == contenthash:
+            logging.debug('%s is unchanged.' % (file))
+            return contenthash
+        outfile = open(file, 'wb')
+        outfile.write(content)
+        outfile.close()
+        return contenthash
+
+    def tranWindow(self, datarate, delay, slew):
+        # Transient step and stop time: the pattern delay, a settling allowance,
+        # tranRepeat periods of the LFSR and a margin of tranMargin UIs.
+        # The step resolves the edges (slew/5): 10 ps for 50 ps edges, still more than 60
+        # points per UI at 1600 MT/s. It does not shrink with the UI, so that the deck
+        # keeps fewer points than the old fixed '.tran 10p 100n' at the higher rates.
+        ui = 1/datarate
+        period = (2**max(self.lfsrTaps) - 1) * ui
+        tstop = delay + self.tranSettle + self.tranRepeat * period + self.tranMargin * ui
+        tstep = slew/5
+        return tstep, tstop
+
+    def renameSubckts(self, line, rename):
+        # Subcircuits are only referenced by instance lines: 'x<name> <node> <node> <subckt> ...'
+        if not line.startswith('x'):
+            return line
+        return ' '.join([rename.get(word, word) for word in line.split(' ')])
+
+    def renderByteDeck(self, thisInterface, thisByte, deckType, binaryflag=0):
+        # Build the deck of one byte and direction. Returns the deck file name,
+        # its lines, the subcircuits it uses (SubcktLib) and the files it includes.
+        lib = SubcktLib()
+        prefix = self.config.unitPrefix(thisInterface)     # '' with a single interface
+        deckfile = self.modelPath + '/../decks/' + prefix + 'byte' + thisByte.byteID + '_' + deckType + '.sp'
+        deck = []   # the content of deck
+        # data and clock pattern
+        param_ground = '0.000'
+        param_vcc = '1.500'
+        param_datarate = thisInterface.dataRate+'e6'
+        param_freq = str(float(param_datarate)/2)
+        param_delay = '1e-9'
+        param_dataslew = '50e-12'
+        param_dataclkslew = '50e-12'
+        param_pulsewidth = str(1/float(param_datarate)-float(param_dataslew))
+        param_per = str(2/float(param_datarate))
+        lfsrTaps = '[%s]' % (','.join([str(tap) for tap in self.lfsrTaps]))
+        # header
+        deck.append("* Deck for Byte%s %s\n"%(thisByte.byteID , deckType.upper()))
+        deck.append(".options post probe")
+        if binaryflag:
+            deck.append(".options filetype=binary")     # binary raw output, memory-mapped by pproc
+        deck.append("* .options method=gear dcon=1 converge=1")
+        tstep, tstop = self.tranWindow(float(param_datarate), float(param_delay), float(param_dataslew))
+        deck.append("* %d LFSR period(s) of %d UI after delay and %.3gns settling" % (self.tranRepeat, 2**max(self.lfsrTaps)-1, self.tranSettle*1e9))
+        deck.append(".tran %.4gp %.6gn" % (tstep*1e12, tstop*1e9))
+        deck.append("")
+        deck.append("*********************************")
+        deck.append("***** DATA AND CLK PATTERN ******")
+        deck.append("*********************************")
+        deck.append(".param ground = %s" %(param_ground))
+        deck.append(".param vcc = %s" %(param_vcc))
+        deck.append(".param delay = %s" %(param_delay))
+        deck.append(".param dataslew = %s" %(param_dataslew))
+        deck.append(".param dataclkslew = %s" %(param_dataclkslew))
+        deck.append(".param datarate = %se6" % (thisInterface.dataRate))
+        deck.append(".param freq = 'datarate/2'")
+        deck.append(".param pulsewidth = '1/datarate - dataslew'")
+        deck.append(".param clkpw = '1/datarate - dataclkslew'")
+        deck.append(".param per = '2*(1/datarate)'")
+        deck.append(".param clkper = '2*(1/datarate)'")
+        deck.append(".param delayclk = 'delay-(clkper/4)'")
+        deck.append("")
+        # DQ, DQS excitations
+        deck.append("* DQ, DQS pattern")
+        deck.append("* V_dq0 dq0_in 0 LFSR ground vcc delay dataslew dataslew datarate 80 %s  rout=0" % (lfsrTaps))
+        for k in range(8):
+            if k == 4:
+                deck.append("V_dq%s dq%s_in 0 LFSR %s %s %s %s %s %s 17 %s  rout=0" %(str(k), str(k), param_ground, param_vcc, param_delay, param_dataslew, param_dataslew, param_datarate, lfsrTaps))
             else:
-                rx_model = rx_model_candidate[0]
-            logging.debug('D033: Rx model for pin %s is %s. Model Type is %s.'%(pinName, rx_model, thisComp.compIbis.ibis_model2type[rx_model]))
-            return [tx_model, rx_model]
+                deck.append("V_dq%s dq%s_in 0 LFSR %s %s %s %s %s %s 80 %s  rout=0" %(str(k), str(k), param_ground, param_vcc, param_delay, param_dataslew, param_dataslew, param_datarate, lfsrTaps))
+        deck.append("* V_dqs_p dqs_p_in 0 PULSE ground vcc delay dataslew dataslew pulsewidth per")
+        deck.append("V_dqs_p dqs_p_in 0 PULSE %s %s %s %s %s %s %s" %(param_ground, param_vcc, param_delay, param_dataslew, param_dataslew, param_pulsewidth, param_per))
+        deck.append("V_dqs_n dqs_n_in 0 PULSE %s %s %s %s %s %s %s"%(param_vcc, param_ground, param_delay, param_dataslew, param_dataslew, param_pulsewidth, param_per))
+        deck.append("")
         
-        # Determine model for TI part
-        if thisComp.compManufacture == 'TI':
-            # Parsor for TI Micro controller IBIS Model
-            # Tx model:
-            # Model_100 3-STATE,1.5V,SLOWEST, 7MA,IND,10%
-            # output model
-            driverType = '3-state'
-            DS = '8ma'
-            swing = '1.5v'
-            edgeRate = 'slow'
-            tx_model_candidate = []
-            tx_model = ''
-            for thisModel in modelNameList:
-                if driverType in thisModel.lower() and DS in thisModel.lower() and edgeRate in thisModel.lower().split(',') and swing in thisModel.lower():
-                    tx_model_candidate.append(thisModel.split()[0])
-            if len(tx_model_candidate)==0:
-                print('W03: TI Part: Cannot find coresponding model for pin %s in the IBIS file. Using generic model.'%(pinName))
+        # Buffer, package and pin models are in the subcircuit library shared by all decks
+        deck.append("*********************************")
+        deck.append("******* Subcircuit Library ******")
+        deck.append("*********************************")
+        deck.append('.inc "%s"' % (self.subcktLibFile(thisInterface)))
+        deck.append("")
+        # SoC package model
+        thisComp = self.getComp(thisInterface, thisByte.socComp)
+        if not thisComp.r_pkg == '':
+            soc_pkg = lib.add('soc_pkg', "pad pkg_out r2=%s l2=%s c2=%s" % (thisComp.r_pkg, thisComp.l_pkg, thisComp.c_pkg), ["R_pkg pad net1 r2", "L_pkg net1 pkg_out l2", "C_pkg pkg_out 0 c2"])
+        else:
+            soc_pkg = lib.add('soc_pkg', "pad pkg_out r2=100m l2=1.5n c2=0.5p", ["R_pkg pad net1 r2", "L_pkg net1 pkg_out l2", "C_pkg pkg_out 0 c2"])
+        # DDR package model
+        thisComp = self.getComp(thisInterface, thisByte.ddrComp)
+        if not thisComp.r_pkg == '':
+            ddr_pkg = lib.add('ddr_pkg', "pad pkg_out r1=%s l1=%s c1=%s" % (thisComp.r_pkg, thisComp.l_pkg, thisComp.c_pkg), ["R_pkg pad net1 r1", "L_pkg net1 pkg_out l1", "C_pkg pkg_out 0 c1"])
+        else:
+            ddr_pkg = lib.add('ddr_pkg', "pad pkg_out r1=100m l1=1.5nH c1=0.5pF", ["R_pkg pad net1 r1", "L_pkg net1 pkg_out l1", "C_pkg pkg_out 0 c1"])
+        # Pin Parasitic model
+        pin_rlc = lib.add('pin_rlc', "die_out pin_out rpin=100m lpin=1nH cpin=0.2pF", ["R_pin die_out nd_pin1 rpin", "L_pin nd_pin1 pin_out lpin", "C_pin pin_out 0 cpin"])
+        
+        
+        if deckType == 'rd':
+            # DDR model: Tx 
+            thisComp = self.getComp(thisInterface, thisByte.ddrComp)
+            deck.append("*********************************")
+            deck.append("******* DDR Model (Tx) **********")
+            deck.append("*********************************")
+            dq_model_type = thisComp.compIbis.ibis_model2type[thisByte.dq0.ddrModelTx[0]]
+            sub = []
+            if (dq_model_type.lower() == 'i/o'):
+                sub.append("B_dq nd_pu nd_pd nd_die_out nd_in nd_en nd_dig_out")
+            elif (dq_model_type.lower() == '3-state'):    
+                sub.append("B_dq nd_pu nd_pd nd_die_out nd_in nd_en")
             else:
-                tx_model = tx_model_candidate[0]
-            logging.debug('D034: IBIS Tx model for pin %s is %s. Model Type is %s.'%(pinName, tx_model, thisComp.compIbis.ibis_model2type[tx_model]))
-            # Rx model:
-            driverType = 'input'
-            DS = '8ma'
-            swing = '1.5v'
-            term = 'halfterm'   # 'fullterm', 'halfterm', 'pull-up,', 'pull-down', 'pull-up/down off'
-            rx_model_candidate = []
-            rx_model = ''
-            for thisModel in modelNameList:
-                if driverType in thisModel.lower() and DS in thisModel.lower() and term in thisModel.lower().split(',') and swing in thisModel.lower():
-                    rx_model_candidate.append(thisModel.split()[0])
-            if len(rx_model_candidate)==0:
-                print('W04: TI Part: Cannot find coresponding model for pin %s in the IBIS file. Using generic model.'%(pinName))
+                print('E029: IBIS model type is not supported: %s' %(dq_model_type))
+                raise SystemExit
+            sub.append('+ file = "%s"' % (thisComp.compModelPath))      # absolute path
+            #sub.append("+ file = '%s'" % ('../models/'  + thisComp.compModelFile))            # relative path
+            sub.append('+ model = "%s"' %(thisByte.dq0.ddrModelTx[0]))   # ATTN
+            sub.append("+ typ = typ")
+            #sub.append("+ buffer = 3") # 1-Input; 2-Output; 3-I/O; 4-Three state
+            sub.append("v_en nd_en 0 %s" % (thisComp.compIbis.ibis_model2enable[thisByte.dq0.ddrModelTx[0]]))
+            sub.append("x_pin nd_die_out nd_pin_out %s rpin='rpin' lpin='lpin' cpin='cpin'" % (pin_rlc))
+            sub.append("x_ddr_pkg nd_pin_out nd_pkg_out %s" % (ddr_pkg))
+            tx_model_dq = lib.add('ddr_tx_dq', "nd_pkg_out nd_in rpin=100m lpin=1nH cpin=0.2pF", sub)
+            if thisByte.dq0.ddrPin in thisComp.compIbis.ibis_pin2rpin.keys() and not thisComp.compIbis.ibis_pin2rpin[thisByte.dq0.ddrPin] == '':
+                deck.append("xtx_dq0 dq0_ddr_bga dq0_in %s rpin=%s lpin=%s cpin=%s" %(tx_model_dq, thisComp.compIbis.ibis_pin2rpin[thisByte.dq0.ddrPin], thisComp.compIbis.ibis_pin2lpin[thisByte.dq0.ddrPin], thisComp.compIbis.ibis_pin2cpin[thisByte.dq0.ddrPin]))
+                deck.append("xtx_dq1 dq1_ddr_bga dq1_in %s rpin=%s lpin=%s cpin=%s" %(tx_model_dq, thisComp.compIbis.ibis_pin2rpin[thisByte.dq1.ddrPin], thisComp.compIbis.ibis_pin2lpin[thisByte.dq1.ddrPin], thisComp.compIbis.ibis_pin2cpin[thisByte.dq1.ddrPin]))
+                deck.append("xtx_dq2 dq2_ddr_bga dq2_in %s rpin=%s lpin=%s cpin=%s" %(tx_model_dq, thisComp.compIbis.ibis_pin2rpin[thisByte.dq2.ddrPin], thisComp.compIbis.ibis_pin2lpin[thisByte.dq2.ddrPin], thisComp.compIbis.ibis_pin2cpin[thisByte.dq2.ddrPin]))
+                deck.append("xtx_dq3 dq3_ddr_bga dq3_in %s rpin=%s lpin=%s cpin=%s" %(tx_model_dq, thisComp.compIbis.ibis_pin2rpin[thisByte.dq3.ddrPin], thisComp.compIbis.ibis_pin2lpin[thisByte.dq3.ddrPin], thisComp.compIbis.ibis_pin2cpin[thisByte.dq3.ddrPin]))
+                deck.append("xtx_dq4 dq4_ddr_bga dq4_in %s rpin=%s lpin=%s cpin=%s" %(tx_model_dq, thisComp.compIbis.ibis_pin2rpin[thisByte.dq4.ddrPin], thisComp.compIbis.ibis_pin2lpin[thisByte.dq4.ddrPin], thisComp.compIbis.ibis_pin2cpin[thisByte.dq4.ddrPin]))
+                deck.append("xtx_dq5 dq5_ddr_bga dq5_in %s rpin=%s lpin=%s cpin=%s" %(tx_model_dq, thisComp.compIbis.ibis_pin2rpin[thisByte.dq5.ddrPin], thisComp.compIbis.ibis_pin2lpin[thisByte.dq5.ddrPin], thisComp.compIbis.ibis_pin2cpin[thisByte.dq5.ddrPin]))
+                deck.append("xtx_dq6 dq6_ddr_bga dq6_in %s rpin=%s lpin=%s cpin=%s" %(tx_model_dq, thisComp.compIbis.ibis_pin2rpin[thisByte.dq6.ddrPin], thisComp.compIbis.ibis_pin2lpin[thisByte.dq6.ddrPin], thisComp.compIbis.ibis_pin2cpin[thisByte.dq6.ddrPin]))
+                deck.append("xtx_dq7 dq7_ddr_bga dq7_in %s rpin=%s lpin=%s cpin=%s" %(tx_model_dq, thisComp.compIbis.ibis_pin2rpin[thisByte.dq7.ddrPin], thisComp.compIbis.ibis_pin2lpin[thisByte.dq7.ddrPin], thisComp.compIbis.ibis_pin2cpin[thisByte.dq7.ddrPin]))
             else:
-                rx_model = rx_model_candidate[0]
-            logging.debug('D035: IBIS Rx model for pin %s is %s. Model Type is %s.'%(pinName, rx_model, thisComp.compIbis.ibis_model2type[rx_model]))        
-            return [tx_model, rx_model]
-
-        # Determine model for Telechips part
-        if thisComp.compManufacture.lower() == 'telechips':
-            #pbsstl_100 1X Driver
-            #pbsstl_101 2X Driver
-            #pbsstl_110 3X Driver
-            #pbsstl_111 4X Driver
-            #ODT120        ODT120_ZQ240
-            #ODT60         ODT60_ZQ240
-            #ODT40         ODT40_ZQ240
-            #ODT30         ODT30_ZQ240
-            # Tx model
-            DS = '_111'
-            tx_model_candidate = []
-            tx_model = ''
-            for thisModel in modelNameList:
-                if DS in thisModel.split()[0] and 'ODT' not in thisModel.split()[0]:
-                    tx_model_candidate.append(thisModel.split()[0])
-            if len(tx_model_candidate) == 0:
-                print('W05 - Telechips Part: Cannot find coresponding datarate (%s) for pin %s in the IBIS model. Using generic model.'%(thisInterface.dataRate, pinName))
-                tx_model = modelNameList[0].split()[0]  # use the first model in the list
+                deck.append("xtx_dq0 dq0_ddr_bga dq0_in %s" % (tx_model_dq))
+                deck.append("xtx_dq1 dq1_ddr_bga dq1_in %s" % (tx_model_dq))
+                deck.append("xtx_dq2 dq2_ddr_bga dq2_in %s" % (tx_model_dq))
+                deck.append("xtx_dq3 dq3_ddr_bga dq3_in %s" % (tx_model_dq))
+                deck.append("xtx_dq4 dq4_ddr_bga dq4_in %s" % (tx_model_dq))
+                deck.append("xtx_dq5 dq5_ddr_bga dq5_in %s" % (tx_model_dq))
+                deck.append("xtx_dq6 dq6_ddr_bga dq6_in %s" % (tx_model_dq))
+                deck.append("xtx_dq7 dq7_ddr_bga dq7_in %s" % (tx_model_dq))
+            sub = []
+            dqs_model_type = thisComp.compIbis.ibis_model2type[thisByte.dqs_p.ddrModelTx[0]]
+            if (dqs_model_type.lower() == 'i/o'):
+                sub.append("B_dq nd_pu nd_pd nd_die_out nd_in nd_en nd_dig_out")
+            elif (dqs_model_type.lower() == '3-state'):    
+                sub.append("B_dq nd_pu nd_pd nd_die_out nd_in nd_en")
             else:
-                tx_model = tx_model_candidate[0]
-            logging.debug('D036: Tx model for pin %s is %s. Model Type is %s.'%(pinName, tx_model, thisComp.compIbis.ibis_model2type[tx_model]))
-            # Rx model
-            ODT = 'ODT40'  # choose from: '', 'ODT30', 'ODT40', 'ODT60', 'ODT120'
-            rx_model_candidate = []
-            rx_model = ''
-            for thisModel in modelNameList:
-                if ODT in thisModel.split()[0]:
-                    rx_model_candidate.append(thisModel.split()[0])
-            if len(rx_model_candidate)==0:
-                print('W06: Telechips Part: Cannot find coresponding datarate (%s) for pin %s. Using generic model.'%(thisInterface.dataRate, pinName))
-                rx_model = modelNameList[0].split()[0]  # use the first model in the list
+                print('E030: IBIS model type is not supported: %s' %(dqs_model_type))
+                raise SystemExit                
+            sub.append('+ file = "%s"' % (thisComp.compModelPath))
+            #sub.append("+ file = '%s'" % ('../models/'  + thisComp.compModelFile))            # relative path
+            sub.append('+ model = "%s"' %(thisByte.dqs_p.ddrModelTx[0])) # ATTN: Assuming DQS_P and DQS_N using same model (mostly true).
+            sub.append("+ typ = typ")
+            #sub.append("+ buffer = 3") 
+            sub.append("v_en nd_en 0 %s" % (thisComp.compIbis.ibis_model2enable[thisByte.dqs_p.ddrModelTx[0]]))  # enabled
+            sub.append("x_pin nd_die_out nd_pin_out %s rpin='rpin' lpin='lpin' cpin='cpin'" % (pin_rlc))
+            sub.append("x_ddr_pkg nd_pin_out nd_pkg_out %s" % (ddr_pkg))
+            tx_model_dqs = lib.add('ddr_tx_dqs', "nd_pkg_out nd_in rpin=100m lpin=1nH cpin=0.2pF", sub)
+            if thisByte.dqs_p.ddrPin in thisComp.compIbis.ibis_pin2rpin.keys() and not thisComp.compIbis.ibis_pin2rpin[thisByte.dqs_p.ddrPin] == '':
+                deck.append("xtx_dqsp dqs_p_ddr_bga dqs_p_in %s rpin=%s lpin=%s cpin=%s" %(tx_model_dqs, thisComp.compIbis.ibis_pin2rpin[thisByte.dqs_p.ddrPin], thisComp.compIbis.ibis_pin2lpin[thisByte.dqs_p.ddrPin],thisComp.compIbis.ibis_pin2cpin[thisByte.dqs_p.ddrPin]))
+                deck.append("xtx_dqsn dqs_n_ddr_bga dqs_n_in %s rpin=%s lpin=%s cpin=%s" %(tx_model_dqs, thisComp.compIbis.ibis_pin2rpin[thisByte.dqs_n.ddrPin], thisComp.compIbis.ibis_pin2lpin[thisByte.dqs_n.ddrPin], thisComp.compIbis.ibis_pin2cpin[thisByte.dqs_n.ddrPin]))
             else:
-                rx_model = rx_model_candidate[0]
-            print ('rx_model: ' + rx_model)
-            logging.debug('D037: Rx model for pin %s is %s. Model Type is %s.'%(pinName, rx_model, thisComp.compIbis.ibis_model2type[rx_model]))
-            return [tx_model, rx_model]
-        
-        return ['', '']
-
-    def generateByteDeck(self, deckType):
-        if len(self.interfaces) > 1:
-            print('EG01: More than one interface in current configure file. Current not supported.')
-            raise SystemExit
-        thisInterface = self.interfaces[0]
-        for i in range(len(self.interfaces[0].byte)):
-            thisByte = self.interfaces[0].byte[i]
-            deckfile = self.modelPath + '/../decks/' + 'byte' + thisByte.byteID + '_' + deckType + '.sp'
-            deck = []   # the content of deck
-            # header
-            deck.append("* Deck for Byte%s %s\n"%(thisByte.byteID , deckType.upper()))
-            deck.append(".options post probe")
-            deck.append("* .options method=gear dcon=1 converge=1")
-            deck.append(".tran 10p 100n")
-            deck.append("")
-            # data and clock pattern
-            param_ground = '0.000'
-            param_vcc = '1.500'
-            param_datarate = thisInterface.dataRate+'e6'
-            param_freq = str(float(param_datarate)/2)
-            param_delay = '1e-9'
-            param_dataslew = '50e-12'
-            param_dataclkslew = '50e-12'
-            param_pulsewidth = str(1/float(param_datarate)-float(param_dataslew))
-            param_per = str(2/float(param_datarate))
-            deck.append("*********************************")
-            deck.append("***** DATA AND CLK PATTERN ******")
-            deck.append("*********************************")
-            deck.append(".param ground = %s" %(param_ground))
-            deck.append(".param vcc = %s" %(param_vcc))
-            deck.append(".param delay = %s" %(param_delay))
-            deck.append(".param dataslew = %s" %(param_dataslew))
-            deck.append(".param dataclkslew = %s" %(param_dataclkslew))
-            deck.append(".param datarate = %se6" % (thisInterface.dataRate))
-            deck.append(".param freq = 'datarate/2'")
-            deck.append(".param pulsewidth = '1/datarate - dataslew'")
-            deck.append(".param clkpw = '1/datarate - dataclkslew'")
-            deck.append(".param per = '2*(1/datarate)'")
-            deck.append(".param clkper = '2*(1/datarate)'")
-            deck.append(".param delayclk = 'delay-(clkper/4)'")
-            deck.append("")
-            # DQ, DQS excitations
-            deck.append("* DQ, DQS pattern")
-            deck.append("* V_dq0 dq0_in 0 LFSR ground vcc delay dataslew dataslew datarate 80 [7,6]  rout=0")
-            for k in range(8):
-                if k == 4:
-                    deck.append("V_dq%s dq%s_in 0 LFSR %s %s %s %s %s %s 17 [7,6]  rout=0" %(str(k), str(k), param_ground, param_vcc, param_delay, param_dataslew, param_dataslew, param_datarate))
-                else:
-                    deck.append("V_dq%s dq%s_in 0 LFSR %s %s %s %s %s %s 80 [7,6]  rout=0" %(str(k), str(k), param_ground, param_vcc, param_delay, param_dataslew, param_dataslew, param_datarate))
-            deck.append("* V_dqs_p dqs_p_in 0 PULSE ground vcc delay dataslew dataslew pulsewidth per")
-            deck.append("V_dqs_p dqs_p_in 0 PULSE %s %s %s %s %s %s %s" %(param_ground, param_vcc, param_delay, param_dataslew, param_dataslew, param_pulsewidth, param_per))
-            deck.append("V_dqs_n dqs_n_in 0 PULSE %s %s %s %s %s %s %s"%(param_vcc, param_ground, param_delay, param_dataslew, param_dataslew, param_pulsewidth, param_per))
+                deck.append("xtx_dqsp dqs_p_ddr_bga dqs_p_in %s" % (tx_model_dqs))
+                deck.append("xtx_dqsn dqs_n_ddr_bga dqs_n_in %s" % (tx_model_dqs))
             deck.append("")
             
-            if deckType == 'rd':
-                # DDR model: Tx 
-                thisComp = self.getComp(thisInterface, thisByte.ddrComp)
-                deck.append("*********************************")
-                deck.append("******* DDR Model (Tx) **********")
-                deck.append("*********************************")
-                # DQ subckt model, includes pkg model
-                deck.append("******* DQ subckt *******")
-                dq_model_type = thisComp.compIbis.ibis_model2type[thisByte.dq0.ddrModelTx[0]]
-                deck.append(".subckt tx_model_dq nd_pkg_out nd_in rpin=100m lpin=1nH cpin=0.2pF")
-                if (dq_model_type.lower() == 'i/o'):
-                    deck.append("B_dq nd_pu nd_pd nd_die_out nd_in nd_en nd_dig_out")
-                elif (dq_model_type.lower() == '3-state'):    
-                    deck.append("B_dq nd_pu nd_pd nd_die_out nd_in nd_en")
-                else:
-                    print('E029: IBIS model type is not supported: %s' %(dq_model_type))
-                    raise SystemExit
-                deck.append('+ file = "%s"' % (self.modelPath + "/" + thisComp.compModelFile))      # absolute path
-                #deck.append("+ file = '%s'" % ('../models/'  + thisComp.compModelFile))            # relative path
-                deck.append('+ model = "%s"' %(thisByte.dq0.ddrModelTx[0]))   # ATTN
-                deck.append("+ typ = typ")
-                #deck.append("+ buffer = 3") # 1-Input; 2-Output; 3-I/O; 4-Three state
-                deck.append("v_en nd_en 0 %s" % (thisComp.compIbis.ibis_model2enable[thisByte.dq0.ddrModelTx[0]]))
-                deck.append("x_pin nd_die_out nd_pin_out pin_rlc rpin='rpin' lpin='lpin' cpin='cpin'")
-                deck.append("x_ddr_pkg nd_pin_out nd_pkg_out ddr_pkg")
-                deck.append(".ends")
-                deck.append("")
-                if thisByte.dq0.ddrPin in thisComp.compIbis.ibis_pin2rpin.keys() and not thisComp.compIbis.ibis_pin2rpin[thisByte.dq0.ddrPin] == '':
-                    deck.append("xtx_dq0 dq0_ddr_bga dq0_in tx_model_dq rpin=%s lpin=%s cpin=%s" %(thisComp.compIbis.ibis_pin2rpin[thisByte.dq0.ddrPin], thisComp.compIbis.ibis_pin2lpin[thisByte.dq0.ddrPin], thisComp.compIbis.ibis_pin2cpin[thisByte.dq0.ddrPin]))
-                    deck.append("xtx_dq1 dq1_ddr_bga dq1_in tx_model_dq rpin=%s lpin=%s cpin=%s" %(thisComp.compIbis.ibis_pin2rpin[thisByte.dq1.ddrPin], thisComp.compIbis.ibis_pin2lpin[thisByte.dq1.ddrPin], thisComp.compIbis.ibis_pin2cpin[thisByte.dq1.ddrPin]))
-                    deck.append("xtx_dq2 dq2_ddr_bga dq2_in tx_model_dq rpin=%s lpin=%s cpin=%s" %(thisComp.compIbis.ibis_pin2rpin[thisByte.dq2.ddrPin], thisComp.compIbis.ibis_pin2lpin[thisByte.dq2.ddrPin], thisComp.compIbis.ibis_pin2cpin[thisByte.dq2.ddrPin]))
-                    deck.append("xtx_dq3 dq3_ddr_bga dq3_in tx_model_dq rpin=%s lpin=%s cpin=%s" %(thisComp.compIbis.ibis_pin2rpin[thisByte.dq3.ddrPin], thisComp.compIbis.ibis_pin2lpin[thisByte.dq3.ddrPin], thisComp.compIbis.ibis_pin2cpin[thisByte.dq3.ddrPin]))
-                    deck.append("xtx_dq4 dq4_ddr_bga dq4_in tx_model_dq rpin=%s lpin=%s cpin=%s" %(thisComp.compIbis.ibis_pin2rpin[thisByte.dq4.ddrPin], thisComp.compIbis.ibis_pin2lpin[thisByte.dq4.ddrPin], thisComp.compIbis.ibis_pin2cpin[thisByte.dq4.ddrPin]))
-                    deck.append("xtx_dq5 dq5_ddr_bga dq5_in tx_model_dq rpin=%s lpin=%s cpin=%s" %(thisComp.compIbis.ibis_pin2rpin[thisByte.dq5.ddrPin], thisComp.compIbis.ibis_pin2lpin[thisByte.dq5.ddrPin], thisComp.compIbis.ibis_pin2cpin[thisByte.dq5.ddrPin]))
-                    deck.append("xtx_dq6 dq6_ddr_bga dq6_in tx_model_dq rpin=%s lpin=%s cpin=%s" %(thisComp.compIbis.ibis_pin2rpin[thisByte.dq6.ddrPin], thisComp.compIbis.ibis_pin2lpin[thisByte.dq6.ddrPin], thisComp.compIbis.ibis_pin2cpin[thisByte.dq6.ddrPin]))
-                    deck.append("xtx_dq7 dq7_ddr_bga dq7_in tx_model_dq rpin=%s lpin=%s cpin=%s" %(thisComp.compIbis.ibis_pin2rpin[thisByte.dq7.ddrPin], thisComp.compIbis.ibis_pin2lpin[thisByte.dq7.ddrPin], thisComp.compIbis.ibis_pin2cpin[thisByte.dq7.ddrPin]))
-                else:
-                    deck.append("xtx_dq0 dq0_ddr_bga dq0_in tx_model_dq")
-                    deck.append("xtx_dq1 dq1_ddr_bga dq1_in tx_model_dq")
-                    deck.append("xtx_dq2 dq2_ddr_bga dq2_in tx_model_dq")
-                    deck.append("xtx_dq3 dq3_ddr_bga dq3_in tx_model_dq")
-                    deck.append("xtx_dq4 dq4_ddr_bga dq4_in tx_model_dq")
-                    deck.append("xtx_dq5 dq5_ddr_bga dq5_in tx_model_dq")
-                    deck.append("xtx_dq6 dq6_ddr_bga dq6_in tx_model_dq")
-                    deck.append("xtx_dq7 dq7_ddr_bga dq7_in tx_model_dq")
-                deck.append("\n******* DQS subckt *******")
-                deck.append(".subckt tx_model_dqs nd_pkg_out nd_in rpin=100m lpin=1nH cpin=0.2pF")
-                dqs_model_type = thisComp.compIbis.ibis_model2type[thisByte.dqs_p.ddrModelTx[0]]
-                if (dqs_model_type.lower() == 'i/o'):
-                    deck.append("B_dq nd_pu nd_pd nd_die_out nd_in nd_en nd_dig_out")
-                elif (dqs_model_type.lower() == '3-state'):    
-                    deck.append("B_dq nd_pu nd_pd nd_die_out nd_in nd_en")
-                else:
-                    print('E030: IBIS model type is not supported: %s' %(dqs_model_type))
-                    raise SystemExit                
-                deck.append('+ file = "%s"' % (self.modelPath + "/" + thisComp.compModelFile))
-                #deck.append("+ file = '%s'" % ('../models/'  + thisComp.compModelFile))            # relative path
-                deck.append('+ model = "%s"' %(thisByte.dqs_p.ddrModelTx[0])) # ATTN: Assuming DQS_P and DQS_N using same model (mostly true).
-                deck.append("+ typ = typ")
-                #deck.append("+ buffer = 3") 
-                deck.append("v_en nd_en 0 %s" % (thisComp.compIbis.ibis_model2enable[thisByte.dqs_p.ddrModelTx[0]]))  # enabled
-                deck.append("x_pin nd_die_out nd_pin_out pin_rlc rpin='rpin' lpin='lpin' cpin='cpin'")
-                deck.append("x_ddr_pkg nd_pin_out nd_pkg_out ddr_pkg")
-                deck.append(".ends")
-                deck.append("")
-                if thisByte.dqs_p.ddrPin in thisComp.compIbis.ibis_pin2rpin.keys() and not thisComp.compIbis.ibis_pin2rpin[thisByte.dqs_p.ddrPin] == '':
-                    deck.append("xtx_dqsp dqs_p_ddr_bga dqs_p_in tx_model_dqs rpin=%s lpin=%s cpin=%s" %(thisComp.compIbis.ibis_pin2rpin[thisByte.dqs_p.ddrPin], thisComp.compIbis.ibis_pin2lpin[thisByte.dqs_p.ddrPin],thisComp.compIbis.ibis_pin2cpin[thisByte.dqs_p.ddrPin]))
-                    deck.append("xtx_dqsn dqs_n_ddr_bga dqs_n_in tx_model_dqs rpin=%s lpin=%s cpin=%s" %(thisComp.compIbis.ibis_pin2rpin[thisByte.dqs_n.ddrPin], thisComp.compIbis.ibis_pin2lpin[thisByte.dqs_n.ddrPin], thisComp.compIbis.ibis_pin2cpin[thisByte.dqs_n.ddrPin]))
-                else:
-                    deck.append("xtx_dqsp dqs_p_ddr_bga dqs_p_in tx_model_dqs")
-                    deck.append("xtx_dqsn dqs_n_ddr_bga dqs_n_in tx_model_dqs")
-                deck.append("")
-                
-                # SoC model: Rx
-                thisComp = self.getComp(thisInterface, thisByte.socComp)
-                deck.append("*********************************")
-                deck.append("******* SoC Model (Rx) **********")
-                deck.append("*********************************")
-                deck.append("******* DQ Rx subckt *******")
-                deck.append(".subckt rx_model_dq rx_pkg_in rx_dig_out rpin=100m lpin=1nH cpin=0.2pF")
-                #logging.debug('The DQ Rx model for this byte is: %s, pin %s' % (thisByte.dq0.socModelRx, thisByte.dq0.socPin))
-                dq_model_type = thisComp.compIbis.ibis_model2type[thisByte.dq0.socModelRx]
-                if (dq_model_type.lower() == 'i/o'):
-                    deck.append("v_en nd_en 0 %s" % (str(1-int(thisComp.compIbis.ibis_model2enable[thisByte.dq0.socModelRx]))))  # disabled                 
-                    deck.append("B_dq nd_pu nd_pd rx_pad nd_in nd_en rx_dig_out")
-                elif (dq_model_type.lower() == 'input'):    
-                    deck.append("B_dq nd_pc nd_gc rx_pad rx_dig_out")    
-                else:
-                    print('E031: IBIS model type is not supported: %s' %(dq_model_type))
-                    raise SystemExit
-                deck.append('+ file = "%s"' % (self.modelPath + "/" + thisComp.compModelFile))
-                #deck.append("+ file = '%s'" % ('../models/'  + thisComp.compModelFile))            # relative path
-                deck.append('+ model = "%s"' %(thisByte.dq0.socModelRx))
-                deck.append("+ typ = typ")
-                #deck.append("+ buffer = 3") # 1-Input; 2-Output; 3-I/O; 4-Three state
-                deck.append("x_pin rx_pad nd_pin_in pin_rlc rpin='rpin' lpin='lpin' cpin='cpin'")
-                #deck.append("x_pin rx_pad nd_pin_in pin_rlc")
-                deck.append("x_soc_pkg rx_pad rx_pkg_in soc_pkg")
-                deck.append(".ends")
-                deck.append("")
-                # Generic Rx model
-                #deck.append(".subckt rx_model rx_pkg_in")
-                #deck.append("x_rx rx_pad rx_pkg_in soc_pkg")
-                #deck.append("*R_pu rx_pad vcc R_ODT")
-                #deck.append("*R_pd rx_pad 0 R_ODT")
-                #deck.append("C_pin rx_pad 0 1.8pF")
-                #deck.append(".ends")
-                #deck.append("")
-                if thisByte.dq0.socPin in thisComp.compIbis.ibis_pin2rpin.keys() and not thisComp.compIbis.ibis_pin2rpin[thisByte.dq0.socPin] == '':
-                    deck.append("xrx_dq0 dq0_soc_bga dq0_dig_out rx_model_dq rpin=%s lpin=%s cpin=%s" %(thisComp.compIbis.ibis_pin2rpin[thisByte.dq0.socPin], thisComp.compIbis.ibis_pin2lpin[thisByte.dq0.socPin], thisComp.compIbis.ibis_pin2cpin[thisByte.dq0.socPin]))
-                    deck.append("xrx_dq1 dq1_soc_bga dq1_dig_out rx_model_dq rpin=%s lpin=%s cpin=%s" %(thisComp.compIbis.ibis_pin2rpin[thisByte.dq1.socPin], thisComp.compIbis.ibis_pin2lpin[thisByte.dq1.socPin], thisComp.compIbis.ibis_pin2cpin[thisByte.dq1.socPin]))
-                    deck.append("xrx_dq2 dq2_soc_bga dq2_dig_out rx_model_dq rpin=%s lpin=%s cpin=%s" %(thisComp.compIbis.ibis_pin2rpin[thisByte.dq2.socPin], thisComp.compIbis.ibis_pin2lpin[thisByte.dq2.socPin], thisComp.compIbis.ibis_pin2cpin[thisByte.dq2.socPin]))
-                    deck.append("xrx_dq3 dq3_soc_bga dq3_dig_out rx_model_dq rpin=%s lpin=%s cpin=%s" %(thisComp.compIbis.ibis_pin2rpin[thisByte.dq3.socPin], thisComp.compIbis.ibis_pin2lpin[thisByte.dq3.socPin], thisComp.compIbis.ibis_pin2cpin[thisByte.dq3.socPin]))
-                    deck.append("xrx_dq4 dq4_soc_bga dq4_dig_out rx_model_dq rpin=%s lpin=%s cpin=%s" %(thisComp.compIbis.ibis_pin2rpin[thisByte.dq4.socPin], thisComp.compIbis.ibis_pin2lpin[thisByte.dq4.socPin], thisComp.compIbis.ibis_pin2cpin[thisByte.dq4.socPin]))
-                    deck.append("xrx_dq5 dq5_soc_bga dq5_dig_out rx_model_dq rpin=%s lpin=%s cpin=%s" %(thisComp.compIbis.ibis_pin2rpin[thisByte.dq5.socPin], thisComp.compIbis.ibis_pin2lpin[thisByte.dq5.socPin], thisComp.compIbis.ibis_pin2cpin[thisByte.dq5.socPin]))
-                    deck.append("xrx_dq6 dq6_soc_bga dq6_dig_out rx_model_dq rpin=%s lpin=%s cpin=%s" %(thisComp.compIbis.ibis_pin2rpin[thisByte.dq6.socPin], thisComp.compIbis.ibis_pin2lpin[thisByte.dq6.socPin], thisComp.compIbis.ibis_pin2cpin[thisByte.dq6.socPin]))
-                    deck.append("xrx_dq7 dq7_soc_bga dq7_dig_out rx_model_dq rpin=%s lpin=%s cpin=%s" %(thisComp.compIbis.ibis_pin2rpin[thisByte.dq7.socPin], thisComp.compIbis.ibis_pin2lpin[thisByte.dq7.socPin], thisComp.compIbis.ibis_pin2cpin[thisByte.dq7.socPin]))
-                else:
-                    deck.append("xrx_dq0 dq0_soc_bga dq0_dig_out rx_model_dq")
-                    deck.append("xrx_dq1 dq1_soc_bga dq1_dig_out rx_model_dq")
-                    deck.append("xrx_dq2 dq2_soc_bga dq2_dig_out rx_model_dq")
-                    deck.append("xrx_dq3 dq3_soc_bga dq3_dig_out rx_model_dq")
-                    deck.append("xrx_dq4 dq4_soc_bga dq4_dig_out rx_model_dq")
-                    deck.append("xrx_dq5 dq5_soc_bga dq5_dig_out rx_model_dq")
-                    deck.append("xrx_dq6 dq6_soc_bga dq6_dig_out rx_model_dq")
-                    deck.append("xrx_dq7 dq7_soc_bga dq7_dig_out rx_model_dq")
-                    
-                deck.append("\n******* DQS Rx subckt *******")
-                deck.append(".subckt rx_model_dqs rx_pkg_in rx_dig_out rpin=100m lpin=1nH cpin=0.2pF")
-                dqs_model_type = thisComp.compIbis.ibis_model2type[thisByte.dqs_p.socModelRx]
-                if (dqs_model_type.lower() == 'i/o'):
-                    deck.append("v_en nd_en 0 %s" % (str(1-int(thisComp.compIbis.ibis_model2enable[thisByte.dqs_p.socModelRx]))))                    
-                    deck.append("B_dq nd_pu nd_pd rx_pad nd_in nd_en rx_dig_out")
-                elif (dqs_model_type.lower() == 'input'):    
-                    deck.append("B_dq nd_pc nd_gc rx_pad rx_dig_out")    
-                else:
-                    print('E031: IBIS model type is not supported: %s' %(dqs_model_type))
-                    raise SystemExit
-                deck.append('+ file = "%s"' % (self.modelPath + "/" + thisComp.compModelFile))
-                #deck.append("+ file = '%s'" % ('../models/'  + thisComp.compModelFile))            # relative path
-                deck.append('+ model = "%s"' %(thisByte.dqs_p.socModelRx))
-                deck.append("+ typ = typ")
-                #deck.append("+ buffer = 3") # 1-Input; 2-Output; 3-I/O; 4-Three state
-                deck.append("x_pin rx_pad nd_pin_in pin_rlc rpin='rpin' lpin='lpin' cpin='cpin'")
-                #deck.append("x_pin rx_pad nd_pin_in pin_rlc")
-                deck.append("x_soc_pkg rx_pad rx_pkg_in soc_pkg")
-                deck.append(".ends")
-                deck.append("")
-                if thisByte.dqs_p.socPin in thisComp.compIbis.ibis_pin2rpin.keys() and not thisComp.compIbis.ibis_pin2rpin[thisByte.dqs_p.socPin] == '':
-                    deck.append("xrx_dqsp dqs_p_soc_bga dqs_p_dig_out rx_model_dqs rpin=%s lpin=%s cpin=%s" %(thisComp.compIbis.ibis_pin2rpin[thisByte.dqs_p.socPin], thisComp.compIbis.ibis_pin2lpin[thisByte.dqs_p.socPin],thisComp.compIbis.ibis_pin2cpin[thisByte.dqs_p.socPin]))
-                    deck.append("xrx_dqsn dqs_n_soc_bga dqs_n_dig_out rx_model_dqs rpin=%s lpin=%s cpin=%s" %(thisComp.compIbis.ibis_pin2rpin[thisByte.dqs_n.socPin], thisComp.compIbis.ibis_pin2lpin[thisByte.dqs_n.socPin], thisComp.compIbis.ibis_pin2cpin[thisByte.dqs_n.socPin]))
-                else:
-                    deck.append("xrx_dqsp dqs_p_soc_bga dqs_p_dig_out rx_model_dqs")
-                    deck.append("xrx_dqsn dqs_n_soc_bga dqs_n_dig_out rx_model_dqs")
-                deck.append("")
-                
-            
-            if  deckType == 'wt':
-                # SoC model: Tx 
-                thisComp = self.getComp(thisInterface, thisByte.socComp)
-                deck.append("*********************************")
-                deck.append("******* SoC Model (Tx) **********")
-                deck.append("*********************************")
-                # DQ subckt model, includes pkg model
-                deck.append("* DQ subckt")
-                dq_model_type = thisComp.compIbis.ibis_model2type[thisByte.dq0.socModelTx]
-                deck.append(".subckt tx_model_dq nd_pkg_out nd_in rpin=100m lpin=1nH cpin=0.2pF")
-                if (dq_model_type.lower() == 'i/o'):
-                    deck.append("B_dq nd_pu nd_pd nd_die_out nd_in nd_en nd_dig_out")
-                elif (dq_model_type.lower() == '3-state'):    
-                    deck.append("B_dq nd_pu nd_pd nd_die_out nd_in nd_en")
-                else:
-                    print('E029: IBIS model type is not supported: %s' %(dq_model_type))
-                    raise SystemExit
-                deck.append('+ file = "%s"' % (self.modelPath + "/" + thisComp.compModelFile))      # absolute path
-                #deck.append("+ file = '%s'" % ('../models/'  + thisComp.compModelFile))            # relative path
-                deck.append('+ model = "%s"' %(thisByte.dq0.socModelTx))   # ATTN
-                deck.append("+ typ = typ")
-                #deck.append("+ buffer = 3") # 1-Input; 2-Output; 3-I/O; 4-Three state
-                deck.append("v_en nd_en 0 %s" % (thisComp.compIbis.ibis_model2enable[thisByte.dq0.socModelTx]))    # enabled
-                deck.append("x_pin nd_die_out nd_pin_out pin_rlc rpin='rpin' lpin='lpin' cpin='cpin'")
-                deck.append("x_soc_pkg nd_pin_out nd_pkg_out soc_pkg")
-                deck.append(".ends")
-                deck.append("")
-                if thisByte.dq0.socPin in thisComp.compIbis.ibis_pin2rpin.keys() and not thisComp.compIbis.ibis_pin2rpin[thisByte.dq0.socPin] == '':
-                    deck.append("xtx_dq0 dq0_soc_bga dq0_in tx_model_dq rpin=%s lpin=%s cpin=%s" %(thisComp.compIbis.ibis_pin2rpin[thisByte.dq0.socPin], thisComp.compIbis.ibis_pin2lpin[thisByte.dq0.socPin], thisComp.compIbis.ibis_pin2cpin[thisByte.dq0.socPin]))
-                    deck.append("xtx_dq1 dq1_soc_bga dq1_in tx_model_dq rpin=%s lpin=%s cpin=%s" %(thisComp.compIbis.ibis_pin2rpin[thisByte.dq1.socPin], thisComp.compIbis.ibis_pin2lpin[thisByte.dq1.socPin], thisComp.compIbis.ibis_pin2cpin[thisByte.dq1.socPin]))
-                    deck.append("xtx_dq2 dq2_soc_bga dq2_in tx_model_dq rpin=%s lpin=%s cpin=%s" %(thisComp.compIbis.ibis_pin2rpin[thisByte.dq2.socPin], thisComp.compIbis.ibis_pin2lpin[thisByte.dq2.socPin], thisComp.compIbis.ibis_pin2cpin[thisByte.dq2.socPin]))
-                    deck.append("xtx_dq3 dq3_soc_bga dq3_in tx_model_dq rpin=%s lpin=%s cpin=%s" %(thisComp.compIbis.ibis_pin2rpin[thisByte.dq3.socPin], thisComp.compIbis.ibis_pin2lpin[thisByte.dq3.socPin], thisComp.compIbis.ibis_pin2cpin[thisByte.dq3.socPin]))
-                    deck.append("xtx_dq4 dq4_soc_bga dq4_in tx_model_dq rpin=%s lpin=%s cpin=%s" %(thisComp.compIbis.ibis_pin2rpin[thisByte.dq4.socPin], thisComp.compIbis.ibis_pin2lpin[thisByte.dq4.socPin], thisComp.compIbis.ibis_pin2cpin[thisByte.dq4.socPin]))
-                    deck.append("xtx_dq5 dq5_soc_bga dq5_in tx_model_dq rpin=%s lpin=%s cpin=%s" %(thisComp.compIbis.ibis_pin2rpin[thisByte.dq5.socPin], thisComp.compIbis.ibis_pin2lpin[thisByte.dq5.socPin], thisComp.compIbis.ibis_pin2cpin[thisByte.dq5.socPin]))
-                    deck.append("xtx_dq6 dq6_soc_bga dq6_in tx_model_dq rpin=%s lpin=%s cpin=%s" %(thisComp.compIbis.ibis_pin2rpin[thisByte.dq6.socPin], thisComp.compIbis.ibis_pin2lpin[thisByte.dq6.socPin], thisComp.compIbis.ibis_pin2cpin[thisByte.dq6.socPin]))
-                    deck.append("xtx_dq7 dq7_soc_bga dq7_in tx_model_dq rpin=%s lpin=%s cpin=%s" %(thisComp.compIbis.ibis_pin2rpin[thisByte.dq7.socPin], thisComp.compIbis.ibis_pin2lpin[thisByte.dq7.socPin], thisComp.compIbis.ibis_pin2cpin[thisByte.dq7.socPin]))
-                else:
-                    deck.append("xtx_dq0 dq0_soc_bga dq0_in tx_model_dq")
-                    deck.append("xtx_dq1 dq1_soc_bga dq1_in tx_model_dq")
-                    deck.append("xtx_dq2 dq2_soc_bga dq2_in tx_model_dq")
-                    deck.append("xtx_dq3 dq3_soc_bga dq3_in tx_model_dq")
-                    deck.append("xtx_dq4 dq4_soc_bga dq4_in tx_model_dq")
-                    deck.append("xtx_dq5 dq5_soc_bga dq5_in tx_model_dq")
-                    deck.append("xtx_dq6 dq6_soc_bga dq6_in tx_model_dq")
-                    deck.append("xtx_dq7 dq7_soc_bga dq7_in tx_model_dq")                                  
-                deck.append("\n* DQS subckt")
-                deck.append(".subckt tx_model_dqs nd_pkg_out nd_in rpin=100m lpin=1nH cpin=0.2pF")
-                dqs_model_type = thisComp.compIbis.ibis_model2type[thisByte.dqs_p.socModelTx]
-                if (dqs_model_type.lower() == 'i/o'):
-                    deck.append("B_dq nd_pu nd_pd nd_die_out nd_in nd_en nd_dig_out")
-                elif (dqs_model_type.lower() == '3-state'):    
-                    deck.append("B_dq nd_pu nd_pd nd_die_out nd_in nd_en")
-                else:
-                    print('E030: IBIS model type is not supported: %s' %(dqs_model_type))
-                    raise SystemExit                
-                deck.append('+ file = "%s"' % (self.modelPath + "/" + thisComp.compModelFile))
-                #deck.append("+ file = '%s'" % ('../models/'  + thisComp.compModelFile))            # relative path
-                deck.append('+ model = "%s"' %(thisByte.dqs_p.socModelTx)) # ATTN: Assuming DQS_P and DQS_N using same model (mostly true).
-                deck.append("+ typ = typ")
-                #deck.append("+ buffer = 3") 
-                deck.append("v_en nd_en 0 %s" % (thisComp.compIbis.ibis_model2enable[thisByte.dqs_p.socModelTx]))
-                deck.append("x_pin nd_die_out nd_pin_out pin_rlc rpin='rpin' lpin='lpin' cpin='cpin'")
-                deck.append("x_soc_pkg nd_pin_out nd_pkg_out soc_pkg")
-                deck.append(".ends")
-                deck.append("")
-                if thisByte.dqs_p.socPin in thisComp.compIbis.ibis_pin2rpin.keys() and not thisComp.compIbis.ibis_pin2rpin[thisByte.dqs_p.socPin] == '':
-                    deck.append("xtx_dqsp dqs_p_soc_bga dqs_p_in tx_model_dqs rpin=%s lpin=%s cpin=%s" %(thisComp.compIbis.ibis_pin2rpin[thisByte.dqs_p.socPin], thisComp.compIbis.ibis_pin2lpin[thisByte.dqs_p.socPin],thisComp.compIbis.ibis_pin2cpin[thisByte.dqs_p.socPin]))
-                    deck.append("xtx_dqsn dqs_n_soc_bga dqs_n_in tx_model_dqs rpin=%s lpin=%s cpin=%s" %(thisComp.compIbis.ibis_pin2rpin[thisByte.dqs_n.socPin], thisComp.compIbis.ibis_pin2lpin[thisByte.dqs_n.socPin], thisComp.compIbis.ibis_pin2cpin[thisByte.dqs_n.socPin]))
-                else:
-                    deck.append("xtx_dqsp dqs_p_soc_bga dqs_p_in tx_model_dqs")
-                    deck.append("xtx_dqsn dqs_n_soc_bga dqs_n_in tx_model_dqs")                 
-                deck.append("")
-                
-                # DDR model: Rx
-                thisComp = self.getComp(thisInterface, thisByte.ddrComp)
-                deck.append("*********************************")
-                deck.append("******* DDR Model (Rx) **********")
-                deck.append("*********************************")
-                deck.append("* DQ Rx subckt")
-                deck.append(".subckt rx_model_dq rx_pkg_in rx_dig_out rpin=100m lpin=1nH cpin=0.2pF")
-                dq_model_type = thisComp.compIbis.ibis_model2type[thisByte.dq0.ddrModelRx[0]]
-                if (dq_model_type.lower() == 'i/o'):
-                    deck.append("v_en nd_en 0 %s" % (str(1-int(thisComp.compIbis.ibis_model2enable[thisByte.dq0.ddrModelRx[0]]))))                    
-                    deck.append("B_dq nd_pu nd_pd rx_pad nd_in nd_en rx_dig_out")
-                elif (dq_model_type.lower() == 'input'):    
-                    deck.append("B_dq nd_pc nd_gc rx_pad rx_dig_out")    
-                else:
-                    print('E031: IBIS model type is not supported: %s' %(dq_model_type))
-                    raise SystemExit
-                deck.append('+ file = "%s"' % (self.modelPath + "/" + thisComp.compModelFile))
-                #deck.append("+ file = '%s'" % ('../models/'  + thisComp.compModelFile))            # relative path
-                deck.append('+ model = "%s"' %(thisByte.dq0.ddrModelRx[0]))
-                deck.append("+ typ = typ")
-                #deck.append("+ buffer = 3") # 1-Input; 2-Output; 3-I/O; 4-Three state
-                deck.append("x_pin rx_pad nd_pin_in pin_rlc rpin='rpin' lpin='lpin' cpin='cpin'")
-                #deck.append("x_pin rx_pad nd_pin_in pin_rlc")
-                deck.append("x_ddr_pkg rx_pad rx_pkg_in ddr_pkg")
-                deck.append(".ends")
-                deck.append("")
-                # Generic Rx model
-                #deck.append(".subckt rx_model rx_pkg_in")
-                #deck.append("x_rx rx_pad rx_pkg_in ddr_pkg")
-                #deck.append("*R_pu rx_pad vcc R_ODT")
-                #deck.append("*R_pd rx_pad 0 R_ODT")
-                #deck.append("C_pin rx_pad 0 1.8pF")
-                #deck.append(".ends")
-                #deck.append("")
-                if thisByte.dq0.ddrPin in thisComp.compIbis.ibis_pin2rpin.keys() and not thisComp.compIbis.ibis_pin2rpin[thisByte.dq0.ddrPin] == '':
-                    deck.append("xrx_dq0 dq0_ddr_bga dq0_dig_out rx_model_dq rpin=%s lpin=%s cpin=%s" %(thisComp.compIbis.ibis_pin2rpin[thisByte.dq0.ddrPin], thisComp.compIbis.ibis_pin2lpin[thisByte.dq0.ddrPin], thisComp.compIbis.ibis_pin2cpin[thisByte.dq0.ddrPin]))
-                    deck.append("xrx_dq1 dq1_ddr_bga dq1_dig_out rx_model_dq rpin=%s lpin=%s cpin=%s" %(thisComp.compIbis.ibis_pin2rpin[thisByte.dq1.ddrPin], thisComp.compIbis.ibis_pin2lpin[thisByte.dq1.ddrPin], thisComp.compIbis.ibis_pin2cpin[thisByte.dq1.ddrPin]))
-                    deck.append("xrx_dq2 dq2_ddr_bga dq2_dig_out rx_model_dq rpin=%s lpin=%s cpin=%s" %(thisComp.compIbis.ibis_pin2rpin[thisByte.dq2.ddrPin], thisComp.compIbis.ibis_pin2lpin[thisByte.dq2.ddrPin], thisComp.compIbis.ibis_pin2cpin[thisByte.dq2.ddrPin]))
-                    deck.append("xrx_dq3 dq3_ddr_bga dq3_dig_out rx_model_dq rpin=%s lpin=%s cpin=%s" %(thisComp.compIbis.ibis_pin2rpin[thisByte.dq3.ddrPin], thisComp.compIbis.ibis_pin2lpin[thisByte.dq3.ddrPin], thisComp.compIbis.ibis_pin2cpin[thisByte.dq3.ddrPin]))
-                    deck.append("xrx_dq4 dq4_ddr_bga dq4_dig_out rx_model_dq rpin=%s lpin=%s cpin=%s" %(thisComp.compIbis.ibis_pin2rpin[thisByte.dq4.ddrPin], thisComp.compIbis.ibis_pin2lpin[thisByte.dq4.ddrPin], thisComp.compIbis.ibis_pin2cpin[thisByte.dq4.ddrPin]))
-                    deck.append("xrx_dq5 dq5_ddr_bga dq5_dig_out rx_model_dq rpin=%s lpin=%s cpin=%s" %(thisComp.compIbis.ibis_pin2rpin[thisByte.dq5.ddrPin], thisComp.compIbis.ibis_pin2lpin[thisByte.dq5.ddrPin], thisComp.compIbis.ibis_pin2cpin[thisByte.dq5.ddrPin]))
-                    deck.append("xrx_dq6 dq6_ddr_bga dq6_dig_out rx_model_dq rpin=%s lpin=%s cpin=%s" %(thisComp.compIbis.ibis_pin2rpin[thisByte.dq6.ddrPin], thisComp.compIbis.ibis_pin2lpin[thisByte.dq6.ddrPin], thisComp.compIbis.ibis_pin2cpin[thisByte.dq6.ddrPin]))
-                    deck.append("xrx_dq7 dq7_ddr_bga dq7_dig_out rx_model_dq rpin=%s lpin=%s cpin=%s" %(thisComp.compIbis.ibis_pin2rpin[thisByte.dq7.ddrPin], thisComp.compIbis.ibis_pin2lpin[thisByte.dq7.ddrPin], thisComp.compIbis.ibis_pin2cpin[thisByte.dq7.ddrPin]))
-                else:
-                    deck.append("xrx_dq0 dq0_ddr_bga dq0_dig_out rx_model_dq")
-                    deck.append("xrx_dq1 dq1_ddr_bga dq1_dig_out rx_model_dq")
-                    deck.append("xrx_dq2 dq2_ddr_bga dq2_dig_out rx_model_dq")
-                    deck.append("xrx_dq3 dq3_ddr_bga dq3_dig_out rx_model_dq")
-                    deck.append("xrx_dq4 dq4_ddr_bga dq4_dig_out rx_model_dq")
-                    deck.append("xrx_dq5 dq5_ddr_bga dq5_dig_out rx_model_dq")
-                    deck.append("xrx_dq6 dq6_ddr_bga dq6_dig_out rx_model_dq")
-                    deck.append("xrx_dq7 dq7_ddr_bga dq7_dig_out rx_model_dq")                                  
-                deck.append("\n* DQS Rx subckt")
-                deck.append(".subckt rx_model_dqs rx_pkg_in rx_dig_out rpin=100m lpin=1nH cpin=0.2pF")
-                dqs_model_type = thisComp.compIbis.ibis_model2type[thisByte.dqs_p.ddrModelRx[0]]
-                if (dqs_model_type.lower() == 'i/o'):
-                    deck.append("v_en nd_en 0 %s" % ((str(1-int(thisComp.compIbis.ibis_model2enable[thisByte.dqs_p.ddrModelRx[0]])))))                    
-                    deck.append("B_dq nd_pu nd_pd rx_pad nd_in nd_en rx_dig_out")
-                elif (dqs_model_type.lower() == 'input'):    
-                    deck.append("B_dq nd_pc nd_gc rx_pad rx_dig_out")    
-                else:
-                    print('E031: IBIS model type is not supported: %s' %(dqs_model_type))
-                    raise SystemExit
-                deck.append('+ file = "%s"' % (self.modelPath + "/" + thisComp.compModelFile))
-                #deck.append("+ file = '%s'" % ('../models/'  + thisComp.compModelFile))            # relative path
-                deck.append('+ model = "%s"' %(thisByte.dqs_p.ddrModelRx[0]))
-                deck.append("+ typ = typ")
-                #deck.append("+ buffer = 3") # 1-Input; 2-Output; 3-I/O; 4-Three state
-                deck.append("x_pin rx_pad nd_pin_in pin_rlc rpin='rpin' lpin='lpin' cpin='cpin'")
-                #deck.append("x_pin rx_pad nd_pin_in pin_rlc")
-                deck.append("x_ddr_pkg rx_pad rx_pkg_in ddr_pkg")
-                deck.append(".ends")
-                deck.append("")
-                if thisByte.dqs_p.ddrPin in thisComp.compIbis.ibis_pin2rpin.keys() and not thisComp.compIbis.ibis_pin2rpin[thisByte.dqs_p.ddrPin] == '':
-                    deck.append("xrx_dqsp dqs_p_ddr_bga dqs_p_dig_out rx_model_dqs rpin=%s lpin=%s cpin=%s" %(thisComp.compIbis.ibis_pin2rpin[thisByte.dqs_p.ddrPin], thisComp.compIbis.ibis_pin2lpin[thisByte.dqs_p.ddrPin],thisComp.compIbis.ibis_pin2cpin[thisByte.dqs_p.ddrPin]))
-                    deck.append("xrx_dqsn dqs_n_ddr_bga dqs_n_dig_out rx_model_dqs rpin=%s lpin=%s cpin=%s" %(thisComp.compIbis.ibis_pin2rpin[thisByte.dqs_n.ddrPin], thisComp.compIbis.ibis_pin2lpin[thisByte.dqs_n.ddrPin], thisComp.compIbis.ibis_pin2cpin[thisByte.dqs_n.ddrPin]))
-                else:
-                    deck.append("xrx_dqsp dqs_p_ddr_bga dqs_p_dig_out rx_model_dqs")
-                    deck.append("xrx_dqsn dqs_n_ddr_bga dqs_n_dig_out rx_model_dqs")
-                deck.append("")
-                
-            
+            # SoC model: Rx
+            thisComp = self.getComp(thisInterface, thisByte.socComp)
             deck.append("*********************************")
-            deck.append("****** PKG and Pin Model ********")
+            deck.append("******* SoC Model (Rx) **********")
             deck.append("*********************************")
-            # SoC package model
-            thisComp = self.getComp(thisInterface, thisByte.socComp)
-            deck.append("* SoC Package Model")
-            if not thisComp.r_pkg == '':
-                deck.append(".subckt soc_pkg pad pkg_out r2=%s l2=%s c2=%s" % (thisComp.r_pkg, thisComp.l_pkg, thisComp.c_pkg))
+            sub = []
+            #logging.debug('The DQ Rx model for this byte is: %s, pin %s' % (thisByte.dq0.socModelRx, thisByte.dq0.socPin))
+            dq_model_type = thisComp.compIbis.ibis_model2type[thisByte.dq0.socModelRx]
+            if (dq_model_type.lower() == 'i/o'):
+                sub.append("v_en nd_en 0 %s" % (str(1-int(thisComp.compIbis.ibis_model2enable[thisByte.dq0.socModelRx]))))  # disabled                 
+                sub.append("B_dq nd_pu nd_pd rx_pad nd_in nd_en rx_dig_out")
+            elif (dq_model_type.lower() == 'input'):    
+                sub.append("B_dq nd_pc nd_gc rx_pad rx_dig_out")    
             else:
-                deck.append(".subckt soc_pkg pad pkg_out r2=100m l2=1.5n c2=0.5p")
-            deck.append("R_pkg pad net1 r2")
-            deck.append("L_pkg net1 pkg_out l2")
-            deck.append("C_pkg pkg_out 0 c2")
-            deck.append(".ends")
-            deck.append("")
-            
-            # DDR package model
-            thisComp = self.getComp(thisInterface, thisByte.ddrComp)
-            deck.append("* DDR Package Model")
-            if not thisComp.r_pkg == '':
-                deck.append(".subckt ddr_pkg pad pkg_out r1=%s l1=%s c1=%s" % (thisComp.r_pkg, thisComp.l_pkg, thisComp.c_pkg))
+                print('E031: IBIS model type is not supported: %s' %(dq_model_type))
+                raise SystemExit
+            sub.append('+ file = "%s"' % (thisComp.compModelPath))
+            #sub.append("+ file = '%s'" % ('../models/'  + thisComp.compModelFile))            # relative path
+            sub.append('+ model = "%s"' %(thisByte.dq0.socModelRx))
+            sub.append("+ typ = typ")
+            #sub.append("+ buffer = 3") # 1-Input; 2-Output; 3-I/O; 4-Three state
+            sub.append("x_pin rx_pad nd_pin_in %s rpin='rpin' lpin='lpin' cpin='cpin'" % (pin_rlc))
+            #sub.append("x_pin rx_pad nd_pin_in pin_rlc")
+            sub.append("x_soc_pkg rx_pad rx_pkg_in %s" % (soc_pkg))
+            rx_model_dq = lib.add('soc_rx_dq', "rx_pkg_in rx_dig_out rpin=100m lpin=1nH cpin=0.2pF", sub)
+            # Generic Rx model
+            #deck.append(".subckt rx_model rx_pkg_in")
+            #deck.append("x_rx rx_pad rx_pkg_in soc_pkg")
+            #deck.append("*R_pu rx_pad vcc R_ODT")
+            #deck.append("*R_pd rx_pad 0 R_ODT")
+            #deck.append("C_pin rx_pad 0 1.8pF")
+            #deck.append(".ends")
+            #deck.append("")
+            if thisByte.dq0.socPin in thisComp.compIbis.ibis_pin2rpin.keys() and not thisComp.compIbis.ibis_pin2rpin[thisByte.dq0.socPin] == '':
+                deck.append("xrx_dq0 dq0_soc_bga dq0_dig_out %s rpin=%s lpin=%s cpin=%s" %(rx_model_dq, thisComp.compIbis.ibis_pin2rpin[thisByte.dq0.socPin], thisComp.compIbis.ibis_pin2lpin[thisByte.dq0.socPin], thisComp.compIbis.ibis_pin2cpin[thisByte.dq0.socPin]))
+                deck.append("xrx_dq1 dq1_soc_bga dq1_dig_out %s rpin=%s lpin=%s cpin=%s" %(rx_model_dq, thisComp.compIbis.ibis_pin2rpin[thisByte.dq1.socPin], thisComp.compIbis.ibis_pin2lpin[thisByte.dq1.socPin], thisComp.compIbis.ibis_pin2cpin[thisByte.dq1.socPin]))
+                deck.append("xrx_dq2 dq2_soc_bga dq2_dig_out %s rpin=%s lpin=%s cpin=%s" %(rx_model_dq, thisComp.compIbis.ibis_pin2rpin[thisByte.dq2.socPin], thisComp.compIbis.ibis_pin2lpin[thisByte.dq2.socPin], thisComp.compIbis.ibis_pin2cpin[thisByte.dq2.socPin]))
+                deck.append("xrx_dq3 dq3_soc_bga dq3_dig_out %s rpin=%s lpin=%s cpin=%s" %(rx_model_dq, thisComp.compIbis.ibis_pin2rpin[thisByte.dq3.socPin], thisComp.compIbis.ibis_pin2lpin[thisByte.dq3.socPin], thisComp.compIbis.ibis_pin2cpin[thisByte.dq3.socPin]))
+                deck.append("xrx_dq4 dq4_soc_bga dq4_dig_out %s rpin=%s lpin=%s cpin=%s" %(rx_model_dq, thisComp.compIbis.ibis_pin2rpin[thisByte.dq4.socPin], thisComp.compIbis.ibis_pin2lpin[thisByte.dq4.socPin], thisComp.compIbis.ibis_pin2cpin[thisByte.dq4.socPin]))
+                deck.append("xrx_dq5 dq5_soc_bga dq5_dig_out %s rpin=%s lpin=%s cpin=%s" %(rx_model_dq, thisComp.compIbis.ibis_pin2rpin[thisByte.dq5.socPin], thisComp.compIbis.ibis_pin2lpin[thisByte.dq5.socPin], thisComp.compIbis.ibis_pin2cpin[thisByte.dq5.socPin]))
+                deck.append("xrx_dq6 dq6_soc_bga dq6_dig_out %s rpin=%s lpin=%s cpin=%s" %(rx_model_dq, thisComp.compIbis.ibis_pin2rpin[thisByte.dq6.socPin], thisComp.compIbis.ibis_pin2lpin[thisByte.dq6.socPin], thisComp.compIbis.ibis_pin2cpin[thisByte.dq6.socPin]))
+                deck.append("xrx_dq7 dq7_soc_bga dq7_dig_out %s rpin=%s lpin=%s cpin=%s" %(rx_model_dq, thisComp.compIbis.ibis_pin2rpin[thisByte.dq7.socPin], thisComp.compIbis.ibis_pin2lpin[thisByte.dq7.socPin], thisComp.compIbis.ibis_pin2cpin[thisByte.dq7.socPin]))
             else:
-                deck.append(".subckt ddr_pkg pad pkg_out r1=100m l1=1.5nH c1=0.5pF")
-            deck.append("R_pkg pad net1 r1")
-            deck.append("L_pkg net1 pkg_out l1")
-            deck.append("C_pkg pkg_out 0 c1")
-            deck.append(".ends")
-            deck.append("")
-            
-            # Pin Parasitic model
-            deck.append("* Pin Parasitic Model")
-            deck.append(".subckt pin_rlc die_out pin_out rpin=100m lpin=1nH cpin=0.2pF")
-            deck.append("R_pin die_out nd_pin1 rpin")
-            deck.append("L_pin nd_pin1 pin_out lpin")
-            deck.append("C_pin pin_out 0 cpin")
-            deck.append(".ends")
+                deck.append("xrx_dq0 dq0_soc_bga dq0_dig_out %s" % (rx_model_dq))
+                deck.append("xrx_dq1 dq1_soc_bga dq1_dig_out %s" % (rx_model_dq))
+                deck.append("xrx_dq2 dq2_soc_bga dq2_dig_out %s" % (rx_model_dq))
+                deck.append("xrx_dq3 dq3_soc_bga dq3_dig_out %s" % (rx_model_dq))
+                deck.append("xrx_dq4 dq4_soc_bga dq4_dig_out %s" % (rx_model_dq))
+                deck.append("xrx_dq5 dq5_soc_bga dq5_dig_out %s" % (rx_model_dq))
+                deck.append("xrx_dq6 dq6_soc_bga dq6_dig_out %s" % (rx_model_dq))
+                deck.append("xrx_dq7 dq7_soc_bga dq7_dig_out %s" % (rx_model_dq))
+                
+            sub = []
+            dqs_model_type = thisComp.compIbis.ibis_model2type[thisByte.dqs_p.socModelRx]
+            if (dqs_model_type.lower() == 'i/o'):
+                sub.append("v_en nd_en 0 %s" % (str(1-int(thisComp.compIbis.ibis_model2enable[thisByte.dqs_p.socModelRx]))))                    
+                sub.append("B_dq nd_pu nd_pd rx_pad nd_in nd_en rx_dig_out")
+            elif (dqs_model_type.lower() == 'input'):    
+                sub.append("B_dq nd_pc nd_gc rx_pad rx_dig_out")    
+            else:
+                print('E031: IBIS model type is not supported: %s' %(dqs_model_type))
+                raise SystemExit
+            sub.append('+ file = "%s"' % (thisComp.compModelPath))
+            #sub.append("+ file = '%s'" % ('../models/'  + thisComp.compModelFile))            # relative path
+            sub.append('+ model = "%s"' %(thisByte.dqs_p.socModelRx))
+            sub.append("+ typ = typ")
+            #sub.append("+ buffer = 3") # 1-Input; 2-Output; 3-I/O; 4-Three state
+            sub.append("x_pin rx_pad nd_pin_in %s rpin='rpin' lpin='lpin' cpin='cpin'" % (pin_rlc))
+            #sub.append("x_pin rx_pad nd_pin_in pin_rlc")
+            sub.append("x_soc_pkg rx_pad rx_pkg_in %s" % (soc_pkg))
+            rx_model_dqs = lib.add('soc_rx_dqs', "rx_pkg_in rx_dig_out rpin=100m lpin=1nH cpin=0.2pF", sub)
+            if thisByte.dqs_p.socPin in thisComp.compIbis.ibis_pin2rpin.keys() and not thisComp.compIbis.ibis_pin2rpin[thisByte.dqs_p.socPin] == '':
+                deck.append("xrx_dqsp dqs_p_soc_bga dqs_p_dig_out %s rpin=%s lpin=%s cpin=%s" %(rx_model_dqs, thisComp.compIbis.ibis_pin2rpin[thisByte.dqs_p.socPin], thisComp.compIbis.ibis_pin2lpin[thisByte.dqs_p.socPin],thisComp.compIbis.ibis_pin2cpin[thisByte.dqs_p.socPin]))
+                deck.append("xrx_dqsn dqs_n_soc_bga dqs_n_dig_out %s rpin=%s lpin=%s cpin=%s" %(rx_model_dqs, thisComp.compIbis.ibis_pin2rpin[thisByte.dqs_n.socPin], thisComp.compIbis.ibis_pin2lpin[thisByte.dqs_n.socPin], thisComp.compIbis.ibis_pin2cpin[thisByte.dqs_n.socPin]))
+            else:
+                deck.append("xrx_dqsp dqs_p_soc_bga dqs_p_dig_out %s" % (rx_model_dqs))
+                deck.append("xrx_dqsn dqs_n_soc_bga dqs_n_dig_out %s" % (rx_model_dqs))
             deck.append("")
             
-            # Channel model
+        
+        if  deckType == 'wt':
+            # SoC model: Tx 
+            thisComp = self.getComp(thisInterface, thisByte.socComp)
             deck.append("*********************************")
-            deck.append("******** Channel Model **********")
+            deck.append("******* SoC Model (Tx) **********")
             deck.append("*********************************")
-            bytemodelfile = '%s/BYTE%s.sp' %(self.modelPath,  thisByte.byteID )
-            if not os.path.isfile(bytemodelfile):
-                print('EG02: Cannot find Byte model file.')
+            dq_model_type = thisComp.compIbis.ibis_model2type[thisByte.dq0.socModelTx]
+            sub = []
+            if (dq_model_type.lower() == 'i/o'):
+                sub.append("B_dq nd_pu nd_pd nd_die_out nd_in nd_en nd_dig_out")
+            elif (dq_model_type.lower() == '3-state'):    
+                sub.append("B_dq nd_pu nd_pd nd_die_out nd_in nd_en")
+            else:
+                print('E029: IBIS model type is not supported: %s' %(dq_model_type))
                 raise SystemExit
-            deck.append('.inc "%s"' %(bytemodelfile))
-            deck.append("x_channel")
-            deck.append("+ dq0_ddr_bga dq1_ddr_bga dq2_ddr_bga dq3_ddr_bga dq4_ddr_bga dq5_ddr_bga dq6_ddr_bga dq7_ddr_bga dqs_p_ddr_bga dqs_n_ddr_bga")
-            deck.append("+ dq0_soc_bga dq1_soc_bga dq2_soc_bga dq3_soc_bga dq4_soc_bga dq5_soc_bga dq6_soc_bga dq7_soc_bga dqs_p_soc_bga dqs_n_soc_bga")
-            deck.append("+ BYTE%s" %(thisByte.byteID))
+            sub.append('+ file = "%s"' % (thisComp.compModelPath))      # absolute path
+            #sub.append("+ file = '%s'" % ('../models/'  + thisComp.compModelFile))            # relative path
+            sub.append('+ model = "%s"' %(thisByte.dq0.socModelTx))   # ATTN
+            sub.append("+ typ = typ")
+            #sub.append("+ buffer = 3") # 1-Input; 2-Output; 3-I/O; 4-Three state
+            sub.append("v_en nd_en 0 %s" % (thisComp.compIbis.ibis_model2enable[thisByte.dq0.socModelTx]))    # enabled
+            sub.append("x_pin nd_die_out nd_pin_out %s rpin='rpin' lpin='lpin' cpin='cpin'" % (pin_rlc))
+            sub.append("x_soc_pkg nd_pin_out nd_pkg_out %s" % (soc_pkg))
+            tx_model_dq = lib.add('soc_tx_dq', "nd_pkg_out nd_in rpin=100m lpin=1nH cpin=0.2pF", sub)
+            if thisByte.dq0.socPin in thisComp.compIbis.ibis_pin2rpin.keys() and not thisComp.compIbis.ibis_pin2rpin[thisByte.dq0.socPin] == '':
+                deck.append("xtx_dq0 dq0_soc_bga dq0_in %s rpin=%s lpin=%s cpin=%s" %(tx_model_dq, thisComp.compIbis.ibis_pin2rpin[thisByte.dq0.socPin], thisComp.compIbis.ibis_pin2lpin[thisByte.dq0.socPin], thisComp.compIbis.ibis_pin2cpin[thisByte.dq0.socPin]))
+                deck.append("xtx_dq1 dq1_soc_bga dq1_in %s rpin=%s lpin=%s cpin=%s" %(tx_model_dq, thisComp.compIbis.ibis_pin2rpin[thisByte.dq1.socPin], thisComp.compIbis.ibis_pin2lpin[thisByte.dq1.socPin], thisComp.compIbis.ibis_pin2cpin[thisByte.dq1.socPin]))
+                deck.append("xtx_dq2 dq2_soc_bga dq2_in %s rpin=%s lpin=%s cpin=%s" %(tx_model_dq, thisComp.compIbis.ibis_pin2rpin[thisByte.dq2.socPin], thisComp.compIbis.ibis_pin2lpin[thisByte.dq2.socPin], thisComp.compIbis.ibis_pin2cpin[thisByte.dq2.socPin]))
+                deck.append("xtx_dq3 dq3_soc_bga dq3_in %s rpin=%s lpin=%s cpin=%s" %(tx_model_dq, thisComp.compIbis.ibis_pin2rpin[thisByte.dq3.socPin], thisComp.compIbis.ibis_pin2lpin[thisByte.dq3.socPin], thisComp.compIbis.ibis_pin2cpin[thisByte.dq3.socPin]))
+                deck.append("xtx_dq4 dq4_soc_bga dq4_in %s rpin=%s lpin=%s cpin=%s" %(tx_model_dq, thisComp.compIbis.ibis_pin2rpin[thisByte.dq4.socPin], thisComp.compIbis.ibis_pin2lpin[thisByte.dq4.socPin], thisComp.compIbis.ibis_pin2cpin[thisByte.dq4.socPin]))
+                deck.append("xtx_dq5 dq5_soc_bga dq5_in %s rpin=%s lpin=%s cpin=%s" %(tx_model_dq, thisComp.compIbis.ibis_pin2rpin[thisByte.dq5.socPin], thisComp.compIbis.ibis_pin2lpin[thisByte.dq5.socPin], thisComp.compIbis.ibis_pin2cpin[thisByte.dq5.socPin]))
+                deck.append("xtx_dq6 dq6_soc_bga dq6_in %s rpin=%s lpin=%s cpin=%s" %(tx_model_dq, thisComp.compIbis.ibis_pin2rpin[thisByte.dq6.socPin], thisComp.compIbis.ibis_pin2lpin[thisByte.dq6.socPin], thisComp.compIbis.ibis_pin2cpin[thisByte.dq6.socPin]))
+                deck.append("xtx_dq7 dq7_soc_bga dq7_in %s rpin=%s lpin=%s cpin=%s" %(tx_model_dq, thisComp.compIbis.ibis_pin2rpin[thisByte.dq7.socPin], thisComp.compIbis.ibis_pin2lpin[thisByte.dq7.socPin], thisComp.compIbis.ibis_pin2cpin[thisByte.dq7.socPin]))
+            else:
+                deck.append("xtx_dq0 dq0_soc_bga dq0_in %s" % (tx_model_dq))
+                deck.append("xtx_dq1 dq1_soc_bga dq1_in %s" % (tx_model_dq))
+                deck.append("xtx_dq2 dq2_soc_bga dq2_in %s" % (tx_model_dq))
+                deck.append("xtx_dq3 dq3_soc_bga dq3_in %s" % (tx_model_dq))
+                deck.append("xtx_dq4 dq4_soc_bga dq4_in %s" % (tx_model_dq))
+                deck.append("xtx_dq5 dq5_soc_bga dq5_in %s" % (tx_model_dq))
+                deck.append("xtx_dq6 dq6_soc_bga dq6_in %s" % (tx_model_dq))
+                deck.append("xtx_dq7 dq7_soc_bga dq7_in %s" % (tx_model_dq))                                  
+            sub = []
+            dqs_model_type = thisComp.compIbis.ibis_model2type[thisByte.dqs_p.socModelTx]
+            if (dqs_model_type.lower() == 'i/o'):
+                sub.append("B_dq nd_pu nd_pd nd_die_out nd_in nd_en nd_dig_out")
+            elif (dqs_model_type.lower() == '3-state'):    
+                sub.append("B_dq nd_pu nd_pd nd_die_out nd_in nd_en")
+            else:
+                print('E030: IBIS model type is not supported: %s' %(dqs_model_type))
+                raise SystemExit                
+            sub.append('+ file = "%s"' % (thisComp.compModelPath))
+            #sub.append("+ file = '%s'" % ('../models/'  + thisComp.compModelFile))            # relative path
+            sub.append('+ model = "%s"' %(thisByte.dqs_p.socModelTx)) # ATTN: Assuming DQS_P and DQS_N using same model (mostly true).
+            sub.append("+ typ = typ")
+            #sub.append("+ buffer = 3") 
+            sub.append("v_en nd_en 0 %s" % (thisComp.compIbis.ibis_model2enable[thisByte.dqs_p.socModelTx]))
+            sub.append("x_pin nd_die_out nd_pin_out %s rpin='rpin' lpin='lpin' cpin='cpin'" % (pin_rlc))
+            sub.append("x_soc_pkg nd_pin_out nd_pkg_out %s" % (soc_pkg))
+            tx_model_dqs = lib.add('soc_tx_dqs', "nd_pkg_out nd_in rpin=100m lpin=1nH cpin=0.2pF", sub)
+            if thisByte.dqs_p.socPin in thisComp.compIbis.ibis_pin2rpin.keys() and not thisComp.compIbis.ibis_pin2rpin[thisByte.dqs_p.socPin] == '':
+                deck.append("xtx_dqsp dqs_p_soc_bga dqs_p_in %s rpin=%s lpin=%s cpin=%s" %(tx_model_dqs, thisComp.compIbis.ibis_pin2rpin[thisByte.dqs_p.socPin], thisComp.compIbis.ibis_pin2lpin[thisByte.dqs_p.socPin],thisComp.compIbis.ibis_pin2cpin[thisByte.dqs_p.socPin]))
+                deck.append("xtx_dqsn dqs_n_soc_bga dqs_n_in %s rpin=%s lpin=%s cpin=%s" %(tx_model_dqs, thisComp.compIbis.ibis_pin2rpin[thisByte.dqs_n.socPin], thisComp.compIbis.ibis_pin2lpin[thisByte.dqs_n.socPin], thisComp.compIbis.ibis_pin2cpin[thisByte.dqs_n.socPin]))
+            else:
+                deck.append("xtx_dqsp dqs_p_soc_bga dqs_p_in %s" % (tx_model_dqs))
+                deck.append("xtx_dqsn dqs_n_soc_bga dqs_n_in %s" % (tx_model_dqs))                 
             deck.append("")
-                
-            # Output
+            
+            # DDR model: Rx
+            thisComp = self.getComp(thisInterface, thisByte.ddrComp)
             deck.append("*********************************")
-            deck.append("*********** Output **************")
+            deck.append("******* DDR Model (Rx) **********")
             deck.append("*********************************")
-            #deck.append(".probe v(dq0_in) v(dq3_in)")
-            #deck.append(".probe v(dq0_ddr_bga) v(dq0_soc_bga) v(dqs_p_soc_bga) v(dqs_n_soc_bga) v(dqs_p_ddr_bga) v(dqs_n_ddr_bga)")
-            deck.append(".probe v(xrx_dq0.rx_pad) v(xrx_dq1.rx_pad) v(xrx_dq2.rx_pad) v(xrx_dq3.rx_pad) v(xrx_dq4.rx_pad) v(xrx_dq5.rx_pad) v(xrx_dq6.rx_pad) v(xrx_dq7.rx_pad) v(xrx_dqsp.rx_pad, xrx_dqsn.rx_pad)")
-            deck.append(".probe v(dq0_dig_out) v(dq1_dig_out) v(dq2_dig_out) v(dq3_dig_out) v(dq4_dig_out) v(dq5_dig_out) v(dq6_dig_out) v(dq7_dig_out)")
-            deck.append("")
-            deck.append(".print v(xrx_dq0.rx_pad) v(xrx_dq1.rx_pad) v(xrx_dq2.rx_pad) v(xrx_dq3.rx_pad) v(xrx_dq4.rx_pad) v(xrx_dq5.rx_pad) v(xrx_dq6.rx_pad) v(xrx_dq7.rx_pad) v(xrx_dqsp.rx_pad) v(xrx_dqsn.rx_pad)")
-            deck.append(".print v(dq0_dig_out) v(dq1_dig_out) v(dq2_dig_out) v(dq3_dig_out) v(dq4_dig_out) v(dq5_dig_out) v(dq6_dig_out) v(dq7_dig_out)")
+            sub = []
+            dq_model_type = thisComp.compIbis.ibis_model2type[thisByte.dq0.ddrModelRx[0]]
+            if (dq_model_type.lower() == 'i/o'):
+                sub.append("v_en nd_en 0 %s" % (str(1-int(thisComp.compIbis.ibis_model2enable[thisByte.dq0.ddrModelRx[0]]))))                    
+                sub.append("B_dq nd_pu nd_pd rx_pad nd_in nd_en rx_dig_out")
+            elif (dq_model_type.lower() == 'input'):    
+                sub.append("B_dq nd_pc nd_gc rx_pad rx_dig_out")    
+            else:
+                print('E031: IBIS model type is not supported: %s' %(dq_model_type))
+                raise SystemExit
+            sub.append('+ file = "%s"' % (thisComp.compModelPath))
+            #sub.append("+ file = '%s'" % ('../models/'  + thisComp.compModelFile))            # relative path
+            sub.append('+ model = "%s"' %(thisByte.dq0.ddrModelRx[0]))
+            sub.append("+ typ = typ")
+            #sub.append("+ buffer = 3") # 1-Input; 2-Output; 3-I/O; 4-Three state
+            sub.append("x_pin rx_pad nd_pin_in %s rpin='rpin' lpin='lpin' cpin='cpin'" % (pin_rlc))
+            #sub.append("x_pin rx_pad nd_pin_in pin_rlc")
+            sub.append("x_ddr_pkg rx_pad rx_pkg_in %s" % (ddr_pkg))
+            rx_model_dq = lib.add('ddr_rx_dq', "rx_pkg_in rx_dig_out rpin=100m lpin=1nH cpin=0.2pF", sub)
+            # Generic Rx model
+            #deck.append(".subckt rx_model rx_pkg_in")
+            #deck.append("x_rx rx_pad rx_pkg_in ddr_pkg")
+            #deck.append("*R_pu rx_pad vcc R_ODT")
+            #deck.append("*R_pd rx_pad 0 R_ODT")
+            #deck.append("C_pin rx_pad 0 1.8pF")
+            #deck.append(".ends")
+            #deck.append("")
+            if thisByte.dq0.ddrPin in thisComp.compIbis.ibis_pin2rpin.keys() and not thisComp.compIbis.ibis_pin2rpin[thisByte.dq0.ddrPin] == '':
+                deck.append("xrx_dq0 dq0_ddr_bga dq0_dig_out %s rpin=%s lpin=%s cpin=%s" %(rx_model_dq, thisComp.compIbis.ibis_pin2rpin[thisByte.dq0.ddrPin], thisComp.compIbis.ibis_pin2lpin[thisByte.dq0.ddrPin], thisComp.compIbis.ibis_pin2cpin[thisByte.dq0.ddrPin]))
+                deck.append("xrx_dq1 dq1_ddr_bga dq1_dig_out %s rpin=%s lpin=%s cpin=%s" %(rx_model_dq, thisComp.compIbis.ibis_pin2rpin[thisByte.dq1.ddrPin], thisComp.compIbis.ibis_pin2lpin[thisByte.dq1.ddrPin], thisComp.compIbis.ibis_pin2cpin[thisByte.dq1.ddrPin]))
+                deck.append("xrx_dq2 dq2_ddr_bga dq2_dig_out %s rpin=%s lpin=%s cpin=%s" %(rx_model_dq, thisComp.compIbis.ibis_pin2rpin[thisByte.dq2.ddrPin], thisComp.compIbis.ibis_pin2lpin[thisByte.dq2.ddrPin], thisComp.compIbis.ibis_pin2cpin[thisByte.dq2.ddrPin]))
+                deck.append("xrx_dq3 dq3_ddr_bga dq3_dig_out %s rpin=%s lpin=%s cpin=%s" %(rx_model_dq, thisComp.compIbis.ibis_pin2rpin[thisByte.dq3.ddrPin], thisComp.compIbis.ibis_pin2lpin[thisByte.dq3.ddrPin], thisComp.compIbis.ibis_pin2cpin[thisByte.dq3.ddrPin]))
+                deck.append("xrx_dq4 dq4_ddr_bga dq4_dig_out %s rpin=%s lpin=%s cpin=%s" %(rx_model_dq, thisComp.compIbis.ibis_pin2rpin[thisByte.dq4.ddrPin], thisComp.compIbis.ibis_pin2lpin[thisByte.dq4.ddrPin], thisComp.compIbis.ibis_pin2cpin[thisByte.dq4.ddrPin]))
+                deck.append("xrx_dq5 dq5_ddr_bga dq5_dig_out %s rpin=%s lpin=%s cpin=%s" %(rx_model_dq, thisComp.compIbis.ibis_pin2rpin[thisByte.dq5.ddrPin], thisComp.compIbis.ibis_pin2lpin[thisByte.dq5.ddrPin], thisComp.compIbis.ibis_pin2cpin[thisByte.dq5.ddrPin]))
+                deck.append("xrx_dq6 dq6_ddr_bga dq6_dig_out %s rpin=%s lpin=%s cpin=%s" %(rx_model_dq, thisComp.compIbis.ibis_pin2rpin[thisByte.dq6.ddrPin], thisComp.compIbis.ibis_pin2lpin[thisByte.dq6.ddrPin], thisComp.compIbis.ibis_pin2cpin[thisByte.dq6.ddrPin]))
+                deck.append("xrx_dq7 dq7_ddr_bga dq7_dig_out %s rpin=%s lpin=%s cpin=%s" %(rx_model_dq, thisComp.compIbis.ibis_pin2rpin[thisByte.dq7.ddrPin], thisComp.compIbis.ibis_pin2lpin[thisByte.dq7.ddrPin], thisComp.compIbis.ibis_pin2cpin[thisByte.dq7.ddrPin]))
+            else:
+                deck.append("xrx_dq0 dq0_ddr_bga dq0_dig_out %s" % (rx_model_dq))
+                deck.append("xrx_dq1 dq1_ddr_bga dq1_dig_out %s" % (rx_model_dq))
+                deck.append("xrx_dq2 dq2_ddr_bga dq2_dig_out %s" % (rx_model_dq))
+                deck.append("xrx_dq3 dq3_ddr_bga dq3_dig_out %s" % (rx_model_dq))
+                deck.append("xrx_dq4 dq4_ddr_bga dq4_dig_out %s" % (rx_model_dq))
+                deck.append("xrx_dq5 dq5_ddr_bga dq5_dig_out %s" % (rx_model_dq))
+                deck.append("xrx_dq6 dq6_ddr_bga dq6_dig_out %s" % (rx_model_dq))
+                deck.append("xrx_dq7 dq7_ddr_bga dq7_dig_out %s" % (rx_model_dq))                                  
+            sub = []
+            dqs_model_type = thisComp.compIbis.ibis_model2type[thisByte.dqs_p.ddrModelRx[0]]
+            if (dqs_model_type.lower() == 'i/o'):
+                sub.append("v_en nd_en 0 %s" % ((str(1-int(thisComp.compIbis.ibis_model2enable[thisByte.dqs_p.ddrModelRx[0]])))))                    
+                sub.append("B_dq nd_pu nd_pd rx_pad nd_in nd_en rx_dig_out")
+            elif (dqs_model_type.lower() == 'input'):    
+                sub.append("B_dq nd_pc nd_gc rx_pad rx_dig_out")    
+            else:
+                print('E031: IBIS model type is not supported: %s' %(dqs_model_type))
+                raise SystemExit
+            sub.append('+ file = "%s"' % (thisComp.compModelPath))
+            #sub.append("+ file = '%s'" % ('../models/'  + thisComp.compModelFile))            # relative path
+            sub.append('+ model = "%s"' %(thisByte.dqs_p.ddrModelRx[0]))
+            sub.append("+ typ = typ")
+            #sub.append("+ buffer = 3") # 1-Input; 2-Output; 3-I/O; 4-Three state
+            sub.append("x_pin rx_pad nd_pin_in %s rpin='rpin' lpin='lpin' cpin='cpin'" % (pin_rlc))
+            #sub.append("x_pin rx_pad nd_pin_in pin_rlc")
+            sub.append("x_ddr_pkg rx_pad rx_pkg_in %s" % (ddr_pkg))
+            rx_model_dqs = lib.add('ddr_rx_dqs', "rx_pkg_in rx_dig_out rpin=100m lpin=1nH cpin=0.2pF", sub)
+            if thisByte.dqs_p.ddrPin in thisComp.compIbis.ibis_pin2rpin.keys() and not thisComp.compIbis.ibis_pin2rpin[thisByte.dqs_p.ddrPin] == '':
+                deck.append("xrx_dqsp dqs_p_ddr_bga dqs_p_dig_out %s rpin=%s lpin=%s cpin=%s" %(rx_model_dqs, thisComp.compIbis.ibis_pin2rpin[thisByte.dqs_p.ddrPin], thisComp.compIbis.ibis_pin2lpin[thisByte.dqs_p.ddrPin],thisComp.compIbis.ibis_pin2cpin[thisByte.dqs_p.ddrPin]))
+                deck.append("xrx_dqsn dqs_n_ddr_bga dqs_n_dig_out %s rpin=%s lpin=%s cpin=%s" %(rx_model_dqs, thisComp.compIbis.ibis_pin2rpin[thisByte.dqs_n.ddrPin], thisComp.compIbis.ibis_pin2lpin[thisByte.dqs_n.ddrPin], thisComp.compIbis.ibis_pin2cpin[thisByte.dqs_n.ddrPin]))
+            else:
+                deck.append("xrx_dqsp dqs_p_ddr_bga dqs_p_dig_out %s" % (rx_model_dqs))
+                deck.append("xrx_dqsn dqs_n_ddr_bga dqs_n_dig_out %s" % (rx_model_dqs))
             deck.append("")
-            deck.append(".end")
             
-            # Write to file
-            outfile = open(deckfile, 'w')
-            for line in deck:
-                outfile.write('%s\n' % line)
-            outfile.close()
+        
+        # Channel model
+        deck.append("*********************************")
+        deck.append("******** Channel Model **********")
+        deck.append("*********************************")
+        bytemodelfile = '%s/%sBYTE%s.sp' %(self.modelPath, prefix, thisByte.byteID )
+        if not os.path.isfile(bytemodelfile):
+            print('EG02: Cannot find Byte model file %s.' % (bytemodelfile))
+            raise SystemExit
+        deck.append('.inc "%s"' %(bytemodelfile))
+        deck.append("x_channel")
+        deck.append("+ dq0_ddr_bga dq1_ddr_bga dq2_ddr_bga dq3_ddr_bga dq4_ddr_bga dq5_ddr_bga dq6_ddr_bga dq7_ddr_bga dqs_p_ddr_bga dqs_n_ddr_bga")
+        deck.append("+ dq0_soc_bga dq1_soc_bga dq2_soc_bga dq3_soc_bga dq4_soc_bga dq5_soc_bga dq6_soc_bga dq7_soc_bga dqs_p_soc_bga dqs_n_soc_bga")
+        deck.append("+ BYTE%s" %(thisByte.byteID))
+        deck.append("")
+            
+        # Output
+        deck.append("*********************************")
+        deck.append("*********** Output **************")
+        deck.append("*********************************")
+        #deck.append(".probe v(dq0_in) v(dq3_in)")
+        #deck.append(".probe v(dq0_ddr_bga) v(dq0_soc_bga) v(dqs_p_soc_bga) v(dqs_n_soc_bga) v(dqs_p_ddr_bga) v(dqs_n_ddr_bga)")
+        deck.append(".probe %s" % (' '.join(self.probeSignals())))
+        deck.append("")
+        deck.append(".print %s" % (' '.join(self.probeSignals())))
+        deck.append("")
+        deck.append(".end")
+        inputs = [bytemodelfile, self.getComp(thisInterface, thisByte.socComp).compModelPath, self.getComp(thisInterface, thisByte.ddrComp).compModelPath]
+        return (deckfile, deck, lib, inputs)
 
-    def getComp(self, interface, compName):
-        for c in interface.comps:
-            if compName == c.compID:
-                return c
-        return NULL
+    def probeSignals(self):
+        # Nodes saved by the simulator, in raw file order (after 'time'). They are
+        # listed in decks/manifest.json, so that pproc knows the raw file layout.
+        signals = ['v(xrx_dq%d.rx_pad)' % (k) for k in range(8)] + ['v(xrx_dqsp.rx_pad)', 'v(xrx_dqsn.rx_pad)']
+        if self.probeDigital:
+            signals += ['v(dq%d_dig_out)' % (k) for k in range(8)]
+        return signals
 
-    def getDatarate(self, clkfreq):
-        clkfreq = float(clkfreq)
-        if clkfreq > 800/2*0.95 and clkfreq < 800/2*1.05:
-            return '800'
-        if clkfreq > 1066/2*0.95 and clkfreq < 1066/2*1.05:
-            return '1066'
-        if clkfreq > 1333/2*0.95 and clkfreq < 1333/2*1.05:
-            return '1333'
-        if clkfreq > 1600/2*0.95 and clkfreq < 1600/2*1.05:
-            return '1600'
-        if clkfreq > 1866/2*0.95 and clkfreq < 1866/2*1.05:
-            return '1866'
+    def getComp(self, interface, compName):
+        if not compName in interface.compDict:
+            print ('EM01: Cannot find component: %s'%(compName))
+            return None
+        return interface.compDict[compName]
 
     def parseIbisCompNum(self, ibisFile):
         ibisCompName = []
-        with open(ibisFile, 'r') as f:
-            for line in f:
-                if line.startswith('[model') or line.startswith('[Model'):
-                    break
-                if line.startswith('[component]') or line.startswith('[Component]'):
-                    ibisCompName.append(line.split(' ')[-1].strip())
-            return ibisCompName
+        for ibisComp in self.readIbisFile(ibisFile).comps:
+            ibisCompName.append(ibisComp.name)
+        return ibisCompName
                 
     def parseIbisWhichComp(self, compNameList, thisComp):
+        if not thisComp.compIbisName == '':
+            logging.debug('D052: Found component match in IBIS library: %s'%(thisComp.compIbisName))
+            return thisComp.compIbisName
         if thisComp.compManufacture.lower() == 'ti':
             logging.debug('D051: Found component match in IBIS file (TI): %s'%(compNameList[0]))
             return compNameList[0]
@@ -1145,66 +933,35 @@ class Design:
                 print('E028: Error parsing the SI prefix!')
                 return None
         
-class DDR:
-    def __init__ (self, id):
-        self.interfaceID = id
-        self.ddrType = ''
-        self.dateRate = ''
-        self.comps = []
-        self.byte = []
-        self.ctrl = []
-        self.numByte = 0
-
-class Byte:
-    def __init__ (self, id):
-        self.byteID = id
-        self.dq0 = Signal('dq0')
-        self.dq1 = Signal('dq1')
-        self.dq2 = Signal('dq2')
-        self.dq3 = Signal('dq3')
-        self.dq4 = Signal('dq4')
-        self.dq5 = Signal('dq5')
-        self.dq6 = Signal('dq6')
-        self.dq7 = Signal('dq7')
-        self.dqs_p = Signal('dqs_p')
-        self.dqs_n = Signal('dqs_n')
-        self.socComp = []
-        self.ddrComp = []
-
-class Ctrl:
+class SubcktLib:
+    # Subcircuits shared by the byte decks. Identical subcircuits are only added
+    # once; different ones with the same base name are numbered: soc_rx_dq, soc_rx_dq_2, ...
     def __init__ (self):
-        self.addr = []
-        self.clk_p = Signal('clk_p')
-        self.clk_n = Signal('clk_n')
-        self.bank = []
-        self.ctrl = []
-        self.socComp = []
-        self.ddrComp = []
-        self.numDDRComp = 0
+        self.subckts = []       # (name, ports, body), in the order they were added
+        self.names = {}         # (base name, ports, body) <-> name
 
-class Component:
-    def __init__ (self, id, part, modelFile, manufacture):
-        self.compID = id
-        self.compPart = part
-        self.compModelFile = modelFile
-        self.compManufacture = manufacture
-        self.compIbis = IbisModel(self.compID, self.compModelFile)
-        self.isDIMM = 0
-        self.r_pkg = ''
-        self.l_pkg = ''
-        self.c_pkg = ''
-        
-class Signal:
-    def __init__ (self, id):
-        self.sigID = id
-        self.socPin = ''
-        self.ddrPin = []
-        #self.socModelName = ''
-        #self.ddrModelName = []
-        self.socModelTx = ''
-        self.socModelRx = ''
-        self.ddrModelTx = []
-        self.ddrModelRx = []
+    def add (self, baseName, ports, body):
+        key = (baseName, ports, tuple(body))
+        if not key in self.names:
+            names = [sub[0] for sub in self.subckts]
+            name = baseName
+            n = 1
+            while name in names:
+                n = n + 1
+                name = '%s_%d' % (baseName, n)
+            self.names[key] = name
+            self.subckts.append((name, ports, body))
+        return self.names[key]
+
+    def lines (self, interfaceID):
+        lib = []
+        lib.append("* Subcircuit library for interface %s, included by all byte decks\n" % (interfaceID))
+        for name, ports, body in self.subckts:
+            lib.append(".subckt %s %s" % (name, ports))
+            lib.extend(body)
+            lib.append(".ends")
+            lib.append("")
+        return lib
 
 class IbisModel:
     def __init__ (self, comp, fileName):
@@ -1219,14 +976,284 @@ class IbisModel:
         self.ibis_selector2model = defaultdict(list)     # mapping: Model Selector Name <-> Model Name
         self.ibis_model2type = {}   # mapping: Model <-> Model Type
         self.ibis_model2enable = {} # mapping: Model <-> Enable (Active High/Low)
+
+class IbisFile:
+    # Keywords that start a new top level section. Any other keyword is a
+    # sub-keyword of the current [Component], [Model Selector] or [Model].
+    topKeywords = ['[ibis ver]', '[comment char]', '[file name]', '[file rev]', '[date]', '[source]',
+                   '[notes]', '[disclaimer]', '[copyright]', '[component]', '[model selector]', '[model]',
+                   '[submodel]', '[external circuit]', '[define package model]', '[interconnect model set]',
+                   '[test data]', '[test load]', '[end]']
+
+    # Bump when the parsed content changes, so that cached files are parsed again.
+    version = 2
+
+    def __init__ (self, fileName):
+        self.fileName = fileName
+        self.comps = []         # IbisComp, in file order
+        self.selectors = {}     # mapping: Model Selector Name <-> IbisSelector
+        self.models = {}        # mapping: Model Name <-> IbisModelDef
+
+    def toDict (self):
+        return {'version': IbisFile.version,
+                'comps': [vars(comp) for comp in self.comps],
+                'selectors': [vars(self.selectors[name]) for name in self.selectors],
+                'models': [vars(self.models[name]) for name in self.models]}
+
+    @staticmethod
+    def fromDict (cache, fileName):
+        thisFile = IbisFile(fileName)
+        for d in cache['comps']:
+            comp = IbisComp(d['name'], d['line'], d['offset'])
+            comp.__dict__.update(d)
+            thisFile.comps.append(comp)
+        for d in cache['selectors']:
+            selector = IbisSelector(d['name'], d['offset'])
+            selector.__dict__.update(d)
+            thisFile.selectors[selector.name] = selector
+        for d in cache['models']:
+            model = IbisModelDef(d['name'], d['offset'])
+            model.__dict__.update(d)
+            thisFile.models[model.name] = model
+        return thisFile
+
+    def loadModel (self, modelName):
+        # Parse a [Model] section on first use, reading only its bytes.
+        model = self.models[modelName]
+        if model.loaded == 1:
+            return model
+        with open(self.fileName, 'rb') as f:
+            f.seek(model.offset)
+            lines = f.read(model.end - model.offset).decode('latin-1').splitlines()
+        subkeyword = ''
+        for line in lines[1:]:
+            if line.startswith('|') or line.strip() == '':
+                continue
+            if line.startswith('['):
+                subkeyword = line[:line.find(']')+1].lower().replace('_', ' ')
+                model.tables.setdefault(subkeyword, []).append([])
+                words = line[line.find(']')+1:].split('|')[0].split()
+                if len(words) > 0:      # e.g. [Voltage Range] 1.5 1.425 1.575
+                    model.tables[subkeyword][-1].append(words)
+                continue
+            words = line.split('|')[0].split()
+            if subkeyword == '':
+                if 'model_type' in line.lower():
+                    model.modelType = line.split()[-1]
+                if 'enable' in line.lower():
+                    if 'low' in line.lower():
+                        model.enable = '0'
+                    else:
+                        model.enable = '1'
+                if len(words) > 0:
+                    model.keywords[words[0].lower()] = words[1:]
+            elif len(words) > 0:
+                model.tables[subkeyword][-1].append(words)
+        model.loaded = 1
+        return model
+
+class ModelRule:
+    # One rule of asiv-model-rules.json
+    def __init__ (self, rule):
+        self.vendor = rule['vendor'].lower()
+        self.ddrType = rule.get('ddrType', '').lower()    # '': any DDR type
+        self.tx = ModelMatcher(rule['tx'])
+        self.rx = ModelMatcher(rule['rx'])
+
+    def applies (self, vendor, ddrType):
+        return vendor.lower() == self.vendor and (self.ddrType == '' or ddrType.lower() == self.ddrType)
+
+class ModelMatcher:
+    # The tests of one direction of a ModelRule. The data rate is filled in
+    # once per data rate, the tests are then plain substring checks.
+    def __init__ (self, spec):
+        self.name = spec.get('name', [])
+        self.notName = spec.get('notName', [])
+        self.line = [x.lower() for x in spec.get('line', [])]
+        self.field = [x.lower() for x in spec.get('field', [])]
+        self.fallback = spec.get('fallback', 'first')
+        self.warning = spec.get('warning', 'W08: Cannot find a matching model for pin %(pin)s. Using generic model.')
+        self.compiled = {}      # mapping: Data Rate <-> (name, notName, line) with '{rate}' replaced
+
+    def match (self, name, line, fields, rate):
+        if not rate in self.compiled:
+            self.compiled[rate] = ([x.replace('{rate}', rate) for x in self.name],
+                                   [x.replace('{rate}', rate) for x in self.notName],
+                                   [x.replace('{rate}', rate.lower()) for x in self.line])
+        names, notNames, lines = self.compiled[rate]
+        for x in names:
+            if not x in name:
+                return False
+        for x in notNames:
+            if x in name:
+                return False
+        for x in lines:
+            if not x in line:
+                return False
+        for x in self.field:
+            if not x in fields:
+                return False
+        return True
+
+class IbisLibrary:
+    # Index of a directory tree of IBIS files: every [Component] name with its file
+    # and byte offset. The index is saved in the cache directory and only files that
+    # changed since the last scan are parsed. [Model Selector] and [Model] sections
+    # are in the file of their component, and looked up in its (cached) IbisFile.
+    version = 2
+
+    def __init__ (self, libDir, indexDir):
+        self.libDir = os.path.abspath(libDir)
+        self.indexFile = os.path.join(indexDir, hashlib.sha1(self.libDir.encode('utf-8')).hexdigest() + '.json')
+        self.files = {}         # mapping: File (relative to libDir) <-> {'size', 'mtime', 'comps'}
+        self.comps = {}         # mapping: lower case Component Name <-> [(File, Component Name, Offset)]
+
+    def update (self, parseIbisFile):
+        if os.path.isfile(self.indexFile):
+            try:
+                with open(self.indexFile, 'r') as f:
+                    index = json.load(f)
+                if index['version'] == IbisLibrary.version:
+                    self.files = index['files']
+            except Exception:
+                print('Warning: Cannot read IBIS library index %s.' % (self.indexFile))
+        files = {}
+        changed = 0
+        for root, dirs, names in os.walk(self.libDir):
+            dirs.sort()
+            for name in sorted(names):
+                if not os.path.splitext(name)[1].lower() in ['.ibs', '.ibis']:
+                    continue
+                path = os.path.join(root, name)
+                relpath = os.path.relpath(path, self.libDir)
+                stat = os.stat(path)
+                entry = self.files.get(relpath)
+                if entry == None or not entry['size'] == stat.st_size or not entry['mtime'] == stat.st_mtime:
+                    logging.debug('Indexing IBIS library file %s' % (path))
+                    thisFile = parseIbisFile(path)
+                    entry = {'size': stat.st_size, 'mtime': stat.st_mtime,
+                             'comps': [[comp.name, comp.offset] for comp in thisFile.comps]}
+                    changed = changed + 1
+                files[relpath] = entry
+        if changed > 0 or not len(files) == len(self.files):
+            try:
+                if not os.path.isdir(os.path.dirname(self.indexFile)):
+                    os.makedirs(os.path.dirname(self.indexFile))
+                tmpfile = '%s.%d.tmp' % (self.indexFile, os.getpid())
+                with open(tmpfile, 'w') as f:
+                    json.dump({'version': IbisLibrary.version, 'libDir': self.libDir, 'files': files}, f)
+                os.replace(tmpfile, self.indexFile)
+            except OSError:
+                print('Warning: Cannot write IBIS library index %s.' % (self.indexFile))
+        self.files = files
+        logging.debug('IBIS library %s: %d files, %d indexed in this run.' % (self.libDir, len(files), changed))
+        self.comps = {}
+        for relpath in sorted(files):
+            path = os.path.join(self.libDir, relpath)
+            for name, offset in files[relpath]['comps']:
+                self.comps.setdefault(name.lower(), []).append((path, name, offset))
+
+    def findComp (self, part):
+        # Exact (case insensitive) component name first, else the same partial
+        # match as Design.parseIbisWhichComp.
+        part = part.lower()
+        if part in self.comps:
+            return self.comps[part]
+        found = []
+        for name in sorted(self.comps):
+            if part in name or name in part:
+                found.extend(self.comps[name])
+        return found
+
+class IbisComp:
+    def __init__ (self, name, line, offset):
+        self.name = name
+        self.line = line        # the [Component] line
+        self.offset = offset    # byte offset of the [Component] line
+        self.end = offset       # byte offset of the next top level keyword
+        self.sections = []      # (sub-keyword, byte offset), e.g. ('[pin]', 1234)
+        self.r_pkg = ''
+        self.l_pkg = ''
+        self.c_pkg = ''
+        self.pins = {}          # mapping: Pin <-> [Signal, Model Selector, R_Pin, L_Pin, C_Pin]
+
+class IbisSelector:
+    def __init__ (self, name, offset):
+        self.name = name
+        self.offset = offset
+        self.end = offset
+        self.sections = []
+        self.models = []        # model lines: 'DQ_40_1066 40 Ohm Data I/O with no ODT\n', ...
+
+class IbisModelDef:
+    def __init__ (self, name, offset):
+        self.name = name
+        self.offset = offset
+        self.end = offset
+        self.sections = []      # (sub-keyword, byte offset), e.g. ('[pulldown]', 5678)
+        self.loaded = 0         # the values below are set by IbisFile.loadModel
+        self.modelType = ''
+        self.enable = '1'       # '0': Active-Low
+        self.keywords = {}      # mapping: lower case sub-parameter <-> values, e.g. 'c_comp' <-> ['1.5p', '1.2p', '1.8p']
+        self.tables = {}        # mapping: sub-keyword <-> list of tables (rows of words), e.g. '[pulldown]' <-> [[['-1.8', '-50m', ...], ...]]
+
+class IbisModelValues(dict):
+    # Model <-> one IbisModelDef attribute, loading the [Model] section on first access.
+    def __init__ (self, ibisFile, attr):
+        dict.__init__(self)
+        self.ibisFile = ibisFile
+        self.attr = attr
+
+    def __missing__ (self, modelName):
+        if not modelName in self.ibisFile.models:
+            raise KeyError(modelName)
+        self[modelName] = getattr(self.ibisFile.loadModel(modelName), self.attr)
+        return self[modelName]
         
     
 
+renderDesign = None     # the Design rendered by a --jobs worker process
+
+def initRenderWorker(thisDesign):
+    # Pool initializer: the design is copied once into each worker process
+    global renderDesign
+    renderDesign = thisDesign
+
+def renderDeckJob(task):
+    # Module level so that it can be run in a worker process.
+    # task: (interface index, byte index, 'rd' or 'wt', binaryflag). Returns None after an error.
+    i, j, deckType, binaryflag = task
+    thisInterface = renderDesign.interfaces[i]
+    try:
+        return renderDesign.renderByteDeck(thisInterface, thisInterface.byte[j], deckType, binaryflag)
+    except SystemExit:
+        return None     # a worker that exits would be replaced by the pool and its task never finish
+
 if __name__ == "__main__":
     #logging.basicConfig(level=logging.DEBUG)    # uncomment this line to output debug info
-    if not len(sys.argv) == 2:
-        print('Error! Usage: python3 spgen.py <path_to_interface_folder>')
+    if not (len(sys.argv) >= 2 and len(sys.argv) <= 10):
+        print('Error! Usage: python3 spgen.py <path_to_interface_folder> [--binary] [--ibislib DIR] [--jobs N] [--repeat N] [--digital]')
         raise SystemExit
+    binaryflag = 0
+    if '--binary' in sys.argv:
+        binaryflag = 1
+    digitalflag = 0
+    if '--digital' in sys.argv:
+        digitalflag = 1
+    ibisLibDir = os.environ.get('ASIV_IBIS_LIB', '')
+    if '--ibislib' in sys.argv:
+        ibisLibDir = sys.argv[sys.argv.index('--ibislib') + 1]
+    jobs = 1
+    if '--jobs' in sys.argv:
+        jobs = int(sys.argv[sys.argv.index('--jobs') + 1])     # 0: one job per core
+        if jobs == 0:
+            jobs = os.cpu_count()
+    repeat = 1
+    if '--repeat' in sys.argv:
+        repeat = int(sys.argv[sys.argv.index('--repeat') + 1])     # LFSR periods in the transient
+        if repeat < 1:
+            print('Error! --repeat N needs N >= 1.')
+            raise SystemExit
     projectDir = os.path.abspath(sys.argv[1])
     configFile = 'interface.md'
-    thisDesign = Design(projectDir + '/models/' + configFile)    
+    thisDesign = Design(projectDir + '/models/' + configFile, binaryflag, ibisLibDir, jobs, repeat, digitalflag)    
@@ -0,0 +1,375 @@
+######################
+##### ASIV-CONFIG ####
+######################
+
+# v0.2 (261018)
+# Single pass parser: interface.md is tokenized once into a tree of blocks, checked against a grammar
+#   (statements and blocks in any order, several DDR blocks), with the line number in every error message
+# All errors are printed before stopping; new checks for unknown statements, unknown components,
+#   duplicate IDs, unsupported clock frequencies and DRAM controller pin counts
+# New error codes start at E032 (E028 to E031 are used by asiv-spgen.py), one code per error
+
+# v0.1 (261018)
+# Configuration model shared by the asiv tools: interface.md is parsed once into DDR, Byte, Ctrl,
+#   Component and Signal objects. asiv-spgen.py adds the IBIS models, asiv-pproc.py the eye mask.
+# Moved from asiv-spgen.py (Design.readConfig), which replaces the partial parser of asiv-pproc.py
+
+# TO-DO:
+#
+
+import logging
+import os.path
+import shlex
+
+class Block:
+    # A '<name> {' ... '}' block of interface.md: its statements and nested blocks, with line numbers
+    def __init__ (self, name, lineno):
+        self.name = name
+        self.lineno = lineno
+        self.lines = []     # (line number, [keyword, arg, ...])
+        self.blocks = []    # nested Block
+        self.invalid = []   # keywords of the statements with errors, already reported
+
+class Config:
+    # interface.md grammar: for each block, its statements with their number of
+    # arguments (min, max; None: any) and the blocks it may contain. Statements
+    # and blocks can be in any order. Text outside of 'DDR {' blocks is ignored.
+    grammar = {
+        'DDR':               {'lines': {'ID': (1, 1), 'Type': (2, 2)},
+                              'blocks': ['Components', 'Byte', 'SoC_CLK_ADR_CTRL', 'DRAM_CLK_ADR_CTRL']},
+        'Components':        {'lines': {'NameModel': (4, 5)}, 'blocks': []},
+        'Byte':              {'lines': {'ID': (1, 1), 'SoC': (1, 1), 'SoC_Pin_DQ': (8, 8), 'SoC_Pin_DQS': (2, 2),
+                                        'DRAM': (1, 1), 'DRAM_Pin_DQ': (8, 8), 'DRAM_Pin_DQS': (2, 2),
+                                        'Net_DQ': (1, None), 'Net_DQS': (1, None)}, 'blocks': []},
+        'SoC_CLK_ADR_CTRL':  {'lines': {'Component': (1, 1), 'Pin_CLK': (2, 2), 'Pin_ADR': (1, None),
+                                        'Pin_BA': (1, None), 'Pin_RAS_CAS_WE': (1, None)}, 'blocks': []},
+        'DRAM_CLK_ADR_CTRL': {'lines': {'Component': (1, 1), 'Pin_CLK': (2, 2), 'Pin_ADR': (1, None),
+                                        'Pin_BA': (1, None), 'Pin_RAS_CAS_WE': (1, None)}, 'blocks': []},
+    }
+    # Required statements and blocks, with the error printed when they are missing
+    required = {
+        'DDR':               [('ID', 'E001: Cannot find DDR ID'), ('Type', 'E002: Cannot find DDR Type'),
+                              ('Components', 'E003: Cannot find DDR Components'), ('Byte', 'E004: Cannot find DDR Byte'),
+                              ('SoC_CLK_ADR_CTRL', 'E016: Cannot find DDR CTRL (SoC)'),
+                              ('DRAM_CLK_ADR_CTRL', 'E022: Cannot find DDR CTRL (DRAM)')],
+        'Byte':              [('ID', 'E005: Error in reading DDR Byte ID'), ('SoC', 'E006: Error in reading DDR Byte SoC component'),
+                              ('SoC_Pin_DQ', 'E007: Error in reading DDR Byte SoC DQ Pin'),
+                              ('SoC_Pin_DQS', 'E009: Error in reading DDR Byte SoC DQS Pin'),
+                              ('DRAM', 'E011: Error in reading DDR Byte DRAM component'),
+                              ('DRAM_Pin_DQ', 'E012: Error in reading DDR Byte DRAM DQ Pin'),
+                              ('DRAM_Pin_DQS', 'E014: Error in reading DDR Byte DRAM DQS Pin')],
+        'SoC_CLK_ADR_CTRL':  [('Component', 'E017: Error in reading DDR CTRL Component'), ('Pin_CLK', 'E018: Error in reading DDR CTRL Pin_CLK'),
+                              ('Pin_ADR', 'E019: Error in reading DDR CTRL Pin_ADR'), ('Pin_BA', 'E020: Error in reading DDR CTRL Pin_BA'),
+                              ('Pin_RAS_CAS_WE', 'E021: Error in reading DDR CTRL Pin_RAS_CAS_WE')],
+        'DRAM_CLK_ADR_CTRL': [('Component', 'E023: Error in reading DDR CTRL Component'), ('Pin_CLK', 'E024: Error in reading DDR CTRL Pin_CLK'),
+                              ('Pin_ADR', 'E025: Error in reading DDR CTRL Pin_ADR'), ('Pin_BA', 'E026: Error in reading DDR CTRL Pin_BA'),
+                              ('Pin_RAS_CAS_WE', 'E027: Error in reading DDR CTRL Pin_RAS_CAS_WE')],
+    }
+    # Errors for a wrong number of pins
+    countErrors = {('Byte', 'SoC_Pin_DQ'): 'E008: Error in reading DDR Byte SoC DQ Pin: Number of pin is not 8',
+                   ('Byte', 'SoC_Pin_DQS'): 'E010: Error in reading DDR Byte SoC DQS Pin: Number of pin is not 2',
+                   ('Byte', 'DRAM_Pin_DQ'): 'E013: Error in reading DDR Byte DRAM DQ Pin: Number of pin is not 8',
+                   ('Byte', 'DRAM_Pin_DQS'): 'E015: Error in reading DDR Byte DRAM DQS Pin: Number of pin is not 2'}
+
+    def __init__ (self, file):
+        self.configFile = file
+        self.modelPath = ''
+        self.interfaces = []
+        self.errors = []        # (line number, error message)
+        self.readConfig(self.configFile)
+
+    def readConfig(self, file):
+        # interface.md is read once into a tree of blocks, which is then checked
+        # and turned into DDR objects. All errors are printed before stopping.
+        self.modelPath = os.path.dirname(file)
+        logging.debug('D001: Model Path is %s'%(self.modelPath))
+        blocks = self.parseBlocks(file)
+        for block in blocks:
+            thisInterface = self.buildDDR(block)
+            if thisInterface == None:
+                continue
+            if thisInterface.interfaceID in [interface.interfaceID for interface in self.interfaces]:
+                self.error(block.lineno, 'E042: Duplicate DDR ID %s' % (thisInterface.interfaceID))
+            self.interfaces.append(thisInterface)
+        if len(blocks) == 0:
+            self.error(0, 'E041: Cannot find any "DDR {" block')
+        if len(self.errors) > 0:
+            for lineno, message in sorted(self.errors, key=lambda error: error[0]):
+                print(message)
+            raise SystemExit
+        logging.debug('Number of DDR is ' + str(len(self.interfaces)))
+
+    def error(self, lineno, message):
+        # 'E008: interface.md:14: Error in reading DDR Byte SoC DQ Pin: Number of pin is not 8'
+        code, text = message.split(': ', 1)
+        self.errors.append((lineno, '%s: %s:%d: %s' % (code, os.path.basename(self.configFile), lineno, text)))
+
+    def parseBlocks(self, file):
+        # Tokenize each line once and nest the blocks. Returns the 'DDR' blocks.
+        top = Block('', 0)
+        stack = [top]
+        infile = open(file, 'r')
+        for lineno, line in enumerate(infile, 1):
+            if '"' in line:
+                try:
+                    words = shlex.split(line)     # quoted component names
+                except ValueError as e:
+                    self.error(lineno, 'E043: %s' % (e))
+                    continue
+            else:
+                words = line.split()
+            if len(words) == 0:
+                continue
+            current = stack[-1]
+            if words[-1] == '{' and len(words) == 2:
+                name = words[0]
+                if current is top and not name == 'DDR':
+                    continue    # not part of an interface
+                if not current is top and not name in self.grammar[current.name]['blocks']:
+                    self.error(lineno, 'E032: Unexpected block "%s {" in %s' % (name, current.name))
+                    name = '?'
+                block = Block(name, lineno)
+                current.blocks.append(block)
+                stack.append(block)
+            elif words == ['}']:
+                if current is top:
+                    self.error(lineno, 'E033: Unexpected "}"')
+                else:
+                    stack.pop()
+            elif current is top:
+                continue        # text outside of the interfaces
+            elif current.name == '?':
+                continue        # inside an unexpected block, already reported
+            elif not words[0] in self.grammar[current.name]['lines']:
+                self.error(lineno, 'E034: Unexpected "%s" in %s' % (words[0], current.name))
+            else:
+                nmin, nmax = self.grammar[current.name]['lines'][words[0]]
+                nargs = len(words) - 1
+                if nargs < nmin or (not nmax == None and nargs > nmax):
+                    message = self.countErrors.get((current.name, words[0]), 'E035: Wrong number of values for %s in %s' % (words[0], current.name))
+                    self.error(lineno, message)
+                    current.invalid.append(words[0])
+                else:
+                    current.lines.append((lineno, words))
+        infile.close()
+        for block in stack[1:]:
+            self.error(block.lineno, 'E036: Missing "}" for "%s {"' % (block.name))
+        return [block for block in top.blocks if block.name == 'DDR']
+
+    def statements(self, block):
+        # keyword <-> (line number, words); a keyword may only be used once per block
+        found = {}
+        for lineno, words in block.lines:
+            if words[0] in found and not words[0] == 'NameModel':
+                self.error(lineno, 'E037: Duplicate %s in %s (line %d)' % (words[0], block.name, found[words[0]][0]))
+                continue
+            found[words[0]] = (lineno, words)
+        for name, message in self.required.get(block.name, []):
+            if not name in found and not name in block.invalid and not name in [sub.name for sub in block.blocks]:
+                self.error(block.lineno, message)
+        return found
+
+    def buildDDR(self, block):
+        found = self.statements(block)
+        if not 'ID' in found or not 'Type' in found:
+            return None
+        thisInterface = DDR(found['ID'][1][1])
+        logging.debug ('Interface ID is ' + thisInterface.interfaceID)
+        lineno, words = found['Type']
+        thisInterface.ddrType = words[1]
+        clkfreq = words[2]
+        if clkfreq.lower().endswith('mhz'):
+            clkfreq = clkfreq[:-3]
+        try:
+            thisInterface.dataRate = self.getDatarate(clkfreq)
+        except ValueError:
+            thisInterface.dataRate = None
+        if thisInterface.dataRate == None:
+            self.error(lineno, 'E038: Unsupported DDR clock frequency %s' % (words[2]))
+        logging.debug ('Interface data rate is %s' % (thisInterface.dataRate))
+        for sub in block.blocks:
+            if sub.name == 'Components':
+                self.buildComponents(thisInterface, sub)
+        ctrls = []
+        for sub in block.blocks:
+            if sub.name == 'Byte':
+                self.buildByte(thisInterface, sub)
+            elif sub.name == 'SoC_CLK_ADR_CTRL':
+                if not thisInterface.ctrl == []:
+                    self.error(sub.lineno, 'E044: Duplicate SoC_CLK_ADR_CTRL in DDR')
+                    continue
+                self.buildSocCtrl(thisInterface, sub)
+            elif sub.name == 'DRAM_CLK_ADR_CTRL':
+                ctrls.append(sub)
+        # DRAM pins are added to the signals of the SoC controller
+        if not thisInterface.ctrl == []:
+            for sub in ctrls:
+                self.buildDramCtrl(thisInterface, sub)
+        logging.debug('Num of Byte: ' + str(thisInterface.numByte))
+        return thisInterface
+
+    def buildComponents(self, thisInterface, block):
+        for lineno, words in block.lines:
+            if words[1] in thisInterface.compDict:
+                self.error(lineno, 'E045: Duplicate component %s' % (words[1]))
+                continue
+            thisComp = Component(words[1], words[2].replace("@BOMpart",""), words[3], words[4])
+            if len(words) > 5:
+                if words[5] == 'DIMM':
+                    thisComp.isDIMM = 1
+                    print('%s is DIMM.' % (thisComp.compID))
+            thisInterface.comps.append(thisComp)
+            thisInterface.compDict[thisComp.compID] = thisComp
+            logging.debug ('%s %s %s %s' % (thisComp.compID, thisComp.compPart, thisComp.compModelFile, thisComp.compManufacture))
+
+    def checkComp(self, thisInterface, found, keyword):
+        lineno, words = found[keyword]
+        if not words[1] in thisInterface.compDict:
+            self.error(lineno, 'E039: Component %s is not in the DDR Components' % (words[1]))
+        return words[1]
+
+    def buildByte(self, thisInterface, block):
+        found = self.statements(block)
+        if not 'ID' in found:
+            return
+        thisByte = Byte(found['ID'][1][1])
+        if thisByte.byteID in [byte.byteID for byte in thisInterface.byte]:
+            self.error(found['ID'][0], 'E046: Duplicate Byte ID %s in DDR %s' % (thisByte.byteID, thisInterface.interfaceID))
+        logging.debug ('D010: Byte ID is ' + thisByte.byteID)
+        dqs = [thisByte.dq0, thisByte.dq1, thisByte.dq2, thisByte.dq3, thisByte.dq4, thisByte.dq5, thisByte.dq6, thisByte.dq7]
+        if 'SoC' in found:
+            thisByte.socComp = self.checkComp(thisInterface, found, 'SoC')
+        if 'SoC_Pin_DQ' in found:
+            for thisSignal, pin in zip(dqs, found['SoC_Pin_DQ'][1][1:]):
+                thisSignal.socPin = pin
+        if 'SoC_Pin_DQS' in found:
+            thisByte.dqs_p.socPin, thisByte.dqs_n.socPin = found['SoC_Pin_DQS'][1][1:]
+        if 'DRAM' in found:
+            thisByte.ddrComp = self.checkComp(thisInterface, found, 'DRAM')
+        if 'DRAM_Pin_DQ' in found:
+            for thisSignal, pin in zip(dqs, found['DRAM_Pin_DQ'][1][1:]):
+                thisSignal.ddrPin = pin
+        if 'DRAM_Pin_DQS' in found:
+            thisByte.dqs_p.ddrPin, thisByte.dqs_n.ddrPin = found['DRAM_Pin_DQS'][1][1:]
+        thisInterface.byte.append(thisByte)
+        thisInterface.numByte += 1
+
+    def buildSocCtrl(self, thisInterface, block):
+        found = self.statements(block)
+        thisCtrl = Ctrl()
+        thisInterface.ctrl = thisCtrl
+        if 'Component' in found:
+            thisCtrl.socComp = self.checkComp(thisInterface, found, 'Component')
+        if 'Pin_CLK' in found:
+            thisCtrl.clk_p.socPin, thisCtrl.clk_n.socPin = found['Pin_CLK'][1][1:]
+        for keyword, signals in [('Pin_ADR', thisCtrl.addr), ('Pin_BA', thisCtrl.bank), ('Pin_RAS_CAS_WE', thisCtrl.ctrl)]:
+            if keyword in found:
+                for i in range(len(found[keyword][1]) - 1):
+                    signals.append(Signal('addr'+str(i)))
+                    signals[-1].socPin = found[keyword][1][i+1]
+
+    def buildDramCtrl(self, thisInterface, block):
+        # Each DRAM controller block adds one pin to every controller signal
+        found = self.statements(block)
+        thisCtrl = thisInterface.ctrl
+        thisCtrl.numDDRComp += 1
+        if 'Component' in found:
+            thisCtrl.ddrComp.append(self.checkComp(thisInterface, found, 'Component'))
+        if 'Pin_CLK' in found:
+            thisCtrl.clk_p.ddrPin.append(found['Pin_CLK'][1][1])
+            thisCtrl.clk_n.ddrPin.append(found['Pin_CLK'][1][2])
+        for keyword, signals in [('Pin_ADR', thisCtrl.addr), ('Pin_BA', thisCtrl.bank), ('Pin_RAS_CAS_WE', thisCtrl.ctrl)]:
+            if keyword in found:
+                lineno, words = found[keyword]
+                if not len(words) - 1 == len(signals):
+                    self.error(lineno, 'E040: %s has %d pins, but %d in SoC_CLK_ADR_CTRL' % (keyword, len(words) - 1, len(signals)))
+                    continue
+                for i in range(len(signals)):
+                    signals[i].ddrPin.append(words[i+1])
+
+    def unitPrefix(self, thisInterface):
+        # Names of the files of an interface (decks, BYTE<ID>.sp, results) are only
+        # prefixed by its ID when there is more than one interface: 'DDR1_byte0_rd'
+        if len(self.interfaces) > 1:
+            return thisInterface.interfaceID + '_'
+        return ''
+
+    def getDatarate(self, clkfreq):
+        clkfreq = float(clkfreq)
+        if clkfreq > 800/2*0.95 and clkfreq < 800/2*1.05:
+            return '800'
+        if clkfreq > 1066/2*0.95 and clkfreq < 1066/2*1.05:
+            return '1066'
+        if clkfreq > 1333/2*0.95 and clkfreq < 1333/2*1.05:
+            return '1333'
+        if clkfreq > 1600/2*0.95 and clkfreq < 1600/2*1.05:
+            return '1600'
+        if clkfreq > 1866/2*0.95 and clkfreq < 1866/2*1.05:
+            return '1866'
+
+class DDR:
+    def __init__ (self, id):
+        self.interfaceID = id
+        self.ddrType = ''
+        self.dataRate = ''
+        self.comps = []
+        self.compDict = {}  # mapping: Component ID <-> Component
+        self.byte = []
+        self.ctrl = []
+        self.numByte = 0
+        self.eyemask = []   # set by asiv-pproc.py
+        self.vref = 0.0
+        self.skew_dq_dqs = 0
+
+class Byte:
+    def __init__ (self, id):
+        self.byteID = id
+        self.dq0 = Signal('dq0')
+        self.dq1 = Signal('dq1')
+        self.dq2 = Signal('dq2')
+        self.dq3 = Signal('dq3')
+        self.dq4 = Signal('dq4')
+        self.dq5 = Signal('dq5')
+        self.dq6 = Signal('dq6')
+        self.dq7 = Signal('dq7')
+        self.dqs_p = Signal('dqs_p')
+        self.dqs_n = Signal('dqs_n')
+        self.socComp = []
+        self.ddrComp = []
+
+class Ctrl:
+    def __init__ (self):
+        self.addr = []
+        self.clk_p = Signal('clk_p')
+        self.clk_n = Signal('clk_n')
+        self.bank = []
+        self.ctrl = []
+        self.socComp = []
+        self.ddrComp = []
+        self.numDDRComp = 0
+
+class Component:
+    def __init__ (self, id, part, modelFile, manufacture):
+        self.compID = id
+        self.compPart = part
+        self.compModelFile = modelFile
+        self.compManufacture = manufacture
+        self.compIbis = None            # IbisModel, set by asiv-spgen.py
+        self.compModelPath = ''         # full path of the IBIS file, set by parseIbis
+        self.compIbisName = ''          # [Component] name, when found in the IBIS library index
+        self.isDIMM = 0
+        self.r_pkg = ''
+        self.l_pkg = ''
+        self.c_pkg = ''
+        
+class Signal:
+    def __init__ (self, id):
+        self.sigID = id
+        self.socPin = ''
+        self.ddrPin = []
+        #self.socModelName = ''
+        #self.ddrModelName = []
+        self.socModelTx = ''            # Tx/Rx models, set by asiv-spgen.py
+        self.socModelRx = ''
+        self.ddrModelTx = []
+        self.ddrModelRx = []
@@ -0,0 +1,27 @@
+# The tools are scripts with '-' in their names: they are loaded by file name,
+# the same way asiv-all.py does. asiv/ is put on sys.path for asiv_config.
+
+import importlib.machinery
+import os.path
+import sys
+import types
+import pytest
+
+asivDir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'asiv')
+sys.path.insert(0, asivDir)
+
+def loadTool(name):
+    path = os.path.join(asivDir, name + '.py')
+    loader = importlib.machinery.SourceFileLoader(name.replace('-', '_'), path)
+    module = types.ModuleType(loader.name)
+    module.__file__ = path
+    loader.exec_module(module)
+    return module
+
+@pytest.fixture(scope='session')
+def pproc():
+    return loadTool('asiv-pproc')
+
+@pytest.fixture(scope='session')
+def run():
+    return loadTool('asiv-run')
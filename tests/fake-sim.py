@@ -0,0 +1,37 @@
+######################
+###### FAKE-SIM ######
+######################
+
+# Stand-in for the simulator in the asiv-run.py tests: python3 fake-sim.py <deck> <raw>
+# Writes a small raw file made from the deck content and appends the deck to $FAKE_SIM_LOG
+# Exits with code 3 for the decks named in $FAKE_SIM_FAIL (comma separated, without '.sp')
+# While running, a file is kept in $FAKE_SIM_RUNNING; the most running at once goes to $FAKE_SIM_LOG.max
+
+import hashlib
+import os.path
+import sys
+import time
+
+if __name__ == "__main__":
+    deckfile, rawfile = sys.argv[1], sys.argv[2]
+    deckname = os.path.splitext(os.path.basename(deckfile))[0]
+    logfile = os.environ['FAKE_SIM_LOG']
+    runningPath = os.environ.get('FAKE_SIM_RUNNING', '')
+    if not runningPath == '':
+        marker = os.path.join(runningPath, '%d' % (os.getpid()))
+        open(marker, 'w').close()
+        running = len(os.listdir(runningPath))
+        time.sleep(0.2)
+        with open(logfile + '.max', 'a') as f:
+            f.write('%d\n' % (running))
+        os.remove(marker)
+    with open(logfile, 'a') as f:
+        f.write(deckname + '\n')
+    print('fake-sim: %s' % (deckname))
+    if deckname in os.environ.get('FAKE_SIM_FAIL', '').split(','):
+        print('fake-sim: error in %s' % (deckname))
+        raise SystemExit(3)
+    with open(deckfile, 'rb') as f:
+        deckhash = hashlib.sha1(f.read()).hexdigest()
+    with open(rawfile, 'w') as f:
+        f.write('Title: %s\nDeck: %s\n' % (deckname, deckhash))
@@ -0,0 +1,74 @@
+# Pproc.edge / Pproc.edgeRows against the per-sample state machine they replaced
+
+import numpy as np
+import pytest
+
+def referenceEdge(data, mid, high, low):
+    # Pproc.edge before v0.4
+    var1 = []
+    data = np.asarray(data)
+    gtmid = data > mid
+    gthigh = data > high
+    gtlow = data < low
+    if len(gtmid) == 0: return []
+    temp = gtmid[0]
+    cross = False
+    for a in range(len(gtmid)):
+        if cross == False:
+            if temp != gtmid[a]:
+                temp = gtmid[a]
+                var1.append(a)
+                cross = True
+        else:
+            if cross == gthigh[a] or cross == gtlow[a]:
+                cross = False
+    return var1
+
+def waveforms():
+    rng = np.random.RandomState(1234)
+    waves = []
+    # random noise around the thresholds
+    for n in [1, 2, 3, 17, 500, 4000]:
+        waves.append(('random%d' % (n), rng.uniform(0.0, 1.2, n)))
+    # random walk, crosses mid often without re-arming
+    waves.append(('walk', 0.6 + np.cumsum(rng.normal(0.0, 0.05, 5000))))
+    # quantized: many samples exactly on mid, high and low
+    waves.append(('quantized', np.round(rng.uniform(0.0, 1.2, 3000) / 0.1) * 0.1))
+    waves.append(('levels', rng.choice([0.4, 0.5, 0.6, 0.7, 0.8], 3000)))
+    # noisy square wave, the usual DQ/DQS shape
+    t = np.arange(20000) * 1e-12
+    square = np.where(np.sin(2 * np.pi * 800e6 * t) > 0, 1.2, 0.0)
+    waves.append(('square', square + rng.normal(0.0, 0.1, len(t))))
+    waves.append(('sine', 0.6 + 0.6 * np.sin(2 * np.pi * 800e6 * t)))
+    # flat lines, below, on and above mid
+    for level in [0.0, 0.6, 1.2]:
+        waves.append(('flat%.1f' % (level), np.full(1000, level)))
+    # one crossing, then toggling around mid without ever re-arming
+    never = np.concatenate([np.zeros(10), 0.55 + 0.1 * (np.arange(1000) % 2)])
+    waves.append(('never-rearms', never))
+    return waves
+
+@pytest.mark.parametrize('name,data', waveforms())
+@pytest.mark.parametrize('mid,high,low', [(0.6, 0.7, 0.5), (0.6, 0.6, 0.6), (0.5, 0.9, 0.1)])
+def test_edge(pproc, name, data, mid, high, low):
+    expected = referenceEdge(data, mid, high, low)
+    edges = pproc.Pproc.edge(pproc.Pproc.__new__(pproc.Pproc), data, mid, high, low)
+    assert np.array_equal(np.asarray(edges, dtype=int), np.asarray(expected, dtype=int)), name
+
+def test_edge_empty(pproc):
+    edges = pproc.Pproc.edge(pproc.Pproc.__new__(pproc.Pproc), [], 0.6, 0.7, 0.5)
+    assert len(edges) == 0
+
+@pytest.mark.parametrize('mid,high,low', [(0.6, 0.7, 0.5), (0.6, 0.6, 0.6)])
+def test_edgeRows(pproc, mid, high, low):
+    rng = np.random.RandomState(5678)
+    rows = [rng.uniform(0.0, 1.2, 2000),
+            np.round(rng.uniform(0.0, 1.2, 2000) / 0.1) * 0.1,
+            np.full(2000, 0.6),
+            np.concatenate([np.zeros(10), 0.55 + 0.1 * (np.arange(1990) % 2)])]
+    data = np.array(rows)
+    thispproc = pproc.Pproc.__new__(pproc.Pproc)
+    row, index = thispproc.edgeRows(data, mid, high, low)
+    for i in range(len(rows)):
+        expected = referenceEdge(rows[i], mid, high, low)
+        assert np.array_equal(np.sort(index[row == i]), np.asarray(expected, dtype=int))
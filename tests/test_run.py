@@ -0,0 +1,117 @@
+# SimRunner: result cache hits and misses, failed decks and the bounded pool,
+# with fake-sim.py standing in for the simulator
+
+import json
+import os
+import os.path
+import sys
+import pytest
+
+fakeSim = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fake-sim.py')
+
+def makeProject(path, decks):
+    # decks: [(deck name, included file name)]; the included files are in models/
+    os.makedirs(str(path / 'decks'))
+    os.makedirs(str(path / 'models'))
+    (path / 'models' / 'interface.md').write_text('DDR {\n}\n')
+    manifest = {'version': 1, 'decks': []}
+    for deckname, include in decks:
+        incfile = str(path / 'models' / include)
+        if not os.path.isfile(incfile):
+            with open(incfile, 'w') as f:
+                f.write('* %s\n' % (include))
+        deckfile = str(path / 'decks' / (deckname + '.sp'))
+        with open(deckfile, 'w') as f:
+            f.write('* %s\n.inc "%s"\n.end\n' % (deckname, incfile))
+        manifest['decks'].append({'deck': deckfile, 'hash': '', 'signals': ['time'],
+                                  'inputs': {str(path / 'models' / 'interface.md'): '', incfile: ''}})
+    with open(str(path / 'decks' / 'manifest.json'), 'w') as f:
+        json.dump(manifest, f)
+    return str(path)
+
+def simCalls(logfile):
+    if not os.path.isfile(logfile):
+        return []
+    with open(logfile, 'r') as f:
+        return sorted(f.read().split())
+
+@pytest.fixture
+def sim(tmp_path, monkeypatch):
+    # Simulator command, with the cache and the call log in tmp_path
+    monkeypatch.setenv('ASIV_CACHE', str(tmp_path / 'cache'))
+    monkeypatch.setenv('FAKE_SIM_LOG', str(tmp_path / 'calls.log'))
+    monkeypatch.delenv('FAKE_SIM_FAIL', raising=False)
+    monkeypatch.delenv('FAKE_SIM_RUNNING', raising=False)
+    return '"%s" "%s" %%(deck)s %%(raw)s' % (sys.executable, fakeSim)
+
+def test_cache_hit(run, sim, tmp_path):
+    projectDir = makeProject(tmp_path / 'proj', [('byte0_rd', 'BYTE0.sp'), ('byte0_wt', 'BYTE0.sp')])
+    run.SimRunner(projectDir, sim, 2).runAll()
+    assert simCalls(str(tmp_path / 'calls.log')) == ['byte0_rd', 'byte0_wt']
+    assert len(os.listdir(str(tmp_path / 'cache' / 'sim'))) == 2
+    with open(projectDir + '/data/byte0_rd.raw', 'r') as f:
+        raw = f.read()
+    os.remove(projectDir + '/data/byte0_rd.raw')
+    # Same decks and inputs: served from $ASIV_CACHE/sim, the simulator is not run
+    run.SimRunner(projectDir, sim, 2).runAll()
+    assert simCalls(str(tmp_path / 'calls.log')) == ['byte0_rd', 'byte0_wt']
+    with open(projectDir + '/data/byte0_rd.raw', 'r') as f:
+        assert f.read() == raw
+
+def test_cache_miss_on_included_file(run, sim, tmp_path):
+    projectDir = makeProject(tmp_path / 'proj', [('byte0_rd', 'rd.inc'), ('byte0_wt', 'wt.inc')])
+    run.SimRunner(projectDir, sim).runAll()
+    # interface.md only matters through the deck content
+    (tmp_path / 'proj' / 'models' / 'interface.md').write_text('DDR {\n    ID DDR0\n}\n')
+    run.SimRunner(projectDir, sim).runAll()
+    assert simCalls(str(tmp_path / 'calls.log')) == ['byte0_rd', 'byte0_wt']
+    # A changed included file: only the deck that includes it is simulated again
+    (tmp_path / 'proj' / 'models' / 'rd.inc').write_text('* changed\n')
+    run.SimRunner(projectDir, sim).runAll()
+    assert simCalls(str(tmp_path / 'calls.log')) == ['byte0_rd', 'byte0_rd', 'byte0_wt']
+    assert len(os.listdir(str(tmp_path / 'cache' / 'sim'))) == 3
+
+def test_cache_miss_on_sim_command(run, sim, tmp_path):
+    projectDir = makeProject(tmp_path / 'proj', [('byte0_rd', 'BYTE0.sp')])
+    run.SimRunner(projectDir, sim).runAll()
+    run.SimRunner(projectDir, sim + ' ').runAll()
+    assert simCalls(str(tmp_path / 'calls.log')) == ['byte0_rd', 'byte0_rd']
+
+def test_failed_deck(run, sim, tmp_path, monkeypatch, capsys):
+    projectDir = makeProject(tmp_path / 'proj', [('byte0_rd', 'BYTE0.sp'), ('byte0_wt', 'BYTE0.sp')])
+    monkeypatch.setenv('FAKE_SIM_FAIL', 'byte0_wt')
+    with pytest.raises(SystemExit) as e:
+        run.SimRunner(projectDir, sim, 2).runAll()
+    assert e.value.code == 1
+    out = capsys.readouterr().out
+    assert 'ER03: Simulation of %s/decks/byte0_wt.sp failed (exit code 3)' % (projectDir) in out
+    assert not 'byte0_rd.sp failed' in out
+    with open(projectDir + '/data/byte0_wt.log', 'r') as f:
+        assert 'error in byte0_wt' in f.read()
+    # No raw file and no cache entry for the failed deck; the other one is cached
+    assert not os.path.isfile(projectDir + '/data/byte0_wt.raw')
+    assert [name for name in os.listdir(projectDir + '/data') if name.endswith('.tmp')] == []
+    assert len(os.listdir(str(tmp_path / 'cache' / 'sim'))) == 1
+    monkeypatch.delenv('FAKE_SIM_FAIL')
+    run.SimRunner(projectDir, sim, 2).runAll()
+    assert simCalls(str(tmp_path / 'calls.log')) == ['byte0_rd', 'byte0_wt', 'byte0_wt']
+
+def test_pool_size(run, monkeypatch):
+    thisRunner = run.SimRunner('/nonexistent', 'sim', 3)
+    assert thisRunner.poolSize() == 3
+    monkeypatch.setattr(os, 'cpu_count', lambda: 8)
+    thisRunner = run.SimRunner('/nonexistent', 'sim', 0, 2.0)
+    monkeypatch.setattr(thisRunner, 'freeMemory', lambda: 5 * 2**30)
+    assert thisRunner.poolSize() == 2       # 5 GB free, 2 GB per simulation
+    monkeypatch.setattr(thisRunner, 'freeMemory', lambda: 1 * 2**30)
+    assert thisRunner.poolSize() == 1       # never less than one
+    monkeypatch.setattr(thisRunner, 'freeMemory', lambda: 0)
+    assert thisRunner.poolSize() == 8       # free memory unknown: one per core
+
+def test_bounded_pool(run, sim, tmp_path, monkeypatch):
+    projectDir = makeProject(tmp_path / 'proj', [('byte%d_rd' % (i), 'BYTE%d.sp' % (i)) for i in range(6)])
+    os.makedirs(str(tmp_path / 'running'))
+    monkeypatch.setenv('FAKE_SIM_RUNNING', str(tmp_path / 'running'))
+    run.SimRunner(projectDir, sim, 2).runAll()
+    assert len(simCalls(str(tmp_path / 'calls.log'))) == 6
+    assert max([int(n) for n in simCalls(str(tmp_path / 'calls.log.max'))]) <= 2